@@ -0,0 +1 @@
+"""Компоненты бота - ассистента для обслуживания нескольких студентов."""
@@ -0,0 +1,171 @@
+"""Асинхронный HTTP-транспорт для опроса API и отправки в Telegram.
+
+Основная реализация работает на `aiohttp` и держит тысячи запросов
+в одном потоке. Если `aiohttp` не установлен, запросы выполняются
+через `requests` в пуле потоков с тем же интерфейсом.
+
+`timeout` ограничивает запрос целиком, `connect_timeout` - подключение,
+`read_timeout` - ожидание каждой порции ответа. Оба транспорта пишут
+спаны подключения в текущую трассу `assistant.tracing`.
+"""
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from assistant.client import trace_connections
+from assistant.lazy import lazy_import
+from assistant.tracing import span, start_span
+
+aiohttp = lazy_import('aiohttp')
+asyncio = lazy_import('asyncio')
+requests = lazy_import('requests')
+urllib3 = lazy_import('urllib3')
+
+DEFAULT_TIMEOUT = 30
+
+
+def _trace_config():
+    """Спаны `http.connect` и `http.dns` из сигналов `aiohttp`."""
+    def start(field, name):
+        async def handler(session, context, params):
+            host = getattr(params, 'host', None)
+            attrs = {} if host is None else {'host': host}
+            setattr(context, field, start_span(name, **attrs))
+        return handler
+
+    def end(field):
+        async def handler(session, context, params):
+            getattr(context, field).finish()
+        return handler
+
+    config = aiohttp.TraceConfig()
+    config.on_connection_create_start.append(start('connect', 'http.connect'))
+    config.on_connection_create_end.append(end('connect'))
+    config.on_dns_resolvehost_start.append(start('dns', 'http.dns'))
+    config.on_dns_resolvehost_end.append(end('dns'))
+    return config
+
+
+class AiohttpTransport:
+    """Транспорт на `aiohttp` с общим пулом keep-alive соединений."""
+
+    def __init__(self, pool_size=100, timeout=DEFAULT_TIMEOUT,
+                 connect_timeout=None, read_timeout=None):
+        """Создаёт сессию aiohttp с пулом на `pool_size` соединений."""
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size),
+            timeout=aiohttp.ClientTimeout(
+                total=timeout, sock_connect=connect_timeout,
+                sock_read=read_timeout),
+            trace_configs=[_trace_config()],
+        )
+
+    async def _request(self, method, url, **kwargs):
+        try:
+            async with self._session.request(method, url, **kwargs) as resp:
+                try:
+                    with span('http.body'):
+                        payload = await resp.json(content_type=None)
+                except ValueError:
+                    payload = None
+                return resp.status, payload, resp.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise ConnectionError(
+                f'запрос не может быть выполнен, {error!r}') from error
+
+    async def get(self, url, headers=None, params=None):
+        """GET-запрос, возвращает код ответа, JSON и заголовки ответа."""
+        return await self._request('GET', url, headers=headers, params=params)
+
+    async def get_json(self, url, headers=None, params=None):
+        """GET-запрос, возвращает код ответа и разобранный JSON."""
+        return (await self.get(url, headers, params))[:2]
+
+    async def post_json(self, url, payload):
+        """POST-запрос с JSON-телом, возвращает код ответа и JSON."""
+        return (await self._request('POST', url, json=payload))[:2]
+
+    async def close(self):
+        """Закрывает сессию и все соединения."""
+        await self._session.close()
+
+    async def __aenter__(self):
+        """Возвращает транспорт для `async with`."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Закрывает сессию."""
+        await self.close()
+
+
+class ThreadedTransport:
+    """Транспорт на `requests` в пуле потоков, если нет `aiohttp`."""
+
+    def __init__(self, pool_size=100, timeout=DEFAULT_TIMEOUT,
+                 connect_timeout=None, read_timeout=None):
+        """Пул потоков и клиент `requests` на `pool_size` соединений."""
+        self._timeout = urllib3.util.Timeout(
+            connect=connect_timeout, read=read_timeout, total=timeout)
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=pool_size)
+        trace_connections(adapter)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(pool_size)
+
+    def _request_sync(self, method, url, **kwargs):
+        try:
+            response = self._session.request(
+                method, url, timeout=self._timeout, **kwargs)
+        except requests.RequestException as error:
+            raise ConnectionError(
+                f'запрос не может быть выполнен, {error}') from error
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return response.status_code, payload, response.headers
+
+    async def _request(self, method, url, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Копия контекста: спаны из потока попадают в трассу задачи.
+        return await loop.run_in_executor(
+            self._executor, contextvars.copy_context().run,
+            functools.partial(self._request_sync, method, url, **kwargs),
+        )
+
+    async def get(self, url, headers=None, params=None):
+        """GET-запрос, возвращает код ответа, JSON и заголовки ответа."""
+        return await self._request('GET', url, headers=headers, params=params)
+
+    async def get_json(self, url, headers=None, params=None):
+        """GET-запрос, возвращает код ответа и разобранный JSON."""
+        return (await self.get(url, headers, params))[:2]
+
+    async def post_json(self, url, payload):
+        """POST-запрос с JSON-телом, возвращает код ответа и JSON."""
+        return (await self._request('POST', url, json=payload))[:2]
+
+    async def close(self):
+        """Останавливает пул потоков и закрывает соединения."""
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+    async def __aenter__(self):
+        """Возвращает транспорт для `async with`."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Закрывает клиент и пул потоков."""
+        await self.close()
+
+
+def make_transport(pool_size=100, timeout=DEFAULT_TIMEOUT,
+                   connect_timeout=None, read_timeout=None):
+    """Создаёт транспорт; вызывается внутри работающего event loop."""
+    if aiohttp is not None:
+        return AiohttpTransport(
+            pool_size, timeout, connect_timeout, read_timeout)
+    return ThreadedTransport(
+        pool_size, timeout, connect_timeout, read_timeout)
@@ -0,0 +1,91 @@
+"""Автоматический выключатель для запросов к API Практикума."""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ConnectionError):
+    """Запрос не выполнен: выключатель разомкнут."""
+
+
+class CircuitBreaker:
+    """Выключатель: закрыт, открыт и полуоткрыт.
+
+    После `failure_threshold` ошибок подряд выключатель размыкается, и
+    запросы сразу завершаются `CircuitOpenError`, не нагружая API. Через
+    `recovery_timeout` секунд пропускается до `half_open_max_calls`
+    пробных запросов: успех замыкает выключатель, ошибка снова
+    размыкает его. Об изменениях состояния сообщают `listeners`.
+    """
+
+    def __init__(self, name='practicum', failure_threshold=5,
+                 recovery_timeout=60, half_open_max_calls=1,
+                 clock=time.monotonic):
+        """Создаёт закрытый предохранитель без ошибок."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.listeners = []
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        previous, self.state = self.state, state
+        if previous == state:
+            return
+        if state == OPEN:
+            logger.warning('Выключатель %s разомкнут после %s ошибок',
+                           self.name, self._failures)
+        else:
+            logger.info('Выключатель %s: %s -> %s',
+                        self.name, previous, state)
+        for listener in self.listeners:
+            listener(self, previous, state)
+
+    def allow(self):
+        """Разрешает запрос или сразу выбрасывает `CircuitOpenError`."""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.recovery_timeout:
+                    raise CircuitOpenError(
+                        f'API {self.name} временно недоступен')
+                self._probes = 0
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(
+                        f'API {self.name} временно недоступен')
+                self._probes += 1
+
+    def record_success(self):
+        """Учитывает успешный запрос."""
+        with self._lock:
+            self._failures = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        """Учитывает неудачный запрос."""
+        with self._lock:
+            self._failures += 1
+            if (self.state == HALF_OPEN
+                    or self._failures >= self.failure_threshold):
+                self._opened_at = self.clock()
+                self._set_state(OPEN)
+
+    def record_status(self, status_code):
+        """Ответы 5xx считаются ошибкой сервера, остальные - успехом."""
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
@@ -0,0 +1,246 @@
+"""Клиент API Практикума с пулом keep-alive соединений."""
+import contextvars
+import functools
+import time
+
+from assistant.lazy import lazy_import
+from assistant.tracing import span
+
+requests = lazy_import('requests')
+urllib3 = lazy_import('urllib3')
+
+RETRY_STATUSES = (502, 503, 504)
+VALIDATORS = (('ETag', 'If-None-Match'),
+              ('Last-Modified', 'If-Modified-Since'))
+# Наименьший таймаут попытки: urllib3 не принимает нулевой.
+MIN_ATTEMPT_TIMEOUT = 0.001
+
+# Срок текущего запроса для повторов `DeadlineRetry`: объект Retry у
+# адаптера общий, а срок у каждого запроса свой.
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+def conditional_headers(response_headers):
+    """Заголовки условного запроса из валидаторов ответа.
+
+    Если сервер не прислал ни `ETag`, ни `Last-Modified`, словарь пуст и
+    следующий запрос будет обычным.
+    """
+    response_headers = requests.structures.CaseInsensitiveDict(
+        response_headers or {})
+    return {
+        request_header: response_headers[response_header]
+        for response_header, request_header in VALIDATORS
+        if response_headers.get(response_header)
+    }
+
+
+class _TracedConnection:
+    """Примесь к соединению urllib3: спаны установки соединения.
+
+    `http.connect` - подключение целиком вместе с TLS, вложенный
+    `http.tcp` - разрешение имени и TCP; разница между ними - TLS.
+    """
+
+    def connect(self):
+        with span('http.connect', host=self.host):
+            super().connect()
+
+    def _new_conn(self):
+        with span('http.tcp'):
+            return super()._new_conn()
+
+
+@functools.lru_cache(maxsize=None)
+def _traced_pool_classes():
+    pools = {}
+    for scheme, pool_class in (('http', urllib3.HTTPConnectionPool),
+                               ('https', urllib3.HTTPSConnectionPool)):
+        connection_class = type(
+            f'Traced{pool_class.ConnectionCls.__name__}',
+            (_TracedConnection, pool_class.ConnectionCls), {})
+        pools[scheme] = type(
+            f'Traced{pool_class.__name__}', (pool_class,),
+            {'ConnectionCls': connection_class})
+    return pools
+
+
+def trace_connections(adapter):
+    """Новые соединения `adapter` пишут спаны подключения и TLS."""
+    adapter.poolmanager.pool_classes_by_scheme = _traced_pool_classes()
+
+
+class Deadline:
+    """Общий срок одного опроса: подключение, ответ и чтение тела.
+
+    Таймауты подключения и чтения ограничивают каждую фазу, а срок -
+    весь опрос, поэтому медленно отдающий тело сервер не задержит цикл
+    дольше `seconds`.
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        """Отсчитывает `seconds` секунд от текущего момента."""
+        self.clock = clock
+        self.expires = clock() + seconds
+
+    def remaining(self):
+        """Секунды до истечения срока, не меньше нуля."""
+        return max(0.0, self.expires - self.clock())
+
+    def check(self):
+        """Выбрасывает `TimeoutError`, если срок истёк."""
+        if self.remaining() <= 0:
+            raise TimeoutError('истёк срок опроса API')
+
+    def timeout(self, connect, read):
+        """Таймаут `requests` с фазами `connect` и `read` в пределах срока.
+
+        Каждая повторная попытка urllib3 получает остаток срока, а не
+        исходный `total`.
+        """
+        self.check()
+        return _deadline_classes()[0](connect, read, self)
+
+    def chunks(self, chunks):
+        """Пропускает куски тела ответа, пока не истёк срок."""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+
+
+def body_chunks(response, chunk_size):
+    """Куски тела потокового ответа `requests` по мере поступления.
+
+    В отличие от `iter_content`, чтение не ждёт полного куска в
+    `chunk_size` байт, а возвращает то, что уже пришло. Поэтому
+    `Deadline.chunks` проверяет срок после каждого чтения, и сервер,
+    отдающий тело по байту, задержит опрос не дольше чем на таймаут
+    одного чтения после срока.
+    """
+    raw = response.raw
+    while True:
+        chunk = raw.read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+@functools.lru_cache(maxsize=None)
+def _deadline_classes():
+    class DeadlineTimeout(urllib3.util.Timeout):
+        """Таймаут, чей `total` - остаток срока `deadline`."""
+
+        def __init__(self, connect, read, deadline):
+            """Фазы `connect` и `read` в пределах срока `deadline`."""
+            super().__init__(
+                connect=connect, read=read,
+                total=max(MIN_ATTEMPT_TIMEOUT, deadline.remaining()))
+            self.deadline = deadline
+
+        def clone(self):
+            """Копия для новой попытки с оставшимся сроком."""
+            return type(self)(self._connect, self._read, self.deadline)
+
+    class DeadlineRetry(urllib3.util.retry.Retry):
+        """Повторы, которые не начинаются, если не успеют до срока.
+
+        Срок берётся из `_deadline`; если его не хватает на паузу перед
+        повтором, попытки считаются исчерпанными.
+        """
+
+        def increment(self, method=None, url=None, response=None,
+                      error=None, _pool=None, _stacktrace=None):
+            """Следующее состояние повторов с учётом срока запроса."""
+            args = (method, url, response, error, _pool, _stacktrace)
+            retry = super().increment(*args)
+            deadline = _deadline.get()
+            if deadline is None:
+                return retry
+            pause = retry.get_backoff_time()
+            if response is not None and self.respect_retry_after_header:
+                pause = max(pause, retry.get_retry_after(response) or 0)
+            if deadline.remaining() <= pause:
+                return self.new(total=0).increment(*args)
+            return retry
+
+    return DeadlineTimeout, DeadlineRetry
+
+
+class PracticumClient:
+    """Переиспользует TCP и TLS соединения между опросами API.
+
+    Один клиент разделяют все студенты процесса: запросы к
+    `practicum.yandex.ru` идут через общий пул соединений, поэтому
+    TLS-рукопожатие выполняется один раз на соединение, а не на опрос.
+    С `breaker` ошибки соединения и ответы 5xx размыкают общий для всех
+    студентов выключатель, и запросы к недоступному API не выполняются.
+    С `hedger` медленный запрос страхуется вторым (см. `Hedger`).
+    Повторы после ошибок и ответов 5xx не выходят за `Deadline`, если
+    таймаут запроса получен из `Deadline.timeout`.
+    """
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_factor=0.5,
+                 session=None, breaker=None, hedger=None):
+        """Создаёт сессию с пулом соединений и повторами запросов."""
+        self.session = session or requests.Session()
+        self.breaker = breaker
+        self.hedger = hedger
+        retry = _deadline_classes()[1](
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        trace_connections(adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _send(self, url, **kwargs):
+        # Страхующий запрос идёт в другом потоке, поэтому срок
+        # выставляется в потоке, который выполняет запрос.
+        token = _deadline.set(getattr(kwargs.get('timeout'), 'deadline', None))
+        try:
+            return self.session.get(url, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    def _get(self, url, **kwargs):
+        if self.hedger is None:
+            return self._send(url, **kwargs)
+        return self.hedger.call(
+            self._send, url,
+            discard=lambda response: response.close(), **kwargs)
+
+    def get(self, url, **kwargs):
+        """GET-запрос через пул соединений клиента."""
+        if self.breaker is None:
+            return self._get(url, **kwargs)
+        self.breaker.allow()
+        try:
+            response = self._get(url, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_status(response.status_code)
+        return response
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        if self.hedger is not None:
+            self.hedger.close()
+        self.session.close()
+
+    def __enter__(self):
+        """Возвращает клиент для `with`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает сессию."""
+        self.close()
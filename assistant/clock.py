@@ -0,0 +1,45 @@
+"""Часы бота: настоящие или виртуальные для симуляции.
+
+Движок опроса, очередь сообщений и восстановление состояния получают
+время через часы, поэтому в симуляции недели опросов проходят за
+секунды: `VirtualClock.sleep` не ждёт, а переводит время вперёд.
+"""
+import time
+
+
+class SystemClock:
+    """Настоящее время процесса."""
+
+    def time(self):
+        """Время в секундах от эпохи."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонное время для интервалов."""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Ждёт `seconds` секунд."""
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Время, которое идёт только через `sleep`.
+
+    `time` и `monotonic` возвращают одно и то же виртуальное время в
+    секундах от эпохи.
+    """
+
+    def __init__(self, start=0.0):
+        """Часы, показывающие `start` секунд."""
+        self.now = float(start)
+
+    def time(self):
+        """Текущее виртуальное время."""
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        """Переводит часы на `seconds` секунд вперёд без ожидания."""
+        self.now += max(0.0, seconds)
@@ -0,0 +1,151 @@
+"""Ответы на команды `/status` и `/history` из кэша статусов.
+
+Кэш заполняется полным ответом API при первой команде из чата, а затем
+поддерживается циклом опроса: каждый успешный опрос добавляет изменения
+и продлевает свежесть записи. Поэтому к API команда обращается только
+при промахе или если опросы чата давно не проходили.
+"""
+import logging
+import threading
+import time
+
+from assistant.table import HomeworkTable
+
+COMMANDS = ('status', 'history')
+NO_HOMEWORKS = 'Работ на проверке пока нет.'
+UNKNOWN_CHAT = 'Этот чат не подключён к боту.'
+FETCH_FAILED = 'Не удалось получить статусы работ, попробуйте позже.'
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """Известные работы чата и время последней сверки с API.
+
+    Работы хранятся в `HomeworkTable` с именами и собираются в записи
+    `Homework` только для ответа на команду.
+    """
+
+    __slots__ = ('homeworks', 'updated')
+
+    def __init__(self, homeworks, updated):
+        """Запись с работами `homeworks`, сверенная с API в `updated`."""
+        self.homeworks = HomeworkTable(names=True)
+        self.updated = updated
+        self.merge(homeworks)
+
+    def merge(self, homeworks):
+        """Добавляет или заменяет работы по ключу."""
+        put = self.homeworks.put
+        for homework in homeworks:
+            put(homework.key, homework.status, homework.date_updated,
+                homework.name)
+
+    def latest(self):
+        """Работы от последней обновлённой к первой."""
+        return list(self.homeworks.records(newest_first=True))
+
+
+class ReplyCache:
+    """Кэш работ по чатам, общий для цикла опроса и обработчика команд.
+
+    Запись старше `max_age` секунд считается устаревшей.
+    """
+
+    def __init__(self, max_age, clock=time.monotonic):
+        """Пустой кэш."""
+        self.max_age = max_age
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, chat_id):
+        """Свежая запись чата или None при промахе."""
+        with self.lock:
+            entry = self.entries.get(chat_id)
+            if entry is None or self.clock() - entry.updated > self.max_age:
+                return None
+            return entry
+
+    def store(self, chat_id, homeworks):
+        """Сохраняет полный ответ API для чата."""
+        with self.lock:
+            entry = self.entries[chat_id] = CacheEntry(
+                homeworks, self.clock())
+            return entry
+
+    def update(self, chat_id, homeworks=()):
+        """Учитывает успешный опрос чата, если для него есть запись."""
+        with self.lock:
+            entry = self.entries.get(chat_id)
+            if entry is None:
+                return
+            entry.merge(homeworks)
+            entry.updated = self.clock()
+
+
+class ChatCommands:
+    """Строит ответы на команды из кэша.
+
+    `fetch(tenant)` возвращает полный список работ студента из API и
+    вызывается только при промахе кэша. Без кэша (`cache` None) каждая
+    команда обращается к API: так отвечает процесс, который сам не
+    опрашивает студентов и не может поддерживать кэш свежим.
+    `verdicts` - описания статусов.
+    """
+
+    def __init__(self, cache, tenants, fetch, verdicts):
+        """Связывает кэш с чатами студентов `tenants`."""
+        self.cache = cache
+        self.tenants = {str(tenant.chat_id): tenant for tenant in tenants}
+        self.fetch = fetch
+        self.verdicts = verdicts
+
+    def homeworks(self, chat_id):
+        """Работы чата из кэша или, при промахе, из API."""
+        if self.cache is None:
+            return CacheEntry(self.fetch(self.tenants[chat_id]), 0).latest()
+        entry = self.cache.get(chat_id)
+        if entry is None:
+            entry = self.cache.store(
+                chat_id, self.fetch(self.tenants[chat_id]))
+        return entry.latest()
+
+    def describe(self, homework):
+        """Строка о статусе одной работы."""
+        status = homework.status
+        verdict = self.verdicts.get(status, f'Статус {status}.')
+        return f'"{homework.name}": {verdict}'
+
+    def reply(self, chat_id, command):
+        """Текст ответа на команду `command` из чата `chat_id`."""
+        chat_id = str(chat_id)
+        if chat_id not in self.tenants:
+            return UNKNOWN_CHAT
+        if command not in COMMANDS:
+            raise ValueError(f'Неизвестная команда {command}')
+        try:
+            homeworks = self.homeworks(chat_id)
+        except Exception as error:
+            logger.error('Не удалось получить статусы работ для чата %s: %s',
+                         chat_id, error, exc_info=True)
+            return FETCH_FAILED
+        if not homeworks:
+            return NO_HOMEWORKS
+        if command == 'status':
+            homeworks = homeworks[:1]
+        return '\n'.join(map(self.describe, homeworks))
+
+    def answer(self, update, context=None):
+        """Обработчик `CommandHandler`: отвечает на команду из `update`.
+
+        `CommandHandler` передаёт и отредактированные сообщения, у которых
+        `update.message` пуст, поэтому команда берётся из
+        `update.effective_message`. Регистр команды он не различает, и
+        `/Status` приводится к `status`.
+        """
+        message = update.effective_message
+        command = message.text.split()[0][1:].split('@')[0].lower()
+        logger.debug('Команда %s из чата %s',
+                     command, update.effective_chat.id)
+        message.reply_text(self.reply(update.effective_chat.id, command))
@@ -0,0 +1,84 @@
+"""Индекс статусов работ и поиск их изменений в ответе API."""
+from collections import namedtuple
+
+from assistant.table import HomeworkTable, to_epoch
+
+StatusChange = namedtuple('StatusChange', ('key', 'homework', 'previous'))
+
+
+class StatusIndex:
+    """Последний известный статус и дата обновления каждой работы.
+
+    API возвращает только работы, обновлённые после `from_date`, поэтому
+    `diff` проходит лишь по ним и ищет статус в таблице по ключу работы:
+    стоимость цикла пропорциональна числу изменений, а не числу
+    отслеживаемых работ. Сообщения строятся только для изменений.
+
+    Статусы хранятся в `HomeworkTable`, `dirty` - ещё не сохранённые
+    изменения, `reviewing` - число работ на ревью.
+    """
+
+    __slots__ = ('table', 'dirty', 'reviewing')
+
+    def __init__(self, statuses=None):
+        """Индекс из словаря `ключ работы -> (статус, дата)`."""
+        self.table = HomeworkTable()
+        self.dirty = {}
+        self.reviewing = 0
+        for key, (status, date_updated) in (statuses or {}).items():
+            self._put(key, status, date_updated)
+
+    def __len__(self):
+        """Число отслеживаемых работ."""
+        return len(self.table)
+
+    def get(self, key):
+        """Пара `(статус, дата)` работы `key` или None."""
+        return self.table.get(key)
+
+    def items(self):
+        """Пары `(ключ, (статус, дата))` всех работ."""
+        return self.table.items()
+
+    def diff(self, homeworks):
+        """Изменения статусов в `homeworks`, индекс при этом не меняется.
+
+        `homeworks` - записи `Homework` из любого итерируемого, например
+        `HomeworkStream`. Целиком хранятся только работы с изменённым
+        статусом, для остальных запоминается лишь дата обновления.
+        """
+        table = self.table
+        latest = {}
+        for homework in homeworks:
+            key = homework.key
+            updated = homework.date_updated or ''
+            other = latest.get(key)
+            if other is not None and updated < other[0]:
+                continue
+            previous = table.status(key)
+            if homework.status == previous:
+                homework = None
+            elif previous is not None and updated:
+                stored = table.epoch(key)
+                if stored and to_epoch(updated) < stored:
+                    homework = None
+            latest[key] = (updated, homework)
+        return [
+            StatusChange(key, homework, table.status(key))
+            for key, (_, homework) in latest.items()
+            if homework is not None
+        ]
+
+    def commit(self, changes):
+        """Записывает изменения в индекс после их обработки."""
+        for key, homework, _ in changes:
+            self.remember(key, homework.status, homework.date_updated)
+
+    def remember(self, key, status, date_updated=None):
+        """Запоминает статус работы `key`."""
+        self._put(key, status, date_updated)
+        self.dirty[key] = (status, date_updated)
+
+    def _put(self, key, status, date_updated):
+        previous = self.table.put(key, status, date_updated)
+        self.reviewing += (status == 'reviewing') - (previous == 'reviewing')
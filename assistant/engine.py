@@ -0,0 +1,148 @@
+"""Планировщик опроса API Практикума для нескольких студентов."""
+import heapq
+import itertools
+import logging
+import time
+
+from assistant.diff import StatusIndex
+from assistant.scheduler import FixedScheduler, Outcome
+
+logger = logging.getLogger(__name__)
+
+
+class TenantState:
+    """Курсор, последнее сообщение и индекс статусов одного студента.
+
+    `validators` - заголовки условного запроса из последнего успешно
+    обработанного ответа API.
+    """
+
+    __slots__ = ('tenant', 'timestamp', 'last_message', 'index',
+                 'validators')
+
+    def __init__(self, tenant, timestamp, last_message='', statuses=None):
+        """Состояние с курсором `timestamp` и статусами `statuses`."""
+        self.tenant = tenant
+        self.timestamp = timestamp
+        self.last_message = last_message
+        self.index = StatusIndex(statuses)
+        self.validators = {}
+
+    def outcome(self):
+        """Итог опроса для планировщика: есть ли работы на ревью."""
+        return Outcome.REVIEWING if self.index.reviewing else Outcome.IDLE
+
+
+class PollingEngine:
+    """Опрашивает API по очереди для всех студентов в одном процессе.
+
+    Студенты хранятся в куче по времени следующего опроса, поэтому один
+    цикл стоит O(log n), а первые опросы равномерно распределены по
+    `period`, чтобы не отправлять все запросы одновременно. `poll`
+    возвращает `Outcome`, по которому `scheduler` выбирает интервал до
+    следующего опроса студента. `restore` создаёт начальное состояние
+    студента, например из постоянного хранилища. Сообщения из `outbox`
+    отправляются через `deliver` между опросами, как только это
+    разрешают лимиты Telegram. `resume(state)` может вернуть время, когда
+    студента пора опросить по сохранённому курсору: тогда первый опрос
+    не откладывается на его место в равномерном распределении. `health`
+    (`Health`) получает плановое и фактическое время начала опросов.
+    """
+
+    def __init__(self, tenants, poll, period, scheduler=None, restore=None,
+                 outbox=None, deliver=None, resume=None, health=None,
+                 time_func=time.time, sleep=time.sleep):
+        """Раскладывает первые опросы студентов по `period`."""
+        self.poll = poll
+        self.period = period
+        self.scheduler = scheduler or FixedScheduler(period)
+        self.outbox = outbox
+        self.deliver = deliver
+        self.health = health
+        self.time_func = time_func
+        self.sleep = sleep
+        self._counter = itertools.count()
+        self._queue = []
+        now = time_func()
+        tenants = list(tenants)
+        step = period / len(tenants) if tenants else 0
+        for index, tenant in enumerate(tenants):
+            if restore is None:
+                state = TenantState(tenant, int(now) - period)
+            else:
+                state = restore(tenant)
+            due = now + index * step
+            resume_at = resume(state) if resume is not None else None
+            if resume_at is not None:
+                due = min(due, resume_at)
+            self._push(due, state)
+
+    def __len__(self):
+        """Число студентов в очереди опроса."""
+        return len(self._queue)
+
+    def _push(self, due, state):
+        heapq.heappush(self._queue, (due, next(self._counter), state))
+
+    def run_once(self, sleep=None):
+        """Отправляет готовые сообщения или опрашивает ближайшего студента.
+
+        `sleep` заменяет `self.sleep` и может вернуться раньше срока,
+        например при остановке: тогда опрос не выполняется.
+        """
+        sleep = sleep or self.sleep
+        delay = self._queue[0][0] - self.time_func()
+        if self.outbox is not None:
+            ready_in = self.outbox.pump(self.deliver)
+            if ready_in is not None and ready_in < delay:
+                sleep(ready_in)
+                return
+        if delay > 0:
+            if sleep(delay):
+                return
+        due, _, state = heapq.heappop(self._queue)
+        if self.health is not None:
+            self.health.cycle()
+        outcome = Outcome.ERROR
+        try:
+            outcome = self.poll(state)
+        finally:
+            delay = self.scheduler.next_delay(state.tenant.name, outcome)
+            self._push(max(due + delay, self.time_func()), state)
+            if self.health is not None:
+                self.health.plan(self._queue[0][0])
+
+    def run(self, shutdown=None, drain_timeout=10):
+        """Цикл опроса всех студентов до остановки через `shutdown`.
+
+        Ожидание между опросами прерывается `shutdown.wait`, начатый опрос
+        доводится до конца, затем очередь сообщений досылается не дольше
+        `drain_timeout` секунд.
+        """
+        if not self._queue:
+            raise ValueError('Нет студентов для опроса')
+        logger.info('Опрос API для %s студентов', len(self))
+        if self.health is not None:
+            self.health.plan(self._queue[0][0])
+        if shutdown is None:
+            while True:
+                self.run_once()
+        while not shutdown.requested:
+            self.run_once(shutdown.wait)
+        self.drain(drain_timeout)
+
+    def drain(self, timeout):
+        """Досылает очередь сообщений; возвращает число чатов без отправки."""
+        if self.outbox is None:
+            return 0
+        deadline = self.time_func() + timeout
+        while True:
+            ready_in = self.outbox.pump(self.deliver)
+            if ready_in is None:
+                return 0
+            if self.time_func() + ready_in > deadline:
+                break
+            self.sleep(ready_in)
+        left = len(self.outbox)
+        logger.warning('Остановка: сообщения для %s чатов не отправлены', left)
+        return left
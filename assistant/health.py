@@ -0,0 +1,112 @@
+"""Проверки живости и готовности бота для супервизора.
+
+Цикл опроса сообщает `Health`, когда собирается начать следующий цикл
+(`plan`) и когда действительно начал (`cycle`). Процесс считается живым,
+пока цикл опаздывает не больше чем на `tolerance` секунд: зависший
+запрос или отправка останавливают цикл, и уже через один пропущенный
+цикл `/healthz` отвечает 503. В asyncio так же измеряется задержка
+event loop. Кроме того, отчёт содержит время с последнего успешного
+опроса и отправки, опоздание циклов, длины очередей и состояние
+выключателей.
+"""
+import json
+import threading
+import time
+
+from assistant.breaker import OPEN
+from assistant.metrics import SCHEDULER_LAG
+
+JSON_TYPE = 'application/json; charset=utf-8'
+
+
+class Health:
+    """Сердцебиение цикла опроса и служебные показатели процесса."""
+
+    def __init__(self, tolerance=60, clock=time.time):
+        """Проверки без отметок: процесс жив, пока не истёк `tolerance`."""
+        self.tolerance = tolerance
+        self.clock = clock
+        self.started = clock()
+        self.planned = None
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._beats = {}
+        self._queues = {}
+        self._breakers = []
+        self._lock = threading.Lock()
+
+    def beat(self, kind):
+        """Отмечает успешное событие `kind`, например `poll` или `send`."""
+        self._beats[kind] = self.clock()
+
+    def plan(self, at):
+        """Цикл обещает начаться не позже момента `at`."""
+        self.planned = at
+
+    def cycle(self):
+        """Цикл начался: запоминает, на сколько он опоздал."""
+        if self.planned is None:
+            return
+        lag = max(0.0, self.clock() - self.planned)
+        with self._lock:
+            self.lag = lag
+            self.max_lag = max(self.max_lag, lag)
+        SCHEDULER_LAG.set(lag)
+
+    def queue(self, name, size):
+        """Добавляет в отчёт длину очереди: `size()` без аргументов."""
+        self._queues[name] = size
+
+    def breaker(self, breaker):
+        """Добавляет в отчёт состояние выключателя."""
+        self._breakers.append(breaker)
+
+    def live(self):
+        """Цикл не опаздывает дольше `tolerance` секунд."""
+        return (self.planned is None
+                or self.clock() <= self.planned + self.tolerance)
+
+    def ready(self):
+        """Цикл запущен, жив и ни один выключатель не разомкнут."""
+        return (self.planned is not None and self.live()
+                and all(breaker.state != OPEN
+                        for breaker in self._breakers))
+
+    def snapshot(self):
+        """Показатели процесса для ответа `/healthz` и `/readyz`.
+
+        `scheduler_max_lag_s` - наибольшее опоздание цикла с прошлого
+        отчёта.
+        """
+        now = self.clock()
+        with self._lock:
+            lag, max_lag, self.max_lag = self.lag, self.max_lag, self.lag
+        return {
+            'live': self.live(),
+            'ready': self.ready(),
+            'uptime_s': now - self.started,
+            'overdue_s': (None if self.planned is None
+                          else max(0.0, now - self.planned)),
+            'last_poll_age_s': self._age('poll', now),
+            'last_send_age_s': self._age('send', now),
+            'scheduler_lag_s': lag,
+            'scheduler_max_lag_s': max_lag,
+            'queues': {name: size() for name, size in self._queues.items()},
+            'breakers': {breaker.name: breaker.state
+                         for breaker in self._breakers},
+        }
+
+    def _age(self, kind, now):
+        beat = self._beats.get(kind)
+        return None if beat is None else now - beat
+
+    def routes(self):
+        """Маршруты `/healthz` и `/readyz` для `start_http_server`."""
+        def respond(check):
+            def route():
+                body = json.dumps(self.snapshot(), ensure_ascii=False)
+                return (200 if check() else 503), JSON_TYPE, body + '\n'
+            return route
+
+        return {'/healthz': respond(self.live),
+                '/readyz': respond(self.ready)}
@@ -0,0 +1,129 @@
+"""Страхующие (hedged) запросы к API Практикума.
+
+Если запрос выполняется дольше `quantile` (по умолчанию p95) недавних
+запросов, параллельно отправляется второй такой же и берётся ответ,
+пришедший первым. Так медленный хвост распределения ограничен почти
+временем p95 ценой примерно 5% лишних запросов. Пока в окне меньше
+`min_samples` измерений, запросы не страхуются.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                wait)
+
+from assistant.lazy import lazy_import
+from assistant.metrics import HEDGES
+
+asyncio = lazy_import('asyncio')
+
+
+class LatencyWindow:
+    """Длительности последних `size` запросов."""
+
+    def __init__(self, size=1000):
+        """Окно из последних `size` замеров."""
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Число замеров в окне."""
+        return len(self._samples)
+
+    def add(self, seconds):
+        """Добавляет длительность запроса."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        """Квантиль `q` длительностей в окне."""
+        with self._lock:
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Hedger:
+    """Выполняет вызов и страхует его вторым, если первый медлит.
+
+    Синхронные вызовы выполняются в пуле из `workers` потоков, `discard`
+    получает результат проигравшего вызова, например чтобы закрыть
+    ответ. В asyncio проигравшая задача отменяется.
+    """
+
+    def __init__(self, quantile=0.95, window=1000, min_samples=20,
+                 workers=10, clock=time.perf_counter):
+        """Создаёт пул из `workers` потоков для страхующих запросов."""
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.window = LatencyWindow(window)
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix='hedge')
+
+    def delay(self):
+        """Через сколько секунд страховать запрос; None - не страховать."""
+        if len(self.window) < self.min_samples:
+            return None
+        return self.window.quantile(self.quantile)
+
+    def _timed(self, func, *args, **kwargs):
+        started = self.clock()
+        result = func(*args, **kwargs)
+        self.window.add(self.clock() - started)
+        return result
+
+    def call(self, func, *args, discard=None, **kwargs):
+        """`func(*args, **kwargs)` со страховкой после `delay()` секунд."""
+        delay = self.delay()
+        if delay is None:
+            return self._timed(func, *args, **kwargs)
+        first = self._executor.submit(self._timed, func, *args, **kwargs)
+        if wait([first], delay).done:
+            return first.result()
+        hedge = self._executor.submit(self._timed, func, *args, **kwargs)
+        done, _ = wait([first, hedge], return_when=FIRST_COMPLETED)
+        winner = first if first in done else hedge
+        loser = hedge if winner is first else first
+        if winner.exception() is not None:
+            winner, loser = loser, winner
+            wait([winner])
+        HEDGES.inc(winner='first' if winner is first else 'hedge')
+        if discard is not None:
+            loser.add_done_callback(
+                lambda future: future.exception() is None
+                and discard(future.result()))
+        return winner.result()
+
+    async def _async_timed(self, factory):
+        started = self.clock()
+        result = await factory()
+        self.window.add(self.clock() - started)
+        return result
+
+    async def async_call(self, factory):
+        """Ожидает корутину `factory()`, страхуя её второй такой же."""
+        delay = self.delay()
+        if delay is None:
+            return await self._async_timed(factory)
+        first = asyncio.ensure_future(self._async_timed(factory))
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            return first.result()
+        hedge = asyncio.ensure_future(self._async_timed(factory))
+        done, _ = await asyncio.wait(
+            [first, hedge], return_when=asyncio.FIRST_COMPLETED)
+        winner = first if first in done else hedge
+        loser = hedge if winner is first else first
+        if winner.exception() is not None:
+            winner, loser = loser, winner
+            await asyncio.wait([winner])
+        else:
+            loser.cancel()
+        loser.add_done_callback(
+            lambda task: task.cancelled() or task.exception())
+        HEDGES.inc(winner='first' if winner is first else 'hedge')
+        return winner.result()
+
+    def close(self):
+        """Останавливает пул потоков."""
+        self._executor.shutdown(wait=False)
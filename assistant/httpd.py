@@ -0,0 +1,41 @@
+"""Небольшой HTTP-сервер для служебных страниц бота."""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is None:
+            status, content_type, body = 404, 'text/plain', 'not found\n'
+        else:
+            status, content_type, body = route()
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, routes, host='127.0.0.1'):
+    """Запускает сервер в фоновом потоке.
+
+    `routes` сопоставляет путь функции без аргументов, которая
+    возвращает кортеж `(код, Content-Type, тело)`.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.routes = dict(routes)
+    thread = threading.Thread(
+        target=server.serve_forever, name='httpd', daemon=True)
+    thread.start()
+    logger.info('Служебный HTTP-сервер на %s:%s', host, server.server_port)
+    return server
@@ -0,0 +1,30 @@
+"""Отложенный импорт тяжёлых зависимостей.
+
+`telegram`, `requests`, `aiohttp` и `asyncio` вместе импортируются больше
+полусекунды, а многим запускам нужна лишь часть из них. `lazy_import`
+регистрирует модуль сразу, но выполняет его код при первом обращении
+к атрибуту, поэтому импорт бота стоит миллисекунды.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Модуль `name`, загружаемый при первом обращении к атрибуту.
+
+    Уже импортированный модуль возвращается как есть, отсутствующий -
+    как None, так что `lazy_import` заменяет `try: import ... except
+    ImportError` для необязательных зависимостей.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
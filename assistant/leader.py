@@ -0,0 +1,222 @@
+"""Выбор ведущего процесса среди горячих резервных копий бота.
+
+Копии бота на одном хосте соревнуются за аренду: опрашивает API и
+отправляет сообщения только ведущий, который продлевает аренду каждые
+`ttl / 3` секунд. Резервная копия с тем же интервалом пытается её
+захватить и становится ведущей через несколько секунд после того, как
+аренда истекла. Хранилище аренды выбирается по имени из `LEASES`.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from assistant.lazy import lazy_import
+from assistant.metrics import LEADER
+
+fcntl = lazy_import('fcntl')
+
+logger = logging.getLogger(__name__)
+
+LEASE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+'''
+
+
+def default_holder():
+    """Имя процесса в аренде: хост и PID."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class SQLiteLease:
+    """Аренда - строка таблицы `leases` с владельцем и сроком.
+
+    Захват и продление - одна транзакция `BEGIN IMMEDIATE`, поэтому две
+    копии не могут захватить аренду одновременно. Зависший ведущий
+    теряет аренду через `ttl` секунд.
+    """
+
+    def __init__(self, path, name='leader', clock=time.time):
+        """Аренда в базе SQLite по пути `path`."""
+        self.name = name
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(LEASE_SCHEMA)
+
+    def acquire(self, holder, ttl):
+        """Захватывает или продлевает аренду на `ttl` секунд."""
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = self.clock()
+                row = conn.execute(
+                    'SELECT holder, expires FROM leases WHERE name = ?',
+                    (self.name,)).fetchone()
+                if row is not None and row[0] != holder and row[1] > now:
+                    return False
+                conn.execute(
+                    'INSERT OR REPLACE INTO leases (name, holder, expires) '
+                    'VALUES (?, ?, ?)', (self.name, holder, now + ttl))
+                return True
+            finally:
+                conn.execute('COMMIT')
+
+    def release(self, holder):
+        """Отдаёт аренду, если она принадлежит `holder`."""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM leases WHERE name = ? AND holder = ?',
+                (self.name, holder))
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+
+class FileLease:
+    """Аренда - эксклюзивная блокировка `flock` файла.
+
+    Блокировку снимает ядро, когда процесс завершается, поэтому после
+    падения ведущего резервная копия захватывает её при следующей
+    попытке; `ttl` не используется. Зависший, но живой ведущий
+    блокировку не теряет - для этого нужен `SQLiteLease`.
+    """
+
+    def __init__(self, path):
+        """Аренда через блокировку файла `path`."""
+        if fcntl is None:
+            raise RuntimeError('Блокировка файлов недоступна на этой ОС')
+        self.path = path
+        self._file = None
+
+    def acquire(self, holder, ttl):
+        """Захватывает блокировку без ожидания; True, если она у нас."""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(holder)
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self, holder):
+        """Снимает блокировку."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Снимает блокировку, если она захвачена."""
+        self.release(None)
+
+
+LEASES = {
+    'sqlite': SQLiteLease,
+    'file': FileLease,
+}
+
+
+def make_lease(name, path):
+    """Создаёт хранилище аренды по имени из `LEASES`."""
+    try:
+        lease_class = LEASES[name]
+    except KeyError:
+        raise ValueError(f'Неизвестное хранилище аренды - {name}')
+    return lease_class(path)
+
+
+class LeaderElector:
+    """Держит аренду `lease` за процессом `holder`.
+
+    `wait_for_leadership` ждёт захвата аренды, затем фоновый поток
+    продлевает её. Если продлить не удалось, вызывается `on_lost`:
+    другой процесс уже мог стать ведущим, и этот должен остановиться.
+    """
+
+    def __init__(self, lease, ttl=15, holder=None, on_lost=None):
+        """Выборы через аренду `lease` со сроком `ttl` секунд."""
+        self.lease = lease
+        self.ttl = ttl
+        self.interval = ttl / 3
+        self.holder = holder or default_holder()
+        self.on_lost = on_lost
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+        LEADER.set(0)
+
+    def try_acquire(self):
+        """Одна попытка захватить или продлить аренду."""
+        try:
+            acquired = self.lease.acquire(self.holder, self.ttl)
+        except (OSError, sqlite3.Error) as error:
+            logger.error('Не удалось обновить аренду: %s', error)
+            acquired = False
+        self.is_leader = acquired
+        LEADER.set(int(acquired))
+        return acquired
+
+    def wait_for_leadership(self, wait):
+        """Пытается захватить аренду раз в `interval` секунд.
+
+        `wait(timeout)` возвращает True, если ждать дальше не нужно,
+        например `Shutdown.wait`. Возвращает True, когда процесс стал
+        ведущим, и False, если ожидание прервано.
+        """
+        logger.info('Процесс %s в резерве', self.holder)
+        while not self.try_acquire():
+            if wait(self.interval):
+                return False
+        logger.info('Процесс %s стал ведущим', self.holder)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._renew, name='leader-lease', daemon=True)
+        self._thread.start()
+        return True
+
+    def _renew(self):
+        while not self._stop.wait(self.interval):
+            if not self.try_acquire():
+                logger.critical(
+                    'Процесс %s потерял аренду ведущего', self.holder)
+                if self.on_lost is not None:
+                    self.on_lost()
+                return
+
+    def release(self):
+        """Останавливает продление и отдаёт аренду."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.is_leader:
+            self.lease.release(self.holder)
+            self.is_leader = False
+            LEADER.set(0)
+        self.lease.close()
+
+    def __enter__(self):
+        """Возвращает выборы для `with`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Освобождает аренду."""
+        self.release()
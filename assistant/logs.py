@@ -0,0 +1,124 @@
+"""Неблокирующее структурированное логирование.
+
+Вызовы логгера в цикле опроса только кладут запись в очередь: сообщение
+форматируется и пишется в поток вывода фоновым потоком `QueueListener`,
+поэтому медленный stdout или всплеск логов не задерживают опросы. Если
+очередь переполнена, запись отбрасывается и учитывается в
+`bot_log_dropped_total`. `SamplingFilter` пропускает только каждую N-ю
+запись одного типа ниже WARNING.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+
+from assistant.metrics import REGISTRY
+
+LOG_DROPPED = REGISTRY.counter(
+    'bot_log_dropped_total', 'Записи лога, отброшенные из-за полной очереди.')
+TEXT_FORMAT = (
+    '%(asctime)s, %(levelname)s, %(message)s, %(funcName)s, %(lineno)d')
+
+# Атрибуты, которые есть у любой записи: всё остальное пришло в `extra`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord(
+    '', 0, '', 0, '', (), None, None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON, поля из `extra` - на верхнем уровне."""
+
+    def format(self, record):
+        """Сериализует запись в JSON."""
+        entry = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'func': record.funcName,
+            'line': record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую `every`-ю запись одного типа ниже WARNING.
+
+    Тип записи - её шаблон `record.msg` до подстановки аргументов.
+    `overrides` задаёт свой шаг для отдельных шаблонов; шаг 1 пропускает
+    все записи. Предупреждения и ошибки не прореживаются.
+    """
+
+    def __init__(self, every=1, overrides=None):
+        """Пропускает каждую `every`-ю запись, `overrides` - по логгерам."""
+        super().__init__()
+        self.every = every
+        self.overrides = dict(overrides or {})
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Пропускает ли запись `record`."""
+        if record.levelno >= logging.WARNING:
+            return True
+        every = self.overrides.get(record.msg, self.every)
+        if every <= 1:
+            return True
+        with self._lock:
+            seen = self._seen.get(record.msg, 0)
+            self._seen[record.msg] = seen + 1
+        return seen % every == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """`QueueHandler`, который не ждёт и не форматирует в потоке вызова.
+
+    Запись уходит в очередь как есть, сообщение строит слушатель. При
+    полной очереди запись отбрасывается.
+    """
+
+    def prepare(self, record):
+        """Запись без форматирования: сообщение построит слушатель."""
+        return record
+
+    def enqueue(self, record):
+        """Ставит запись в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def make_formatter(fmt='text'):
+    """Форматтер для `fmt`: `text` или `json`."""
+    if fmt == 'json':
+        return JSONFormatter()
+    if fmt == 'text':
+        return logging.Formatter(TEXT_FORMAT)
+    raise ValueError(f'Неизвестный формат логов {fmt}')
+
+
+def start_queue_logging(loggers, handler, maxsize=10000, sampling=None):
+    """Направляет `loggers` в `handler` через очередь с фоновым слушателем.
+
+    Фильтр `sampling` применяется до постановки в очередь. Возвращает
+    запущенный `QueueListener`; `listener.stop()` дописывает оставшиеся
+    в очереди записи.
+    """
+    records = queue.Queue(maxsize)
+    queue_handler = DroppingQueueHandler(records)
+    if sampling is not None:
+        queue_handler.addFilter(sampling)
+    for logger in loggers:
+        logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(
+        records, handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,224 @@
+"""Метрики бота в текстовом формате Prometheus."""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labelnames, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'Метрика {self.name} ожидает метки {self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        labels = _format_labels(self.labelnames, key)
+        return [f'{self.name}{labels} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Текущее значение счётчика."""
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """Устанавливает значение."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        """Текущее значение."""
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам `buckets`."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        """Гистограмма с границами корзин `buckets`."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Добавляет наблюдение."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                data[0][index] += 1
+            data[1] += 1
+            data[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Измеряет длительность блока `with`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """Число наблюдений."""
+        data = self._values.get(self._key(labels))
+        return data[1] if data else 0
+
+    def _render_value(self, key, value):
+        counts, total, summary = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _format_labels(
+                self.labelnames, key, f'le="{_format_value(float(bound))}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+        lines.append(f'{self.name}_bucket{labels} {total}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(summary)}')
+        lines.append(f'{self.name}_count{labels} {total}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Пустой реестр."""
+        self._metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику в реестр."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        """Создаёт и регистрирует `Counter`."""
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        """Создаёт и регистрирует `Gauge`."""
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        """Создаёт и регистрирует `Histogram`."""
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+API_LATENCY = REGISTRY.histogram(
+    'bot_api_request_seconds', 'Длительность запроса к API Практикума.')
+API_RESPONSES = REGISTRY.counter(
+    'bot_api_responses_total', 'Ответы API Практикума по HTTP-коду.',
+    ('code',))
+STAGE_LATENCY = REGISTRY.histogram(
+    'bot_stage_seconds', 'Длительность этапов обработки ответа API.',
+    ('stage',), buckets=(
+        0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
+SEND_LATENCY = REGISTRY.histogram(
+    'bot_send_seconds', 'Длительность отправки сообщения в Telegram.')
+POLLS = REGISTRY.counter('bot_polls_total', 'Запросы к API Практикума.')
+CHANGES = REGISTRY.counter(
+    'bot_status_changes_total', 'Изменения статусов домашних работ.')
+SENDS = REGISTRY.counter(
+    'bot_sends_total', 'Отправки сообщений в Telegram.', ('result',))
+ERRORS = REGISTRY.counter(
+    'bot_errors_total', 'Сбои циклов опроса по типу исключения.', ('type',))
+BREAKER_STATE = REGISTRY.gauge(
+    'bot_breaker_state',
+    'Состояние выключателя: 0 - закрыт, 1 - полуоткрыт, 2 - открыт.',
+    ('name',))
+STARTUP_SECONDS = REGISTRY.gauge(
+    'bot_startup_seconds', 'Время от импорта бота до конца этапа запуска.',
+    ('stage',))
+SCHEDULER_LAG = REGISTRY.gauge(
+    'bot_scheduler_lag_seconds',
+    'На сколько последний цикл опроса начался позже плана.')
+HEDGES = REGISTRY.counter(
+    'bot_hedged_requests_total',
+    'Страхующие запросы к API: какой из двух ответил первым.', ('winner',))
+QUARANTINED = REGISTRY.gauge(
+    'bot_quarantined_tenants',
+    'Студенты, чьи учётные данные отклонены при запуске.')
+LEADER = REGISTRY.gauge(
+    'bot_leader', 'Ведущий ли процесс: 1 - опрашивает API, 0 - резервный.')
+
+BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+def track_breaker(breaker):
+    """Публикует состояние выключателя в `bot_breaker_state`."""
+    def on_change(breaker, previous, state):
+        BREAKER_STATE.set(BREAKER_STATES[state], name=breaker.name)
+
+    BREAKER_STATE.set(BREAKER_STATES[breaker.state], name=breaker.name)
+    breaker.listeners.append(on_change)
+    return breaker
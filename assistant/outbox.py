@@ -0,0 +1,183 @@
+"""Очередь исходящих сообщений Telegram с ограничением частоты."""
+import logging
+import time
+from collections import deque
+
+from assistant.shutdown import Fenced
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30
+CHAT_INTERVAL = 1.0
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+
+class TokenBucket:
+    """Ведро токенов: не больше `rate` событий в секунду, всплеск `burst`."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        """Полное ведро на `burst` токенов, пополняемое `rate` в секунду."""
+        self.rate = rate
+        self.burst = burst or rate
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self, now):
+        if now <= self._updated:
+            return
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """Секунды до появления токена, 0 - если токен есть сейчас."""
+        now = self.clock()
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        paused = max(0.0, self._updated - now)
+        return paused + (1 - self._tokens) / self.rate
+
+    def take(self):
+        """Забирает токен, если он есть."""
+        self._refill(self.clock())
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def drain_until(self, moment):
+        """Не выдаёт токены до `moment`, например после ответа 429."""
+        self._tokens = 0.0
+        self._updated = max(self._updated, moment)
+
+
+class Outbox:
+    """Исходящие сообщения с лимитами Telegram и склейкой по чатам.
+
+    Сообщения, ждущие отправки в один чат, объединяются в одно
+    (в пределах 4096 символов). Общий лимит - `global_rate` сообщений в
+    секунду, в каждый чат - не чаще раза в `chat_interval` секунд. Ответ
+    429 с `retry_after` возвращает сообщение в начало очереди и
+    приостанавливает отправку на указанное время. Текст остальных ошибок
+    перед записью в лог проходит через `redact`.
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_interval=CHAT_INTERVAL,
+                 max_length=MAX_MESSAGE_LENGTH, clock=time.monotonic,
+                 redact=str):
+        """Пустая очередь с общим и початовым лимитами Telegram."""
+        self.clock = clock
+        self.redact = redact
+        self.chat_interval = chat_interval
+        self.max_length = max_length
+        self.bucket = TokenBucket(global_rate, clock=clock)
+        self._pending = {}
+        self._ready = deque()
+        self._next_allowed = {}
+
+    def __len__(self):
+        """Число чатов, которым есть что отправить."""
+        return len(self._pending)
+
+    def put(self, chat_id, text):
+        """Ставит сообщение в очередь чата `chat_id`."""
+        texts = self._pending.get(chat_id)
+        if texts is None:
+            self._pending[chat_id] = deque([text])
+            self._ready.append(chat_id)
+        else:
+            texts.append(text)
+
+    def _coalesce(self, texts):
+        parts = [texts.popleft()[:self.max_length]]
+        length = len(parts[0])
+        while texts and (length + len(SEPARATOR) + len(texts[0])
+                         <= self.max_length):
+            text = texts.popleft()
+            parts.append(text)
+            length += len(SEPARATOR) + len(text)
+        return SEPARATOR.join(parts)
+
+    def take(self):
+        """Следующее сообщение, которое можно отправить сейчас.
+
+        Возвращает пару `(chat_id, text)`, число секунд до готовности
+        ближайшего сообщения или None, если очередь пуста.
+        """
+        if not self._ready:
+            return None
+        global_wait = self.bucket.delay()
+        if global_wait > 0:
+            return global_wait
+        now = self.clock()
+        wait = None
+        for _ in range(len(self._ready)):
+            chat_id = self._ready.popleft()
+            chat_wait = self._next_allowed.get(chat_id, now) - now
+            if chat_wait > 0:
+                self._ready.append(chat_id)
+                wait = chat_wait if wait is None else min(wait, chat_wait)
+                continue
+            self.bucket.take()
+            texts = self._pending[chat_id]
+            text = self._coalesce(texts)
+            if texts:
+                self._ready.append(chat_id)
+            else:
+                del self._pending[chat_id]
+            self._next_allowed[chat_id] = now + self.chat_interval
+            return chat_id, text
+        return wait
+
+    def retry(self, chat_id, text, retry_after):
+        """Возвращает сообщение в очередь после ответа 429."""
+        resume = self.clock() + retry_after
+        texts = self._pending.get(chat_id)
+        if texts is None:
+            self._pending[chat_id] = deque([text])
+            self._ready.appendleft(chat_id)
+        else:
+            texts.appendleft(text)
+        self._next_allowed[chat_id] = resume
+        self.bucket.drain_until(resume)
+
+    def handle_error(self, chat_id, text, error):
+        """Повторяет сообщение после 429, иначе логирует и отбрасывает."""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            logger.warning('Telegram просит подождать %s с, чат %s',
+                           retry_after, chat_id)
+            self.retry(chat_id, text, retry_after)
+            return
+        logger.error('Не удалось отправить сообщение в Telegram. %s',
+                     self.redact(error))
+
+    def pump(self, deliver):
+        """Отправляет через `deliver` всё, что разрешают лимиты.
+
+        Возвращает секунды до следующей возможной отправки или None.
+        `Fenced` из `deliver` прерывает отправку: досылать нельзя.
+        """
+        while True:
+            item = self.take()
+            if not isinstance(item, tuple):
+                self._forget_idle_chats()
+                return item
+            try:
+                deliver(*item)
+            except Fenced:
+                raise
+            except Exception as error:
+                self.handle_error(*item, error)
+
+    def _forget_idle_chats(self):
+        now = self.clock()
+        if len(self._next_allowed) > 2 * len(self._pending) + 1024:
+            self._next_allowed = {
+                chat_id: moment
+                for chat_id, moment in self._next_allowed.items()
+                if moment > now
+            }
@@ -0,0 +1,56 @@
+"""Проверка учётных данных студентов при запуске.
+
+Неверный токен иначе обнаруживается только при первом опросе, через
+`RETRY_PERIOD`, и дальше каждый цикл тратит на него запрос. Проверки
+всех студентов выполняются параллельно в ограниченном пуле потоков.
+Студенты, чьи данные отклонены, отправляются на карантин и не
+опрашиваются до перезапуска. Сетевая ошибка или таймаут проверки не
+повод для карантина: такой студент остаётся в работе.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from assistant.metrics import QUARANTINED
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCredentials(Exception):
+    """Сервис отклонил учётные данные студента."""
+
+
+def probe_tenants(tenants, checks, workers=16, timeout=10, redact=str):
+    """Выполняет `checks` для каждого студента не дольше `timeout` секунд.
+
+    Проверка - функция от `Tenant`, которая выбрасывает
+    `InvalidCredentials`, если данные отклонены. Возвращает список
+    допущенных студентов и словарь причин карантина по имени студента.
+    Текст ошибок перед записью в лог проходит через `redact`, чтобы
+    убрать секреты, например токен из URL запроса.
+    """
+    tenants = list(tenants)
+    executor = ThreadPoolExecutor(workers, thread_name_prefix='probe')
+    futures = {
+        executor.submit(check, tenant): tenant
+        for tenant in tenants for check in checks
+    }
+    done, pending = wait(futures, timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+    quarantined = {}
+    for future in done:
+        tenant = futures[future]
+        error = future.exception()
+        if isinstance(error, InvalidCredentials):
+            quarantined.setdefault(tenant.name, []).append(redact(error))
+        elif error is not None:
+            logger.warning('Не удалось проверить данные студента: %s',
+                           redact(error), extra={'tenant': tenant.name})
+    if pending:
+        logger.warning('Проверка не успела за %s с для %s студентов', timeout,
+                       len({futures[future].name for future in pending}))
+    for name, reasons in quarantined.items():
+        logger.error('Студент на карантине: %s', '; '.join(reasons),
+                     extra={'tenant': name})
+    QUARANTINED.set(len(quarantined))
+    valid = [tenant for tenant in tenants if tenant.name not in quarantined]
+    return valid, quarantined
@@ -0,0 +1,86 @@
+"""Планировщики интервала между опросами API."""
+import random
+
+
+class Outcome:
+    """Итог цикла опроса, от которого зависит следующий интервал."""
+
+    IDLE = 'idle'
+    REVIEWING = 'reviewing'
+    ERROR = 'error'
+
+
+class FixedScheduler:
+    """Всегда ждёт один и тот же интервал, как раньше `RETRY_PERIOD`."""
+
+    def __init__(self, period):
+        """Планировщик с интервалом `period` секунд."""
+        self.period = period
+
+    def next_delay(self, key, outcome):
+        """Интервал до следующего опроса для `key`."""
+        return self.period
+
+
+class AdaptiveScheduler:
+    """Подстраивает интервал под состояние работ студента.
+
+    Пока работа на ревью, API опрашивается каждые `reviewing` секунд.
+    После ошибки интервал не короче `error_base` (по умолчанию `period`,
+    чтобы сбоящий API не опрашивался чаще обычного) и растёт
+    экспоненциально до `max_backoff` со случайным разбросом, чтобы
+    студенты не повторяли запросы одновременно. Без работ на проверке
+    интервал начинается с `period` и плавно растёт до `max_idle`; по
+    умолчанию `max_idle` равен `period`, чтобы новая работа на ревью
+    замечалась не позже, чем с `FixedScheduler`.
+    """
+
+    def __init__(self, period, reviewing=None, error_base=None,
+                 max_backoff=3600, max_idle=None, idle_growth=1.5,
+                 rng=random.random):
+        """Планировщик с базовым интервалом `period` секунд."""
+        self.period = period
+        self.reviewing = reviewing or period / 5
+        self.error_base = error_base or period
+        self.max_backoff = max(max_backoff, self.error_base)
+        self.max_idle = max_idle or period
+        self.idle_growth = idle_growth
+        self.rng = rng
+        self._failures = {}
+        self._idle = {}
+
+    def _backoff(self, key):
+        failures = self._failures.get(key, 0) + 1
+        self._failures[key] = failures
+        cap = min(self.max_backoff, self.error_base * 2 ** failures)
+        return max(self.error_base, cap / 2 + self.rng() * cap / 2)
+
+    def next_delay(self, key, outcome):
+        """Интервал до следующего опроса для `key`."""
+        if outcome == Outcome.ERROR:
+            self._idle.pop(key, None)
+            return self._backoff(key)
+        self._failures.pop(key, None)
+        if outcome == Outcome.REVIEWING:
+            self._idle.pop(key, None)
+            return self.reviewing
+        streak = self._idle.get(key, 0)
+        self._idle[key] = streak + 1
+        return min(self.max_idle, self.period * self.idle_growth ** streak)
+
+
+SCHEDULERS = {
+    'fixed': FixedScheduler,
+    'adaptive': AdaptiveScheduler,
+}
+
+
+def make_scheduler(name, period, **options):
+    """Создаёт планировщик по имени из `SCHEDULERS`."""
+    try:
+        scheduler_class = SCHEDULERS[name]
+    except KeyError:
+        raise ValueError(f'Неизвестный планировщик - {name}')
+    if scheduler_class is FixedScheduler:
+        return scheduler_class(period)
+    return scheduler_class(period, **options)
@@ -0,0 +1,129 @@
+"""Проверка элементов ответа API Практикума и записи работ.
+
+`compile_homework` один раз строит по словарю вердиктов валидатор,
+который за один проход по элементу `homeworks` проверяет его и
+превращает в запись `Homework`. Дальше по конвейеру - в индекс статусов,
+кэш команд и сообщения - идут только записи: поля уже проверены, а
+статус - один и тот же объект строки из ключей вердиктов.
+"""
+import sys
+
+
+class Homework:
+    """Работа из ответа API: только поля, которые нужны боту.
+
+    `key` - ключ работы в индексе статусов: `id`, а для старых ответов
+    без него - имя работы.
+    """
+
+    __slots__ = ('key', 'name', 'status', 'date_updated')
+
+    def __init__(self, key, name, status, date_updated=None):
+        """Запись с уже проверенными полями."""
+        self.key = key
+        self.name = name
+        self.status = status
+        self.date_updated = date_updated
+
+    def _fields(self):
+        return self.key, self.name, self.status, self.date_updated
+
+    def __eq__(self, other):
+        """Записи равны, если равны все их поля."""
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __repr__(self):
+        """Запись со всеми полями."""
+        return 'Homework(key={!r}, name={!r}, status={!r}, ' \
+            'date_updated={!r})'.format(*self._fields())
+
+
+REJECTIONS = (KeyError, TypeError, ValueError)
+
+
+class Homeworks(list):
+    """Записи работ из ответа API.
+
+    `rejected` - исключения для элементов, которые не прошли проверку:
+    одна некорректная работа не мешает обработать остальные.
+    """
+
+    __slots__ = ('rejected',)
+
+    def __init__(self, records=()):
+        """Список записей `records` без отклонённых элементов."""
+        super().__init__(records)
+        self.rejected = []
+
+
+def validate_homeworks(record, entries):
+    """`Homeworks` из элементов `entries`, проверенных валидатором `record`.
+
+    Исключения из `REJECTIONS` для отдельных элементов не прерывают
+    проверку, а попадают в `rejected`.
+    """
+    homeworks = Homeworks()
+    append = homeworks.append
+    for entry in entries:
+        try:
+            append(record(entry))
+        except REJECTIONS as error:
+            homeworks.rejected.append(error)
+    return homeworks
+
+
+def _rejection(entry, statuses):
+    """Исключение, объясняющее, чем элемент `homeworks` не подошёл."""
+    if not isinstance(entry, dict):
+        return TypeError('Работа в homeworks не является dict')
+    name = entry.get('homework_name')
+    if name is None:
+        return KeyError('Нет ключа homework_name в ответе API')
+    if not isinstance(name, str):
+        return TypeError('homework_name не является строкой')
+    status = entry.get('status')
+    if not isinstance(status, str) or status not in statuses:
+        return ValueError(f'Неизвестный статус работы - {status}')
+    if not isinstance(entry.get('date_updated'), (str, type(None))):
+        return TypeError('date_updated не является строкой')
+    return TypeError('id работы не является числом или строкой')
+
+
+def compile_homework(verdicts):
+    """Валидатор элемента `homeworks`: dict из ответа API в `Homework`.
+
+    Допустимые статусы - ключи `verdicts`. Элемент не того типа вызывает
+    TypeError, работа без имени - KeyError, неизвестный или
+    отсутствующий статус - ValueError. Корректный элемент проверяется
+    одним проходом по четырём полям без исключений и вызовов помимо
+    конструктора записи; причину отказа выясняет уже медленный путь.
+    """
+    statuses = {}
+    for status in verdicts:
+        status = sys.intern(status)
+        statuses[status] = status
+    known = statuses.get
+    record = Homework
+
+    def homework(entry):
+        if type(entry) is dict:
+            get = entry.get
+            name = get('homework_name')
+            status = get('status')
+            status = known(status) if type(status) is str else None
+            date_updated = get('date_updated')
+            key = get('id')
+            if type(key) is int:
+                key = str(key)
+            elif key is None:
+                key = name
+            if (type(name) is str and status is not None
+                    and type(key) is str
+                    and (date_updated is None
+                         or type(date_updated) is str)):
+                return record(key, name, status, date_updated)
+        raise _rejection(entry, statuses)
+
+    return homework
@@ -0,0 +1,207 @@
+"""Несколько процессов опроса с распределением студентов по кольцу хешей.
+
+Один процесс с блокирующим циклом занимает одно ядро. `Supervisor`
+запускает `count` рабочих процессов и делит между ними студентов
+консистентным хешированием: при изменении числа процессов переезжает
+лишь около `1 / count` студентов, и перезапускаются только процессы,
+чей набор изменился. Упавший процесс запускается заново.
+"""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import signal
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+REPLICAS = 64
+
+
+def _hash(key):
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования с `replicas` точками на узел."""
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Кольцо с `replicas` точками на каждый узел из `nodes`."""
+        self.replicas = replicas
+        self._points = []
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Добавляет узел на кольцо."""
+        for replica in range(self.replicas):
+            point = _hash(f'{node}#{replica}')
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._nodes.insert(index, node)
+
+    def node_for(self, key):
+        """Узел, которому принадлежит `key`."""
+        if not self._points:
+            raise ValueError('На кольце нет узлов')
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[index]
+
+
+def assign(tenants, count, replicas=REPLICAS):
+    """Делит студентов между `count` процессами: список списков."""
+    ring = HashRing(range(count), replicas)
+    shards = [[] for _ in range(count)]
+    for tenant in tenants:
+        shards[ring.node_for(tenant.name)].append(tenant)
+    return shards
+
+
+class Supervisor:
+    """Держит `count` рабочих процессов `target(index, tenants)`.
+
+    `check` перезапускает завершившиеся процессы не чаще раза в
+    `restart_delay` секунд на процесс. `resize` меняет число процессов:
+    сначала останавливаются процессы, потерявшие студентов, и только
+    затем запускаются новые, чтобы студента не опрашивали двое сразу.
+    Процессы останавливаются сигналом SIGTERM и получают `stop_timeout`
+    секунд на то, чтобы дослать сообщения; после `fence` - сразу SIGKILL.
+    """
+
+    def __init__(self, target, tenants, count, process_factory=None,
+                 restart_delay=1.0, stop_timeout=30, clock=time.monotonic):
+        """Раскладывает студентов `tenants` по `count` процессам."""
+        if count < 1:
+            raise ValueError('Нужен хотя бы один рабочий процесс')
+        self.target = target
+        self.tenants = list(tenants)
+        self.count = count
+        self.process_factory = (
+            process_factory or multiprocessing.get_context('spawn').Process)
+        self.restart_delay = restart_delay
+        self.stop_timeout = stop_timeout
+        self.clock = clock
+        self.shards = assign(self.tenants, count)
+        self._processes = {}
+        self._started = {}
+        self._wanted = count
+        self._fenced = False
+
+    def _start(self, index):
+        if not self.shards[index]:
+            logger.info('Процессу %s не досталось студентов', index)
+            return
+        process = self.process_factory(
+            target=self.target, args=(index, self.shards[index]),
+            name=f'shard-{index}', daemon=False)
+        process.start()
+        self._processes[index] = process
+        self._started[index] = self.clock()
+        logger.info('Процесс %s запущен: %s студентов, PID %s',
+                    index, len(self.shards[index]), process.pid)
+
+    def _stop(self, indexes):
+        processes = [self._processes.pop(index) for index in indexes
+                     if index in self._processes]
+        for process in processes:
+            if not process.is_alive():
+                continue
+            if self._fenced:
+                process.kill()
+            else:
+                process.terminate()
+        deadline = self.clock() + self.stop_timeout
+        for process in processes:
+            process.join(max(0, deadline - self.clock()))
+            if process.is_alive():
+                logger.warning('Процесс %s не остановился, завершаем',
+                               process.name)
+                process.kill()
+                process.join()
+
+    def start(self):
+        """Запускает все рабочие процессы."""
+        for index in range(self.count):
+            self._start(index)
+
+    def fence(self):
+        """Немедленно завершает процессы SIGKILL и больше не запускает их.
+
+        Безопасно вызывать из другого потока.
+        """
+        self._fenced = True
+        for process in list(self._processes.values()):
+            if process.is_alive():
+                process.kill()
+
+    def check(self):
+        """Перезапускает завершившиеся процессы; возвращает их индексы."""
+        restarted = []
+        if self._fenced:
+            return restarted
+        for index, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            if self.clock() - self._started[index] < self.restart_delay:
+                continue
+            logger.error('Процесс %s завершился с кодом %s, перезапуск',
+                         index, process.exitcode)
+            process.join()
+            self._start(index)
+            restarted.append(index)
+        return restarted
+
+    def resize(self, count):
+        """Запрашивает новое число процессов; применяет его `apply_resize`.
+
+        Безопасно вызывать из обработчика сигнала.
+        """
+        self._wanted = max(1, count)
+
+    def apply_resize(self):
+        """Перераспределяет студентов, если изменилось число процессов."""
+        if self._wanted == self.count:
+            return
+        shards = assign(self.tenants, self._wanted)
+        changed = [
+            index for index in range(max(self.count, self._wanted))
+            if index >= self._wanted or index >= self.count
+            or shards[index] != self.shards[index]
+        ]
+        logger.info('Процессов было %s, стало %s, перезапуск %s',
+                    self.count, self._wanted, changed)
+        self._stop(changed)
+        self.count, self.shards = self._wanted, shards
+        for index in changed:
+            if index < self.count:
+                self._start(index)
+
+    @contextmanager
+    def installed(self):
+        """SIGTTIN добавляет процесс, SIGTTOU убирает, как в gunicorn."""
+        handlers = {
+            signal.SIGTTIN: lambda signum, frame: self.resize(
+                self._wanted + 1),
+            signal.SIGTTOU: lambda signum, frame: self.resize(
+                self._wanted - 1),
+        }
+        previous = {signum: signal.signal(signum, handler)
+                    for signum, handler in handlers.items()}
+        try:
+            yield self
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def run(self, shutdown, interval=1.0):
+        """Следит за процессами до остановки через `shutdown`."""
+        self.start()
+        try:
+            while not shutdown.wait(interval):
+                self.apply_resize()
+                self.check()
+        finally:
+            self._stop(list(self._processes))
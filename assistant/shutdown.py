@@ -0,0 +1,130 @@
+"""Плавная остановка бота по SIGTERM и SIGINT.
+
+Сигнал только поднимает флаг: начатые опросы и отправки доводятся до
+конца, после чего цикл выходит, досылает очередь сообщений и сохраняет
+состояние. Ожидание между опросами прерывается сразу. Повторный сигнал
+завершает процесс немедленно.
+
+`Fence` - остановка без доводки: после потери аренды ведущего работу
+уже делает другой процесс, и этот не должен ни опрашивать, ни досылать
+сообщения, ни записывать состояние.
+"""
+import logging
+import signal
+import threading
+from contextlib import contextmanager
+
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownRequested(Exception):
+    """Сигнал остановки пришёл во время прерываемого ожидания."""
+
+
+class Fenced(Exception):
+    """Процессу запрещено продолжать работу."""
+
+
+class Fence:
+    """Запрет опросов, отправок и записи состояния.
+
+    `close` поднимает флаг и вызывает обработчики, после чего `check`
+    перед каждым действием вызывает `Fenced`.
+    """
+
+    def __init__(self):
+        """Работа ещё разрешена."""
+        self.event = threading.Event()
+        self._callbacks = []
+
+    @property
+    def closed(self):
+        """Запрещена ли работа."""
+        return self.event.is_set()
+
+    def close(self):
+        """Запрещает работу."""
+        if self.closed:
+            return
+        self.event.set()
+        for callback in self._callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Вызывает `callback` при запрете работы."""
+        self._callbacks.append(callback)
+
+    def check(self):
+        """Вызывает `Fenced`, если работа запрещена."""
+        if self.closed:
+            raise Fenced('Процесс больше не ведущий, работа запрещена')
+
+
+class Shutdown:
+    """Флаг остановки, который поднимают обработчики сигналов."""
+
+    def __init__(self):
+        """Остановка ещё не запрошена."""
+        self.event = threading.Event()
+        self._interruptible = False
+        self._callbacks = []
+
+    @property
+    def requested(self):
+        """Запрошена ли остановка."""
+        return self.event.is_set()
+
+    def request(self):
+        """Запрашивает остановку."""
+        if self.requested:
+            return
+        self.event.set()
+        for callback in self._callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Вызывает `callback` при запросе остановки."""
+        self._callbacks.append(callback)
+
+    def wait(self, timeout):
+        """Ждёт `timeout` секунд; True, если запрошена остановка."""
+        return self.event.wait(timeout)
+
+    def handle(self, signum, frame):
+        """Обработчик сигнала для `signal.signal`."""
+        name = signal.Signals(signum).name
+        if self.requested:
+            logger.warning('Повторный %s, немедленная остановка', name)
+            raise SystemExit(128 + signum)
+        logger.info('Получен %s, завершаем работу', name)
+        self.request()
+        if self._interruptible:
+            raise ShutdownRequested(name)
+
+    @contextmanager
+    def interruptible(self):
+        """Блок, который сигнал остановки прерывает `ShutdownRequested`.
+
+        Нужен для `time.sleep` в главном потоке: остальное время сигнал
+        только поднимает флаг.
+        """
+        if self.requested:
+            raise ShutdownRequested()
+        self._interruptible = True
+        try:
+            yield
+        finally:
+            self._interruptible = False
+
+    @contextmanager
+    def installed(self, signals=SIGNALS):
+        """Устанавливает обработчики сигналов на время блока."""
+        previous = {
+            signum: signal.signal(signum, self.handle) for signum in signals}
+        try:
+            yield self
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
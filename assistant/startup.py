@@ -0,0 +1,36 @@
+"""Отчёт о длительности этапов запуска бота."""
+import time
+
+# Бот импортирует этот модуль первым, так что отсчёт запуска включает
+# импорт остальных модулей.
+IMPORTED = time.perf_counter()
+
+
+class StartupReport:
+    """Время от `started` до конца каждого этапа запуска.
+
+    С `gauge` длительность этапа публикуется и в метрику с меткой
+    `stage`.
+    """
+
+    def __init__(self, gauge=None, clock=time.perf_counter,
+                 started=IMPORTED):
+        """Отсчёт этапов от момента `started`."""
+        self.gauge = gauge
+        self.clock = clock
+        self.started = started
+        self.stages = []
+
+    def mark(self, stage):
+        """Отмечает конец этапа `stage` и возвращает прошедшее время."""
+        elapsed = self.clock() - self.started
+        self.stages.append((stage, elapsed))
+        if self.gauge is not None:
+            self.gauge.set(elapsed, stage=stage)
+        return elapsed
+
+    def __str__(self):
+        """Этапы с длительностями для лога."""
+        return ', '.join(
+            f'{stage} {elapsed * 1000:.1f} мс'
+            for stage, elapsed in self.stages)
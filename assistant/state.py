@@ -0,0 +1,119 @@
+"""Постоянное хранилище курсоров и статусов работ студентов."""
+import sqlite3
+import threading
+from collections import namedtuple
+
+StoredState = namedtuple(
+    'StoredState', ('timestamp', 'last_message', 'homeworks'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursors (
+    tenant TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    last_message TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS homeworks (
+    tenant TEXT NOT NULL,
+    homework_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date_updated TEXT,
+    PRIMARY KEY (tenant, homework_id)
+) WITHOUT ROWID;
+'''
+
+
+class SQLiteStateStore:
+    """Хранит курсор, последнее сообщение и статусы работ в SQLite.
+
+    База открывается в режиме WAL: запись цикла - одна короткая
+    транзакция, а чтение при старте не блокирует запись.
+    """
+
+    def __init__(self, path):
+        """Открывает базу `path` и создаёт таблицы."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(SCHEMA)
+
+    def load_all(self):
+        """Состояния всех студентов: два запроса при любом их числе."""
+        with self._lock:
+            cursors = self._conn.execute(
+                'SELECT tenant, timestamp, last_message FROM cursors'
+            ).fetchall()
+            rows = self._conn.execute(
+                'SELECT tenant, homework_id, status, date_updated '
+                'FROM homeworks'
+            ).fetchall()
+        states = {
+            tenant: StoredState(timestamp, last_message, {})
+            for tenant, timestamp, last_message in cursors
+        }
+        for tenant, homework_id, status, date_updated in rows:
+            if tenant in states:
+                states[tenant].homeworks[homework_id] = (status, date_updated)
+        return states
+
+    def load(self, tenant):
+        """Состояние одного студента или None."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT timestamp, last_message FROM cursors '
+                'WHERE tenant = ?', (tenant,)
+            ).fetchone()
+            if cursor is None:
+                return None
+            rows = self._conn.execute(
+                'SELECT homework_id, status, date_updated FROM homeworks '
+                'WHERE tenant = ?', (tenant,)
+            ).fetchall()
+        homeworks = {
+            homework_id: (status, date_updated)
+            for homework_id, status, date_updated in rows
+        }
+        return StoredState(cursor[0], cursor[1], homeworks)
+
+    def save(self, tenant, timestamp, last_message, homeworks=None):
+        """Атомарно сохраняет итог цикла и изменившиеся статусы работ."""
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN')
+            try:
+                conn.execute(
+                    'INSERT INTO cursors (tenant, timestamp, last_message) '
+                    'VALUES (?, ?, ?) ON CONFLICT (tenant) DO UPDATE SET '
+                    'timestamp = excluded.timestamp, '
+                    'last_message = excluded.last_message',
+                    (tenant, timestamp, last_message),
+                )
+                if homeworks:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO homeworks '
+                        '(tenant, homework_id, status, date_updated) '
+                        'VALUES (?, ?, ?, ?)',
+                        [(tenant, homework_id, status, date_updated)
+                         for homework_id, (status, date_updated)
+                         in homeworks.items()],
+                    )
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        """Возвращает хранилище для `with`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает базу."""
+        self.close()
@@ -0,0 +1,154 @@
+"""Потоковый разбор ответа API Практикума.
+
+`HomeworkStream` читает тело ответа кусками и отдаёт элементы массива
+`homeworks` по одному, не собирая в памяти ни весь текст ответа, ни весь
+список работ: пиковая память определяется размером одной работы.
+"""
+import codecs
+import json
+import re
+
+from assistant.schema import REJECTIONS
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class HomeworkStream:
+    """Итератор по работам из тела ответа, поступающего кусками `chunks`.
+
+    Проверки те же, что в `check_response`: ответ - объект с ключами
+    `homeworks` (список) и `current_date`, но выполняются по мере чтения,
+    отсутствие ключей обнаруживается в конце. Каждая работа должна быть
+    объектом; `record`, например валидатор из `compile_homework`,
+    превращает её в запись сразу после разбора, а отклонённые им работы
+    пропускаются с исключением в `rejected`. `current_date` и
+    `rejected` полны после полного прохода. `close` вызывается по
+    окончании прохода, в том числе при ошибке.
+    """
+
+    def __init__(self, chunks, close=None, max_item_size=MAX_ITEM_SIZE,
+                 record=None):
+        """Поток работ из частей тела ответа `chunks`."""
+        self.chunks = iter(chunks)
+        self.close = close
+        self.record = record
+        self.max_item_size = max_item_size
+        self.current_date = None
+        self.rejected = []
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        """Работы из `homeworks` по мере чтения тела ответа."""
+        try:
+            yield from self._parse()
+        finally:
+            if self.close is not None:
+                self.close()
+
+    def _fill(self):
+        """Дочитывает следующий кусок; False, если данных больше нет."""
+        if self._eof:
+            return False
+        data = ''
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._text.decode(chunk)
+            if chunk:
+                data = chunk
+                break
+        else:
+            self._eof = True
+            data = self._text.decode(b'', final=True)
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        if len(self._buffer) > self.max_item_size:
+            raise ValueError('Слишком большой элемент в ответе API')
+        return bool(data) or not self._eof
+
+    def _peek(self):
+        """Следующий значащий символ или пустая строка в конце ответа."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars or not char:
+            raise ValueError(
+                f'Некорректный JSON в ответе API: ожидался "{chars}"')
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Разбирает одно JSON-значение, дочитывая ответ при нехватке."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(
+                    self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Число в конце буфера может продолжаться в следующем куске.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _parse(self):
+        if self._peek() != '{':
+            raise TypeError('Ответ API не является dict')
+        self._pos += 1
+        seen = set()
+        if self._peek() != '}':
+            while True:
+                key = self._value()
+                if not isinstance(key, str):
+                    raise ValueError('Некорректный JSON в ответе API')
+                self._expect(':')
+                if key == 'homeworks':
+                    yield from self._homeworks()
+                elif key == 'current_date':
+                    self.current_date = self._value()
+                else:
+                    self._value()
+                seen.add(key)
+                if self._expect(',}') == '}':
+                    break
+        else:
+            self._pos += 1
+        if not {'homeworks', 'current_date'} <= seen:
+            raise KeyError('Нет ключа homeworks в ответе API')
+
+    def _homeworks(self):
+        if self._peek() != '[':
+            raise TypeError('homeworks не является list')
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            homework = self._value()
+            if self.record is not None:
+                try:
+                    homework = self.record(homework)
+                except REJECTIONS as error:
+                    self.rejected.append(error)
+                    homework = None
+            elif not isinstance(homework, dict):
+                raise TypeError('Работа в homeworks не является dict')
+            if homework is not None:
+                yield homework
+            if self._expect(',]') == ']':
+                return
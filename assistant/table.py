@@ -0,0 +1,142 @@
+"""Компактное хранение состояния работ в колонках.
+
+Словарь и кортеж на каждую работу стоят сотни байт: ключи словаря,
+строки статуса и даты в ISO-формате. `HomeworkTable` держит по работе
+строку в колонках: код статуса - байт в `array('B')`, дата обновления -
+секунды эпохи в `array('q')`, имя работы - ссылка на интернированную
+строку. Словарь `rows` остаётся только для поиска строки по ключу работы
+за O(1).
+"""
+import calendar
+import sys
+import time
+from array import array
+from datetime import datetime
+
+from assistant.schema import Homework
+
+# Коды статусов общие для всех таблиц процесса: статусов единицы.
+_STATUSES = []
+_CODES = {}
+
+NO_DATE = 0
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def status_code(status):
+    """Код статуса `status`; новый статус получает следующий код."""
+    code = _CODES.get(status)
+    if code is None:
+        if len(_STATUSES) > 255:
+            raise ValueError(f'Слишком много статусов работ: {status}')
+        code = _CODES[status] = len(_STATUSES)
+        _STATUSES.append(sys.intern(status))
+    return code
+
+
+def to_epoch(date_updated):
+    """Дата ISO 8601 в секунды эпохи; `NO_DATE` без даты или при ошибке.
+
+    Формат API `2020-02-13T14:40:57Z` разбирается без `strptime`.
+    """
+    if not date_updated:
+        return NO_DATE
+    if len(date_updated) == 20 and date_updated[-1] == 'Z':
+        try:
+            return calendar.timegm((
+                int(date_updated[0:4]), int(date_updated[5:7]),
+                int(date_updated[8:10]), int(date_updated[11:13]),
+                int(date_updated[14:16]), int(date_updated[17:19])))
+        except ValueError:
+            return NO_DATE
+    try:
+        moment = datetime.fromisoformat(date_updated.replace('Z', '+00:00'))
+    except ValueError:
+        return NO_DATE
+    return int(calendar.timegm(moment.utctimetuple()))
+
+
+def to_iso(epoch):
+    """Секунды эпохи в дату формата API; None для `NO_DATE`."""
+    if epoch == NO_DATE:
+        return None
+    return time.strftime(ISO_FORMAT, time.gmtime(epoch))
+
+
+class HomeworkTable:
+    """Статусы, даты и, с `names`, имена работ одного студента.
+
+    Строки только добавляются и обновляются. Даты хранятся с точностью
+    до секунды, поэтому `get` возвращает дату в формате API, а не
+    исходную строку.
+    """
+
+    __slots__ = ('rows', 'codes', 'dates', 'names')
+
+    def __init__(self, names=False):
+        """Пустая таблица, с `names` - с колонкой имён работ."""
+        self.rows = {}
+        self.codes = array('B')
+        self.dates = array('q')
+        self.names = [] if names else None
+
+    def __len__(self):
+        """Число работ."""
+        return len(self.rows)
+
+    def __contains__(self, key):
+        """Есть ли работа `key`."""
+        return key in self.rows
+
+    def put(self, key, status, date_updated=None, name=None):
+        """Записывает работу `key`; возвращает её прежний статус или None."""
+        code = status_code(status)
+        epoch = to_epoch(date_updated)
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = len(self.codes)
+            self.codes.append(code)
+            self.dates.append(epoch)
+            if self.names is not None:
+                self.names.append(None if name is None else sys.intern(name))
+            return None
+        previous = _STATUSES[self.codes[row]]
+        self.codes[row] = code
+        self.dates[row] = epoch
+        if self.names is not None and name is not None:
+            self.names[row] = sys.intern(name)
+        return previous
+
+    def status(self, key):
+        """Статус работы `key` или None, если её нет."""
+        row = self.rows.get(key)
+        return None if row is None else _STATUSES[self.codes[row]]
+
+    def epoch(self, key):
+        """Дата обновления работы `key` в секундах эпохи или `NO_DATE`."""
+        row = self.rows.get(key)
+        return NO_DATE if row is None else self.dates[row]
+
+    def get(self, key):
+        """Пара `(статус, дата)` работы `key` или None."""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return _STATUSES[self.codes[row]], to_iso(self.dates[row])
+
+    def items(self):
+        """Пары `(ключ, (статус, дата))` всех работ."""
+        for key in self.rows:
+            yield key, self.get(key)
+
+    def records(self, newest_first=False):
+        """Работы записями `Homework`, с `newest_first` - по убыванию даты."""
+        rows = self.rows.items()
+        if newest_first:
+            rows = sorted(rows, key=lambda item: self.dates[item[1]],
+                          reverse=True)
+        names = self.names or ()
+        for key, row in rows:
+            yield Homework(
+                key, names[row] if names else None,
+                _STATUSES[self.codes[row]], to_iso(self.dates[row]))
@@ -0,0 +1,66 @@
+"""Реестр студентов: токен Практикума и чат Телеграма для каждого."""
+import json
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Студент, для которого бот отслеживает домашние работы."""
+
+    name: str
+    practicum_token: str
+    chat_id: str
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API Практикума для студента."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+def _tenant_from_dict(data):
+    """Создаёт `Tenant` из словаря с описанием студента."""
+    if not isinstance(data, dict):
+        raise TypeError('Описание студента не является dict')
+    missing = [key for key in ('practicum_token', 'chat_id')
+               if not data.get(key)]
+    if missing:
+        raise KeyError(f'Нет ключей {missing} в описании студента')
+    return Tenant(
+        name=str(data.get('name') or data['chat_id']),
+        practicum_token=str(data['practicum_token']),
+        chat_id=str(data['chat_id']),
+    )
+
+
+def parse_tenants(raw):
+    """Разбирает JSON-список студентов."""
+    data = json.loads(raw)
+    if not isinstance(data, list):
+        raise TypeError('Список студентов не является list')
+    tenants = [_tenant_from_dict(item) for item in data]
+    names = [tenant.name for tenant in tenants]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f'Повторяются имена студентов: {duplicates}')
+    return tenants
+
+
+def load_tenants(path=None, environ=None):
+    """Загружает студентов из файла, переменной TENANTS или SECRET_*.
+
+    Файл и переменная `TENANTS` содержат JSON-список объектов с ключами
+    `name`, `practicum_token` и `chat_id`. Без них бот работает для одного
+    студента из `SECRET_PRACTICUM_TOKEN` и `SECRET_TELEGRAM_CHAT_ID`.
+    """
+    environ = os.environ if environ is None else environ
+    if path:
+        with open(path, encoding='utf-8') as tenants_file:
+            return parse_tenants(tenants_file.read())
+    if environ.get('TENANTS'):
+        return parse_tenants(environ['TENANTS'])
+    token = environ.get('SECRET_PRACTICUM_TOKEN')
+    chat_id = environ.get('SECRET_TELEGRAM_CHAT_ID')
+    if not (token and chat_id):
+        return []
+    return [Tenant(name='default', practicum_token=token, chat_id=chat_id)]
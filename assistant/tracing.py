@@ -0,0 +1,302 @@
+"""Трассировка циклов опроса в локальный файл.
+
+Цикл опроса и отправка в Telegram - корневые спаны (`Tracer.trace`),
+этапы внутри них - вложенные (`span`): подключение и TLS, запрос к API,
+разбор JSON, `check_response`, `parse_status`. Корневой спан помечен
+студентом, `parse_status` - id работы. Текущий спан хранится в
+`contextvars`, поэтому вложенность верна и для конкурентных циклов
+asyncio.
+
+В файл попадает доля `sample` циклов, а с `slow` - ещё и каждый цикл
+дольше `slow` секунд: спаны такого цикла копятся в памяти и выгружаются
+только по его окончании. Без выгрузчика и вне трассы `span` ничего не
+записывает, так что выключенная трассировка стоит один вызов
+`ContextVar.get` на этап.
+"""
+import contextvars
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+SERVICE_NAME = 'bot-assistant'
+
+logger = logging.getLogger(__name__)
+
+_CURRENT = contextvars.ContextVar('span', default=None)
+
+
+class Trace:
+    """Законченные спаны одного корневого этапа."""
+
+    __slots__ = ('trace_id', 'number', 'clock', 'spans')
+
+    def __init__(self, number, clock):
+        """Трасса с номером `number` и случайным id."""
+        self.trace_id = os.urandom(16).hex()
+        self.number = number
+        self.clock = clock
+        self.spans = []
+
+
+class Span:
+    """Этап цикла: имя, метки и время начала и конца в наносекундах."""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attrs',
+                 'start', 'end')
+
+    def __init__(self, trace, name, attrs, parent_id=None):
+        """Начинает спан `name` в трассе `trace`."""
+        self.trace = trace
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = trace.clock()
+        self.end = None
+
+    @property
+    def duration(self):
+        """Длительность законченного спана в секундах."""
+        return (self.end - self.start) / 1e9
+
+    def set(self, **attrs):
+        """Добавляет метки спану."""
+        self.attrs.update(attrs)
+
+    def finish(self, error=None):
+        """Заканчивает спан; `error` помечает его типом исключения."""
+        self.end = self.trace.clock()
+        if error is not None:
+            self.attrs['error'] = type(error).__name__
+        self.trace.spans.append(self)
+
+
+class _NoopSpan:
+    """Спан вне трассы: метки и окончание игнорируются.
+
+    Сам себе контекстный менеджер, поэтому выключенная трассировка не
+    создаёт генераторов на каждом этапе.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def set(self, **attrs):
+        """Ничего не делает."""
+
+    def finish(self, error=None):
+        """Ничего не делает."""
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def start_span(name, **attrs):
+    """Начинает вложенный спан текущей трассы, не делая его текущим.
+
+    Нужен, когда начало и конец этапа приходят разными обратными
+    вызовами; спан заканчивает `finish()`. Вне трассы - `NOOP_SPAN`.
+    """
+    parent = _CURRENT.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, attrs, parent.span_id)
+
+
+@contextmanager
+def _activate(current):
+    token = _CURRENT.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _CURRENT.reset(token)
+        current.finish(error)
+
+
+def span(name, **attrs):
+    """Вложенный спан текущей трассы на время блока."""
+    current = start_span(name, **attrs)
+    if current is NOOP_SPAN:
+        return current
+    return _activate(current)
+
+
+class Tracer:
+    """Решает, какие циклы трассировать, и выгружает их спаны.
+
+    `sample` - доля трассируемых циклов, `slow` - порог в секундах, после
+    которого цикл выгружается независимо от выборки. Без `exporter`
+    трассировка выключена.
+    """
+
+    def __init__(self, exporter=None, sample=1.0, slow=None,
+                 rng=random.random, clock=time.time_ns):
+        """Трассировщик с долей выборки `sample`."""
+        self.exporter = exporter
+        self.sample = sample
+        self.slow = slow
+        self.rng = rng
+        self.clock = clock
+        self._numbers = itertools.count(1)
+
+    def trace(self, name, **attrs):
+        """Корневой спан цикла; внутри другой трассы - вложенный."""
+        if _CURRENT.get() is not None:
+            return span(name, **attrs)
+        if self.exporter is None:
+            return NOOP_SPAN
+        sampled = self.rng() < self.sample
+        if not sampled and self.slow is None:
+            return NOOP_SPAN
+        return self._root(name, attrs, sampled)
+
+    @contextmanager
+    def _root(self, name, attrs, sampled):
+        trace = Trace(next(self._numbers), self.clock)
+        root = Span(trace, name, attrs)
+        try:
+            with _activate(root):
+                yield root
+        finally:
+            if sampled or root.duration >= self.slow:
+                self._export(trace)
+
+    def _export(self, trace):
+        try:
+            self.exporter.export(trace)
+        except OSError as error:
+            logger.warning('Не удалось записать трассу: %s', error)
+
+    def close(self):
+        """Закрывает выгрузчик."""
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+class ChromeTraceExporter:
+    """Trace Event Format для chrome://tracing и Perfetto.
+
+    Файл - JSON-массив событий, который дописывается по ходу работы:
+    закрывающая скобка в этом формате необязательна, поэтому файл можно
+    открыть, не останавливая бота. Каждый цикл - своя дорожка (`tid`).
+    """
+
+    def __init__(self, path):
+        """Открывает файл `path` на дозапись."""
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        if self._file.tell() == 0:
+            self._file.write('[\n')
+
+    def export(self, trace):
+        """Дописывает события спанов трассы."""
+        lines = ''.join(
+            json.dumps({
+                'name': item.name, 'cat': 'bot', 'ph': 'X',
+                'ts': item.start / 1000, 'dur': (item.end - item.start) / 1000,
+                'pid': self._pid, 'tid': trace.number,
+                'args': {'trace_id': trace.trace_id, **item.attrs},
+            }, ensure_ascii=False, default=str) + ',\n'
+            for item in trace.spans
+        )
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def close(self):
+        """Закрывает файл."""
+        with self._lock:
+            self._file.close()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attrs):
+    return [{'key': key, 'value': _otlp_value(value)}
+            for key, value in attrs.items() if value is not None]
+
+
+class OTLPJSONExporter:
+    """OTLP JSON: одна строка `ExportTraceServiceRequest` на трассу.
+
+    Такой файл пишет файловый экспортёр OpenTelemetry Collector, и его
+    же читает приёмник `otlpjsonfile`.
+    """
+
+    def __init__(self, path):
+        """Открывает файл `path` на дозапись."""
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._resource = {'attributes': _otlp_attributes({
+            'service.name': SERVICE_NAME, 'process.pid': os.getpid()})}
+
+    def export(self, trace):
+        """Дописывает строку со спанами трассы."""
+        spans = []
+        for item in trace.spans:
+            attrs = dict(item.attrs)
+            error = attrs.pop('error', None)
+            record = {
+                'traceId': trace.trace_id,
+                'spanId': item.span_id,
+                'name': item.name,
+                'kind': 1,
+                'startTimeUnixNano': str(item.start),
+                'endTimeUnixNano': str(item.end),
+                'attributes': _otlp_attributes(attrs),
+            }
+            if item.parent_id is not None:
+                record['parentSpanId'] = item.parent_id
+            if error is not None:
+                record['status'] = {'code': 2, 'message': error}
+            spans.append(record)
+        line = json.dumps({'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{'scope': {'name': 'assistant'}, 'spans': spans}],
+        }]}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        """Закрывает файл."""
+        with self._lock:
+            self._file.close()
+
+
+EXPORTERS = {
+    'chrome': ChromeTraceExporter,
+    'otlp': OTLPJSONExporter,
+}
+
+
+def make_exporter(name, path):
+    """Создаёт выгрузчик трасс по имени из `EXPORTERS`."""
+    try:
+        exporter_class = EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f'Неизвестный формат трассировки - {name}')
+    return exporter_class(path)
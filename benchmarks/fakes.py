@@ -0,0 +1,193 @@
+"""Локальные заглушки API Практикума и Bot API Telegram.
+
+Обе заглушки - многопоточные HTTP/1.1 серверы с keep-alive, у которых
+настраиваются задержка ответа, доля ошибок и размер ответа.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+HOMEWORKS_PATH = '/api/user_api/homework_statuses/'
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _PracticumHandler(_JSONHandler):
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlsplit(self.path)
+        if url.path != HOMEWORKS_PATH:
+            return self.reply(404, {'detail': 'Not found'})
+        if server.rng.random() < server.error_rate:
+            return self.reply(500, {'detail': 'Server error'})
+        token = self.headers.get('Authorization', '')
+        query = parse_qs(url.query)
+        from_date = int(query.get('from_date', ['0'])[0] or 0)
+        version, payload = server.homeworks_for(token, from_date)
+        if not server.etag:
+            return self.reply(200, payload)
+        etag = f'"{version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.reply(200, payload, {'ETag': etag})
+
+
+class _QuietServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиент бенчмарка рвёт соединения при остановке - это не ошибка.
+        pass
+
+
+class FakePracticumServer(_QuietServer):
+    """Заглушка API статусов домашних работ.
+
+    У каждого токена `homeworks` работ. При каждом опросе с вероятностью
+    `change_rate` одна из них меняет статус. В ответ попадают работы,
+    обновлённые после `from_date`, или все работы с `full_payload`.
+    С `etag` ответ помечается версией работ токена, и на запрос с
+    совпадающим `If-None-Match` заглушка отвечает 304 без тела.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0,
+                 error_rate=0.0, homeworks=3, change_rate=0.1,
+                 full_payload=False, etag=True, seed=None):
+        """Сервер с задержкой `latency` и долей ошибок `error_rate`."""
+        super().__init__(address, _PracticumHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.homeworks = homeworks
+        self.change_rate = change_rate
+        self.full_payload = full_payload
+        self.etag = etag
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tenants = {}
+        self._versions = {}
+
+    @property
+    def url(self):
+        """Адрес эндпоинта статусов."""
+        return f'http://127.0.0.1:{self.server_port}{HOMEWORKS_PATH}'
+
+    def _new_homeworks(self, token):
+        return [{
+            'id': index,
+            'status': 'reviewing',
+            'homework_name': f'{token[-8:]}_homework_{index}.zip',
+            'reviewer_comment': '',
+            'date_updated': '2022-01-01T00:00:00Z',
+            'lesson_name': f'Спринт {index}',
+            'updated': 0,
+        } for index in range(self.homeworks)]
+
+    def homeworks_for(self, token, from_date):
+        """Версия работ токена и ответ API с курсором `from_date`."""
+        now = int(time.time())
+        with self._lock:
+            homeworks = self._tenants.get(token)
+            if homeworks is None:
+                homeworks = self._tenants[token] = self._new_homeworks(token)
+            if homeworks and self.rng.random() < self.change_rate:
+                homework = self.rng.choice(homeworks)
+                statuses = [s for s in STATUSES if s != homework['status']]
+                homework['status'] = self.rng.choice(statuses)
+                homework['updated'] = now
+                homework['date_updated'] = datetime.fromtimestamp(
+                    now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+                self._versions[token] = self._versions.get(token, 0) + 1
+            selected = [
+                {key: value for key, value in homework.items()
+                 if key != 'updated'}
+                for homework in homeworks
+                if self.full_payload or homework['updated'] >= from_date
+            ]
+            version = self._versions.get(token, 0)
+        return version, {'homeworks': selected, 'current_date': now}
+
+
+class _TelegramHandler(_JSONHandler):
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if server.latency:
+            time.sleep(server.latency)
+        method = self.path.rsplit('/', 1)[-1]
+        if server.rng.random() < server.error_rate:
+            return self.reply(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+        with server.lock:
+            server.calls[method] = server.calls.get(method, 0) + 1
+        if method == 'getMe':
+            return self.reply(200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'bench',
+                'username': 'bench_bot'}})
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': 1, 'date': int(time.time()),
+            'chat': {'id': 1, 'type': 'private'}}})
+
+    do_GET = do_POST
+
+
+class FakeTelegramServer(_QuietServer):
+    """Заглушка Bot API: отвечает на `sendMessage` и `getMe`.
+
+    С вероятностью `error_rate` отвечает 429 с `retry_after`.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0,
+                 error_rate=0.0, seed=None):
+        """Сервер с задержкой `latency` и долей ошибок `error_rate`."""
+        super().__init__(address, _TelegramHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    @property
+    def url(self):
+        """Базовый адрес Bot API без токена."""
+        return f'http://127.0.0.1:{self.server_port}'
+
+
+def serve_in_background(server):
+    """Запускает сервер в фоновом потоке и возвращает его."""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,294 @@
+"""Нагрузочный тест цикла бота на локальных заглушках API.
+
+Запуск::
+
+    python -m benchmarks.load --tenants 10,100,1000 --duration 10
+
+Для каждого числа студентов бот запускается в отдельном процессе и
+опрашивает заглушку Практикума каждые `--period` секунд, отправляя
+сообщения в заглушку Telegram. В отчёте - опросы и отправки в секунду,
+p50/p99 задержек и RSS процесса бота.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from benchmarks.fakes import (FakePracticumServer, FakeTelegramServer,
+                              serve_in_background)
+
+BOT_TOKEN = '123456:bench'
+
+
+class Recorder:
+    """Собирает длительности вызовов по видам."""
+
+    def __init__(self):
+        """Пустые замеры."""
+        self.latencies = {}
+
+    def _add(self, kind, started):
+        self.latencies.setdefault(kind, []).append(
+            time.perf_counter() - started)
+
+    def wrap(self, kind, func):
+        """Оборачивает функцию замером длительности."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add(kind, started)
+        return wrapper
+
+    def wrap_async(self, kind, func):
+        """Оборачивает корутину замером длительности."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._add(kind, started)
+        return wrapper
+
+    def summary(self, kind, duration):
+        """Число вызовов в секунду и перцентили длительности в мс."""
+        values = sorted(self.latencies.get(kind, ()))
+        if not values:
+            return {'rate': 0.0, 'p50': None, 'p99': None}
+
+        def percentile(share):
+            return values[min(len(values) - 1, int(share * len(values)))]
+
+        return {
+            'rate': len(values) / duration,
+            'p50': percentile(0.5) * 1000,
+            'p99': percentile(0.99) * 1000,
+        }
+
+
+class TimedBot:
+    """Обёртка над `telegram.Bot`, замеряющая `send_message`."""
+
+    def __init__(self, bot, recorder):
+        """Бот `bot`, отправки которого замеряет `recorder`."""
+        self.bot = bot
+        self.send_message = recorder.wrap('send', bot.send_message)
+
+
+def rss_mb():
+    """Текущий RSS процесса в мегабайтах."""
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def make_tenants(count):
+    """Студенты с уникальными токенами и чатами."""
+    from assistant.tenants import Tenant
+    return [Tenant(f'bench{index}', f'token{index:08d}', str(index))
+            for index in range(count)]
+
+
+def run_sync(count, options, practicum_url, telegram_url):
+    """Многопоточный движок `run_tenants` против заглушек."""
+    import telegram
+
+    import homework
+    from assistant.client import PracticumClient
+    from assistant.outbox import Outbox
+    from assistant.scheduler import FixedScheduler
+    from assistant.state import SQLiteStateStore
+
+    homework.ENDPOINT = practicum_url
+    recorder = Recorder()
+    bot = TimedBot(
+        telegram.Bot(token=BOT_TOKEN, base_url=f'{telegram_url}/bot'),
+        recorder)
+    with SQLiteStateStore(':memory:') as store, \
+            PracticumClient(options.pool_size, max_retries=0) as client:
+        client.get = recorder.wrap('poll', client.get)
+        engine = homework.make_engine(
+            bot, make_tenants(count), client, store,
+            scheduler=FixedScheduler(options.period),
+            outbox=Outbox(options.telegram_rate),
+            period=options.period,
+        )
+        started = time.monotonic()
+        while time.monotonic() - started < options.duration:
+            engine.run_once()
+        return recorder, time.monotonic() - started
+
+
+async def _run_async(count, options, recorder):
+    import homework
+    from assistant.aio import make_transport
+    from assistant.outbox import Outbox
+    from assistant.scheduler import FixedScheduler
+    from assistant.state import SQLiteStateStore
+
+    scheduler = FixedScheduler(options.period)
+    semaphore = asyncio.Semaphore(homework.MAX_IN_FLIGHT)
+    outbox = Outbox(options.telegram_rate)
+    tenants = make_tenants(count)
+    step = options.period / count
+    with SQLiteStateStore(':memory:') as store:
+        async with make_transport(options.pool_size) as transport:
+            transport.get = recorder.wrap_async('poll', transport.get)
+            transport.post_json = recorder.wrap_async(
+                'send', transport.post_json)
+            poll = functools.partial(
+                homework.async_poll_tenant, transport, store=store,
+                outbox=outbox)
+            loops = asyncio.gather(
+                homework.async_pump_outbox(transport, outbox),
+                *(homework.async_poll_forever(
+                    poll, semaphore, scheduler,
+                    homework.restore_state(tenant, None), index * step)
+                  for index, tenant in enumerate(tenants)),
+            )
+            try:
+                await asyncio.wait_for(loops, options.duration)
+            except asyncio.TimeoutError:
+                pass
+
+
+def run_async(count, options, practicum_url, telegram_url):
+    """Цикл `async_main` против заглушек."""
+    import homework
+    homework.ENDPOINT = practicum_url
+    homework.TELEGRAM_API = telegram_url
+    homework.TELEGRAM_TOKEN = BOT_TOKEN
+    recorder = Recorder()
+    started = time.monotonic()
+    asyncio.run(_run_async(count, options, recorder))
+    return recorder, time.monotonic() - started
+
+
+MODES = {'sync': run_sync, 'async': run_async}
+
+
+def _bench_child(count, options, urls, results):
+    import homework
+    homework.logger.setLevel(options.log_level)
+    logging.getLogger('assistant').setLevel(options.log_level)
+    recorder, duration = MODES[options.mode](count, options, *urls)
+    poll = recorder.summary('poll', duration)
+    send = recorder.summary('send', duration)
+    results.put({
+        'tenants': count,
+        'polls_per_s': poll['rate'],
+        'sends_per_s': send['rate'],
+        'poll_p50_ms': poll['p50'],
+        'poll_p99_ms': poll['p99'],
+        'send_p50_ms': send['p50'],
+        'send_p99_ms': send['p99'],
+        'rss_mb': rss_mb(),
+    })
+
+
+def _fakes_child(options, ports, stop):
+    practicum = serve_in_background(FakePracticumServer(
+        latency=options.api_latency, error_rate=options.api_error_rate,
+        homeworks=options.homeworks, change_rate=options.change_rate,
+        full_payload=options.full_payload, etag=not options.no_etag,
+        seed=options.seed))
+    telegram = serve_in_background(FakeTelegramServer(
+        latency=options.tg_latency, error_rate=options.tg_error_rate,
+        seed=options.seed))
+    ports.put((practicum.url, telegram.url))
+    stop.wait()
+
+
+def _format(value, pattern='{:.1f}'):
+    return '-' if value is None else pattern.format(value)
+
+
+def print_table(rows, stream=sys.stdout):
+    """Печатает результаты таблицей."""
+    header = ('tenants', 'polls/s', 'sends/s', 'poll p50', 'poll p99',
+              'send p50', 'send p99', 'RSS MB')
+    print(' '.join(f'{title:>9}' for title in header), file=stream)
+    for row in rows:
+        cells = (
+            str(row['tenants']), _format(row['polls_per_s']),
+            _format(row['sends_per_s']), _format(row['poll_p50_ms']),
+            _format(row['poll_p99_ms']), _format(row['send_p50_ms']),
+            _format(row['send_p99_ms']), _format(row['rss_mb']),
+        )
+        print(' '.join(f'{cell:>9}' for cell in cells), file=stream)
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', default='10,100,1000',
+                        help='числа студентов через запятую')
+    parser.add_argument('--mode', choices=sorted(MODES), default='sync')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--period', type=float, default=1.0,
+                        help='интервал опроса одного студента, с')
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--telegram-rate', type=int, default=30)
+    parser.add_argument('--api-latency', type=float, default=0.02)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument('--change-rate', type=float, default=0.05)
+    parser.add_argument('--full-payload', action='store_true')
+    parser.add_argument('--no-etag', action='store_true',
+                        help='заглушка Практикума не отдаёт ETag')
+    parser.add_argument('--tg-latency', type=float, default=0.02)
+    parser.add_argument('--tg-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результаты в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Запускает серию прогонов и печатает отчёт."""
+    options = parse_args(argv)
+    context = multiprocessing.get_context('spawn')
+    ports, stop = context.Queue(), context.Event()
+    fakes = context.Process(
+        target=_fakes_child, args=(options, ports, stop), daemon=True)
+    fakes.start()
+    urls = ports.get(timeout=30)
+    rows = []
+    try:
+        for count in (int(item) for item in options.tenants.split(',')):
+            results = context.Queue()
+            child = context.Process(
+                target=_bench_child, args=(count, options, urls, results))
+            child.start()
+            rows.append(results.get(timeout=options.duration * 3 + 60))
+            child.join()
+    finally:
+        stop.set()
+        fakes.join(timeout=5)
+    if options.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(rows)
+    return rows
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.getcwd())
+    main()
@@ -0,0 +1,145 @@
+"""Память на одну отслеживаемую работу в разных представлениях состояния.
+
+Запуск::
+
+    python -m benchmarks.memory --homeworks 100000 --tenants 1000
+
+Для каждого студента ответ API с его работами разбирается из JSON и
+превращается в состояние; `tracemalloc` считает, сколько памяти остаётся
+занято, когда ответы уже освобождены. Представления:
+
+- `dicts` - элементы ответа API как есть, словарь по id;
+- `records` - записи `Homework` по ключу;
+- `tuples` - пары `(статус, дата)` по ключу, как хранился индекс раньше;
+- `index` - `StatusIndex` цикла опроса;
+- `cache` - `CacheEntry` кэша команд, с именами работ.
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+LESSONS = tuple(f'Спринт {number}' for number in range(1, 21))
+
+
+def make_bodies(homeworks, tenants):
+    """Тела ответов API: `homeworks` работ поровну на `tenants` студентов."""
+    bodies = []
+    per_tenant = homeworks // tenants
+    for tenant in range(tenants):
+        entries = []
+        for number in range(per_tenant):
+            index = tenant * per_tenant + number
+            entries.append({
+                'id': 100000 + index,
+                'status': STATUSES[index % len(STATUSES)],
+                'homework_name': f'student{tenant}__hw{number:02d}.zip',
+                'reviewer_comment': 'Хорошая работа, но есть замечания.',
+                'date_updated': '2026-01-{:02d}T{:02d}:{:02d}:00Z'.format(
+                    1 + number % 28, index % 24, index % 60),
+                'lesson_name': LESSONS[number % len(LESSONS)],
+            })
+        bodies.append(json.dumps(
+            {'homeworks': entries, 'current_date': 1700000000},
+            ensure_ascii=False))
+    return bodies
+
+
+def build_index(records):
+    """Индекс статусов после опроса и сохранения состояния."""
+    from assistant.diff import StatusIndex
+
+    index = StatusIndex()
+    index.commit(index.diff(records))
+    index.dirty = {}
+    return index
+
+
+def build_states(homework):
+    """Функции, строящие состояние студента из разобранного ответа."""
+    from assistant.commands import CacheEntry
+
+    def records(response):
+        return homework.check_response(response)
+
+    return {
+        'dicts': lambda response: {
+            entry['id']: entry for entry in response['homeworks']},
+        'records': lambda response: {
+            item.key: item for item in records(response)},
+        'tuples': lambda response: {
+            item.key: (item.status, item.date_updated)
+            for item in records(response)},
+        'index': lambda response: build_index(records(response)),
+        'cache': lambda response: CacheEntry(records(response), 0),
+    }
+
+
+def measure(name, build, bodies):
+    """Байты, которые занимает состояние всех студентов."""
+    count = sum(len(json.loads(body)['homeworks']) for body in bodies)
+    tracemalloc.start()
+    try:
+        states = [build(json.loads(body)) for body in bodies]
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del states
+    return {
+        'state': name,
+        'homeworks': count,
+        'bytes': used,
+        'bytes_per_homework': used / count,
+    }
+
+
+def print_table(rows, stream=sys.stdout):
+    """Печатает результаты таблицей."""
+    header = ('state', 'homeworks', 'MiB', 'bytes/homework')
+    print(' '.join(f'{title:>14}' for title in header), file=stream)
+    for row in rows:
+        cells = (row['state'], str(row['homeworks']),
+                 f'{row["bytes"] / 2 ** 20:.1f}',
+                 f'{row["bytes_per_homework"]:.0f}')
+        print(' '.join(f'{cell:>14}' for cell in cells), file=stream)
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--homeworks', type=int, default=100000,
+                        help='число отслеживаемых работ')
+    parser.add_argument('--tenants', type=int, default=1000,
+                        help='число студентов')
+    parser.add_argument('--state', default='dicts,records,tuples,index,cache',
+                        help='представления через запятую')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результаты в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Замеряет каждое представление и печатает отчёт."""
+    options = parse_args(argv)
+    import logging
+
+    import homework
+
+    homework.logger.setLevel(logging.WARNING)
+    bodies = make_bodies(options.homeworks, options.tenants)
+    states = build_states(homework)
+    rows = [measure(name, states[name], bodies)
+            for name in options.state.split(',')]
+    if options.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(rows)
+    return rows
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.getcwd())
+    main()
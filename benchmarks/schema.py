@@ -0,0 +1,106 @@
+"""Стоимость проверки ответа API в сравнении с разбором JSON.
+
+Запуск::
+
+    python -m benchmarks.schema --homeworks 10,1000,100000
+
+Для ответа с заданным числом работ замеряется время `json.loads` и
+`check_response`, которая проверяет каждый элемент `homeworks` и
+превращает его в запись `Homework`. В отчёте - наносекунды на работу и
+доля проверки от разбора JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+def make_body(count):
+    """Тело ответа API с `count` работами, похожими на настоящие."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'status': STATUSES[index % len(STATUSES)],
+                'homework_name': f'student_hw{index}.zip',
+                'reviewer_comment': 'Хорошая работа, но есть замечания.',
+                'date_updated': '2026-01-01T00:00:00Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for index in range(count)
+        ],
+        'current_date': 1700000000,
+    }, ensure_ascii=False)
+
+
+def best_of(func, repeat):
+    """Лучшее время `func()` из `repeat` запусков в секундах."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(homework, count, repeat=5):
+    """Время разбора и проверки ответа с `count` работами."""
+    body = make_body(count)
+    response = json.loads(body)
+    decode = best_of(lambda: json.loads(body), repeat)
+    validate = best_of(lambda: homework.check_response(response), repeat)
+    return {
+        'homeworks': count,
+        'decode_ns': decode / count * 1e9,
+        'validate_ns': validate / count * 1e9,
+        'validate_share': validate / decode,
+    }
+
+
+def print_table(rows, stream=sys.stdout):
+    """Печатает результаты таблицей."""
+    header = ('homeworks', 'decode ns', 'check ns', 'check/decode')
+    print(' '.join(f'{title:>12}' for title in header), file=stream)
+    for row in rows:
+        cells = (str(row['homeworks']), f'{row["decode_ns"]:.0f}',
+                 f'{row["validate_ns"]:.0f}',
+                 f'{row["validate_share"]:.2f}')
+        print(' '.join(f'{cell:>12}' for cell in cells), file=stream)
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--homeworks', default='10,1000,100000',
+                        help='числа работ в ответе через запятую')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результаты в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Замеряет каждый размер ответа и печатает отчёт."""
+    options = parse_args(argv)
+    import logging
+
+    import homework
+
+    homework.logger.setLevel(logging.WARNING)
+    rows = [measure(homework, int(count), options.repeat)
+            for count in options.homeworks.split(',')]
+    if options.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(rows)
+    return rows
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.getcwd())
+    main()
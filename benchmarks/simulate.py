@@ -0,0 +1,358 @@
+"""Симуляция цикла опроса бота в виртуальном времени.
+
+Запуск::
+
+    python -m benchmarks.simulate --tenants 1000 --days 7
+
+Сценарий изменений статусов (случайный или из `--timeline`) проигрывается
+через настоящие `make_engine`, `poll_tenant`, `check_response`,
+`parse_status` и отправку сообщений, но часы виртуальные: движок не ждёт
+между опросами, поэтому недели работы тысяч студентов считаются за
+секунды. В отчёте для каждого планировщика - число запросов к API,
+отправленных сообщений, пропущенных промежуточных статусов и задержка
+уведомления от смены статуса до отправки.
+
+Файл `--timeline` - JSON вида::
+
+    {"start": 1700000000,
+     "events": [{"tenant": "ivan", "at": 60, "homework_name": "hw1",
+                 "status": "reviewing"}],
+     "outages": [{"at": 3600, "until": 3900, "status_code": 503}]}
+
+`at` и `until` - секунды от `start`; `id` работы по умолчанию равен её
+имени.
+"""
+import argparse
+import bisect
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+DAY = 24 * 60 * 60
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ')
+
+
+class Timeline:
+    """Сценарий изменений статусов работ и сбоев API.
+
+    `events` - словарь `имя студента -> [(время, id, имя работы,
+    статус)]`, `outages` - список `(начало, конец, код ответа)`.
+    """
+
+    def __init__(self, start, events, outages=()):
+        """Сценарий с событиями `events` и сбоями `outages`."""
+        self.start = start
+        self.events = {
+            name: sorted(items) for name, items in events.items()}
+        self._times = {
+            name: [item[0] for item in items]
+            for name, items in self.events.items()}
+        self.outages = sorted(outages)
+
+    @classmethod
+    def random(cls, tenants, start, duration, reviews=3, seed=None):
+        """Случайный сценарий: каждый студент сдаёт `reviews` работ.
+
+        Работа уходит на ревью в случайный момент, через 1-48 часов
+        получает вердикт, а отклонённая работа возвращается на ревью
+        ещё раз.
+        """
+        rng = random.Random(seed)
+        events = {}
+        for tenant in tenants:
+            items = events[tenant.name] = []
+            for number in range(reviews):
+                name = f'hw{number}'
+                moment = start + rng.uniform(0, duration)
+                for attempt in range(2):
+                    items.append((moment, name, name, 'reviewing'))
+                    moment += rng.uniform(3600, 48 * 3600)
+                    verdict = rng.choice(('approved', 'rejected'))
+                    items.append((moment, name, name, verdict))
+                    if verdict == 'approved':
+                        break
+                    moment += rng.uniform(3600, 24 * 3600)
+        return cls(start, events)
+
+    @classmethod
+    def load(cls, path, tenants):
+        """Сценарий из JSON-файла, см. описание модуля."""
+        with open(path, encoding='utf-8') as timeline_file:
+            data = json.load(timeline_file)
+        start = data.get('start', time.time())
+        events = {tenant.name: [] for tenant in tenants}
+        for event in data.get('events', ()):
+            name = event['homework_name']
+            events.setdefault(event['tenant'], []).append((
+                start + event['at'], str(event.get('id', name)), name,
+                event['status']))
+        outages = [
+            (start + item['at'], start + item['until'],
+             item.get('status_code', 503))
+            for item in data.get('outages', ())
+        ]
+        return cls(start, events, outages)
+
+    def status_code(self, now):
+        """Код ответа API в момент `now`."""
+        for begin, end, status_code in self.outages:
+            if begin <= now < end:
+                return status_code
+        return 200
+
+    def version(self, tenant, now):
+        """Число изменений у студента к моменту `now`: основа ETag."""
+        return bisect.bisect_right(self._times.get(tenant, ()), now)
+
+    def response(self, tenant, from_date, now):
+        """Ответ API студенту: работы, обновлённые с `from_date`."""
+        items = self.events.get(tenant, ())
+        times = self._times.get(tenant, ())
+        low = bisect.bisect_left(times, from_date)
+        high = bisect.bisect_right(times, now)
+        homeworks = {}
+        for moment, key, name, status in items[low:high]:
+            homeworks[key] = {
+                'id': key, 'homework_name': name, 'status': status,
+                'date_updated': _iso(moment),
+            }
+        return {'homeworks': list(homeworks.values()),
+                'current_date': int(now)}
+
+
+class ScriptedBody(io.BytesIO):
+    """Тело `ScriptedResponse` с интерфейсом потока urllib3."""
+
+    def read1(self, size=-1, decode_content=None):
+        """Следующий кусок тела не длиннее `size` байт."""
+        return super().read1(size)
+
+    def release_conn(self):
+        """Соединения нет: возвращать в пул нечего."""
+
+
+class ScriptedResponse:
+    """Ответ `ScriptedSession` с интерфейсом `requests.Response`."""
+
+    def __init__(self, status_code, payload=None, headers=None):
+        """Ответ с кодом `status_code` и телом `payload`."""
+        self.status_code = status_code
+        self.reason = '' if status_code == 200 else 'Scripted outage'
+        self.headers = headers or {}
+        self._body = b'' if payload is None else json.dumps(payload).encode()
+        self.text = self._body.decode()
+        self.raw = ScriptedBody(self._body)
+
+    def json(self):
+        """Разобранное тело ответа."""
+        return json.loads(self._body)
+
+    def close(self):
+        """Ответ в памяти закрывать не нужно."""
+
+
+class ScriptedSession:
+    """Отвечает на запросы к API по сценарию `timeline` в момент часов.
+
+    С `etag` ответ несёт ETag, и на условный запрос без новых изменений
+    приходит 304, как от `benchmarks.fakes.FakePracticumServer`.
+    """
+
+    def __init__(self, timeline, tenants, clock, etag=True):
+        """API для студентов `tenants` по сценарию `timeline`."""
+        self.timeline = timeline
+        self.clock = clock
+        self.etag = etag
+        self.requests = 0
+        self._by_token = {
+            f'OAuth {tenant.practicum_token}': tenant.name
+            for tenant in tenants}
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """GET-запрос к API Практикума."""
+        self.requests += 1
+        now = self.clock.time()
+        status_code = self.timeline.status_code(now)
+        if status_code != 200:
+            return ScriptedResponse(status_code, {'code': 'outage'})
+        tenant = self._by_token[headers['Authorization']]
+        if not self.etag:
+            return ScriptedResponse(200, self.timeline.response(
+                tenant, params['from_date'], now))
+        etag = f'"{self.timeline.version(tenant, now)}"'
+        if headers.get('If-None-Match') == etag:
+            return ScriptedResponse(304, headers={'ETag': etag})
+        return ScriptedResponse(200, self.timeline.response(
+            tenant, params['from_date'], now), {'ETag': etag})
+
+
+class RecordingBot:
+    """Бот, который запоминает сообщения с виртуальным временем."""
+
+    def __init__(self, clock):
+        """Бот на часах `clock`."""
+        self.clock = clock
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        """Запоминает сообщение вместо отправки."""
+        self.sent.append((self.clock.time(), chat_id, text))
+
+
+def notification_delays(homework, tenants, timeline, sent, end):
+    """Задержки уведомлений и число статусов, о которых не сообщили.
+
+    Статус, сменившийся до следующего опроса, бот не видит: это
+    пропуск, а не ошибка. Изменения после `end` не учитываются.
+    """
+    from assistant.outbox import SEPARATOR
+    delivered = {}
+    for moment, chat_id, text in sent:
+        for part in text.split(SEPARATOR):
+            delivered.setdefault((chat_id, part), []).append(moment)
+    delays, missed = [], 0
+    for tenant in tenants:
+        for moment, _, name, status in timeline.events.get(tenant.name, ()):
+            if moment > end:
+                break
+            message = homework.parse_status(
+                {'homework_name': name, 'status': status})
+            times = delivered.get((tenant.chat_id, message), ())
+            index = bisect.bisect_left(times, moment)
+            if index == len(times):
+                missed += 1
+            else:
+                delays.append(times[index] - moment)
+    return sorted(delays), missed
+
+
+def simulate(tenants, timeline, duration, scheduler, period=None,
+             etag=True):
+    """Проигрывает `timeline` за `duration` виртуальных секунд."""
+    import homework
+    from assistant.clock import VirtualClock
+    from assistant.outbox import Outbox
+    from assistant.state import SQLiteStateStore
+
+    clock = VirtualClock(timeline.start)
+    session = ScriptedSession(timeline, tenants, clock, etag)
+    bot = RecordingBot(clock)
+    period = period or homework.RETRY_PERIOD
+    started = time.perf_counter()
+    with SQLiteStateStore(':memory:') as store:
+        engine = homework.make_engine(
+            bot, tenants, session, store, scheduler,
+            outbox=Outbox(homework.TELEGRAM_RATE, clock=clock.monotonic),
+            period=period, clock=clock)
+        end = timeline.start + duration
+        while clock.time() < end:
+            engine.run_once()
+    wall = time.perf_counter() - started
+    delays, missed = notification_delays(
+        homework, tenants, timeline, bot.sent, end)
+
+    def percentile(share):
+        if not delays:
+            return None
+        return delays[min(len(delays) - 1, int(share * len(delays)))]
+
+    days = duration / DAY
+    return {
+        'tenants': len(tenants),
+        'days': days,
+        'polls': session.requests,
+        'polls_per_tenant_day': session.requests / len(tenants) / days,
+        'messages': len(bot.sent),
+        'missed': missed,
+        'delay_p50_s': percentile(0.5),
+        'delay_p95_s': percentile(0.95),
+        'delay_max_s': delays[-1] if delays else None,
+        'wall_s': wall,
+    }
+
+
+def _format(value, pattern='{:.0f}'):
+    return '-' if value is None else pattern.format(value)
+
+
+def print_table(rows, stream=sys.stdout):
+    """Печатает результаты таблицей."""
+    header = ('scheduler', 'polls', 'polls/day', 'messages', 'missed',
+              'p50 s', 'p95 s', 'max s', 'wall s')
+    print(' '.join(f'{title:>10}' for title in header), file=stream)
+    for row in rows:
+        cells = (
+            row['scheduler'], str(row['polls']),
+            _format(row['polls_per_tenant_day'], '{:.1f}'),
+            str(row['messages']), str(row['missed']),
+            _format(row['delay_p50_s']), _format(row['delay_p95_s']),
+            _format(row['delay_max_s']), _format(row['wall_s'], '{:.2f}'),
+        )
+        print(' '.join(f'{cell:>10}' for cell in cells), file=stream)
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--days', type=float, default=7.0)
+    parser.add_argument('--schedulers', default='fixed,adaptive',
+                        help='планировщики через запятую')
+    parser.add_argument('--reviews', type=int, default=3,
+                        help='работ на студента в случайном сценарии')
+    parser.add_argument('--timeline', help='JSON-файл сценария')
+    parser.add_argument('--no-etag', action='store_true',
+                        help='API не отдаёт ETag, каждый ответ разбирается')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результаты в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Симулирует каждый планировщик и печатает отчёт."""
+    options = parse_args(argv)
+    import homework
+    from assistant.scheduler import make_scheduler
+    from benchmarks.load import make_tenants
+
+    logging.getLogger().setLevel(options.log_level)
+    homework.logger.setLevel(options.log_level)
+    tenants = make_tenants(options.tenants)
+    duration = options.days * DAY
+    start = 1700000000
+    if options.timeline:
+        timeline = Timeline.load(options.timeline, tenants)
+    else:
+        timeline = Timeline.random(
+            tenants, start, duration, options.reviews, options.seed)
+    rows = []
+    for name in options.schedulers.split(','):
+        scheduler = make_scheduler(
+            name, homework.RETRY_PERIOD,
+            reviewing=homework.REVIEWING_PERIOD,
+            rng=random.Random(options.seed).random)
+        row = simulate(tenants, timeline, duration, scheduler,
+                       etag=not options.no_etag)
+        rows.append({'scheduler': name, **row})
+    if options.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(rows)
+    return rows
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.getcwd())
+    main()
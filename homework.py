@@ -1,23 +1,108 @@
+import atexit
+import functools
+import itertools
+import json
 import logging
 import os
+import signal
+import sqlite3
 import sys
 import time
+from contextlib import nullcontext
 from http import HTTPStatus
 
-import requests
-from dotenv import load_dotenv
-import telegram
+# Первым: от этого импорта отсчитывается время запуска.
+from assistant.startup import StartupReport
 
+from assistant.aio import make_transport
+from assistant.breaker import CircuitBreaker
+from assistant.client import (Deadline, PracticumClient, body_chunks,
+                              conditional_headers)
+from assistant.clock import SystemClock
+from assistant.commands import COMMANDS, ChatCommands, ReplyCache
+from assistant.engine import PollingEngine, TenantState
+from assistant.health import Health
+from assistant.hedge import Hedger
+from assistant.lazy import lazy_import
+from assistant.leader import LeaderElector, make_lease
+from assistant.metrics import (API_LATENCY, API_RESPONSES, CHANGES,
+                               CONTENT_TYPE, ERRORS, POLLS, REGISTRY,
+                               SEND_LATENCY, SENDS, STAGE_LATENCY,
+                               STARTUP_SECONDS, track_breaker)
+from assistant.outbox import Outbox
+from assistant.probe import InvalidCredentials, probe_tenants
+from assistant.scheduler import Outcome, make_scheduler
+from assistant.schema import Homework, compile_homework, validate_homeworks
+from assistant.shards import Supervisor
+from assistant.shutdown import (SIGNALS, Fence, Fenced, Shutdown,
+                                ShutdownRequested)
+from assistant.state import SQLiteStateStore
+from assistant.stream import CHUNK_SIZE as STREAM_CHUNK_SIZE, HomeworkStream
+from assistant.tenants import Tenant, load_tenants
+from assistant.tracing import Tracer, make_exporter, span
 
-load_dotenv()
+STARTUP = StartupReport(STARTUP_SECONDS)
+
+asyncio = lazy_import('asyncio')
+dotenv = lazy_import('dotenv')
+requests = lazy_import('requests')
+telegram = lazy_import('telegram')
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(ENV_FILE):
+    dotenv.load_dotenv(ENV_FILE)
 
 
 PRACTICUM_TOKEN = os.getenv('SECRET_PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('SECRET_TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('SECRET_TELEGRAM_CHAT_ID')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+TENANTS = os.getenv('TENANTS')
+ASYNC_MODE = os.getenv('ASYNC_MODE')
+STATE_PATH = os.getenv('BOT_STATE_PATH', 'bot_state.sqlite3')
+METRICS_PORT = os.getenv('METRICS_PORT')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 1))
+LOG_SAMPLING = os.getenv('LOG_SAMPLING')
+BOT_COMMANDS = os.getenv('BOT_COMMANDS')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
 
 RETRY_PERIOD = 600
+REVIEWING_PERIOD = int(os.getenv('REVIEWING_PERIOD', 120))
+POLL_SCHEDULER = os.getenv('POLL_SCHEDULER', 'fixed')
+POOL_SIZE = int(os.getenv('PRACTICUM_POOL_SIZE', 10))
+MAX_RETRIES = int(os.getenv('PRACTICUM_MAX_RETRIES', 3))
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 10))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 30))
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS')
+HEDGE_QUANTILE = float(os.getenv('HEDGE_QUANTILE', 0.95))
+HEALTH_TOLERANCE = float(os.getenv('HEALTH_TOLERANCE', 2 * POLL_DEADLINE))
+TRACE_PATH = os.getenv('TRACE_PATH')
+TRACE_FORMAT = os.getenv('TRACE_FORMAT', 'chrome')
+TRACE_SAMPLE = float(os.getenv('TRACE_SAMPLE', 0.01))
+TRACE_SLOW = os.getenv('TRACE_SLOW')
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 1000))
+TELEGRAM_RATE = int(os.getenv('TELEGRAM_RATE', 30))
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', TELEGRAM_RATE))
+OUTBOX_IDLE_PERIOD = 0.5
+STREAM_BATCH = 100
+DRAIN_TIMEOUT = int(os.getenv('DRAIN_TIMEOUT', 10))
+LEADER_LEASE = os.getenv('LEADER_LEASE', '')
+LEADER_LEASE_PATH = os.getenv('LEADER_LEASE_PATH', 'bot_leader.sqlite3')
+LEADER_TTL = int(os.getenv('LEADER_TTL', 15))
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+CHECK_CREDENTIALS = os.getenv('CHECK_CREDENTIALS', '1') != '0'
+PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', 16))
+PROBE_TIMEOUT = int(os.getenv('PROBE_TIMEOUT', 10))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_TIMEOUT = int(os.getenv('BREAKER_TIMEOUT', 60))
+COMMAND_CACHE_TTL = int(os.getenv('COMMAND_CACHE_TTL', 2 * RETRY_PERIOD))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+TELEGRAM_API = 'https://api.telegram.org'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
@@ -26,14 +111,68 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+homework_record = compile_homework(HOMEWORK_VERDICTS)
+
+CHAT_CACHE = ReplyCache(COMMAND_CACHE_TTL)
+CLOCK = SystemClock()
+HEALTH = Health(HEALTH_TOLERANCE)
+TRACER = Tracer()
+FENCE = Fence()
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    '%(asctime)s, %(levelname)s, %(message)s, %(funcName)s, %(lineno)d')
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+
+def configure_logging():
+    """Настраивает вывод логов бота; вызывается при запуске, не при импорте.
+
+    По умолчанию записи пишет в stdout фоновый поток через очередь на
+    `LOG_QUEUE_SIZE` записей, `LOG_QUEUE_SIZE=0` пишет синхронно.
+    Возвращает слушатель очереди или None.
+    """
+    from assistant.logs import (SamplingFilter, make_formatter,
+                                start_queue_logging)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(make_formatter(LOG_FORMAT))
+    sampling = SamplingFilter(
+        LOG_SAMPLE_EVERY, json.loads(LOG_SAMPLING) if LOG_SAMPLING else None)
+    loggers = (logger, logging.getLogger('assistant'))
+    for item in loggers:
+        item.setLevel(LOG_LEVEL)
+    if not LOG_QUEUE_SIZE:
+        handler.addFilter(sampling)
+        for item in loggers:
+            item.addHandler(handler)
+        return None
+    listener = start_queue_logging(loggers, handler, LOG_QUEUE_SIZE, sampling)
+    atexit.register(listener.stop)
+    HEALTH.queue('log', listener.queue.qsize)
+    return listener
+
+
+def configure_tracing(shard=None):
+    """Включает трассировку циклов в файл `TRACE_PATH`.
+
+    Рабочий процесс `shard` пишет в свой файл с номером перед
+    расширением. Возвращает выгрузчик или None, если трассировка
+    выключена.
+    """
+    if not TRACE_PATH:
+        return None
+    path = TRACE_PATH
+    if shard is not None:
+        root, extension = os.path.splitext(path)
+        path = f'{root}.{shard}{extension}'
+    TRACER.exporter = make_exporter(TRACE_FORMAT, path)
+    TRACER.sample = TRACE_SAMPLE
+    TRACER.slow = float(TRACE_SLOW) if TRACE_SLOW else None
+    atexit.register(TRACER.close)
+    return TRACER.exporter
+
+
+def report_startup():
+    """Логирует длительности этапов запуска."""
+    STARTUP.mark('ready')
+    logger.info('Запуск: %s', STARTUP)
 
 
 def check_tokens():
@@ -46,108 +185,981 @@ def check_tokens():
     logger.debug('Проверка tokens успешна')
 
 
-def send_message(bot, message):
-    """Отправляет сообщение `message` в указанный telegram-чат."""
+def redact_token(error):
+    """Текст ошибки без токена бота, который есть в URL запросов к Telegram.
+
+    Через этот помощник проходит всё, что попадает в лог из ошибок
+    запросов к Bot API.
+    """
+    text = str(error)
+    if TELEGRAM_TOKEN:
+        text = text.replace(TELEGRAM_TOKEN, '***')
+    return text
+
+
+def check_practicum_token(tenant, session=None):
+    """Проверка токена Практикума студента: 401 и 403 - отклонён."""
+    response = (session or requests).get(
+        ENDPOINT, headers=tenant.headers,
+        params={'from_date': int(CLOCK.time())}, timeout=PROBE_TIMEOUT)
+    if response.status_code in (HTTPStatus.UNAUTHORIZED,
+                                HTTPStatus.FORBIDDEN):
+        raise InvalidCredentials(
+            f'API Практикума отклонил токен ({response.status_code})')
+
+
+def check_telegram_chat(tenant, session=None):
+    """Проверка, что бот может писать в чат студента."""
+    response = (session or requests).get(
+        f'{TELEGRAM_API}/bot{TELEGRAM_TOKEN}/getChat',
+        params={'chat_id': tenant.chat_id}, timeout=PROBE_TIMEOUT)
+    if response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.FORBIDDEN):
+        description = response.json().get('description')
+        raise InvalidCredentials(
+            f'чат {tenant.chat_id} недоступен боту: {description}')
+
+
+def check_bot_token(session=None):
+    """Проверка токена Telegram; при отказе бот завершает работу."""
+    try:
+        response = (session or requests).get(
+            f'{TELEGRAM_API}/bot{TELEGRAM_TOKEN}/getMe',
+            timeout=PROBE_TIMEOUT)
+    except requests.RequestException as error:
+        logger.warning('Не удалось проверить токен Telegram: %s',
+                       redact_token(error))
+        return
+    if response.status_code == HTTPStatus.UNAUTHORIZED:
+        logger.critical('Telegram отклонил токен бота')
+        sys.exit('Бот закончил работу проверьте tokens')
+
+
+def check_credentials(tenants):
+    """Параллельно проверяет учётные данные всех студентов.
+
+    Возвращает студентов, чьи данные не отклонены; остальные на
+    карантине до перезапуска. Отключается `CHECK_CREDENTIALS=0`.
+    """
+    if not CHECK_CREDENTIALS:
+        return tenants
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=PROBE_WORKERS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        check_bot_token(session)
+        checks = (
+            functools.partial(check_practicum_token, session=session),
+            functools.partial(check_telegram_chat, session=session),
+        )
+        valid, quarantined = probe_tenants(
+            tenants, checks, PROBE_WORKERS, PROBE_TIMEOUT, redact_token)
+    if not valid:
+        logger.critical('Учётные данные всех студентов отклонены')
+        sys.exit('Бот закончил работу проверьте tokens')
+    logger.info('Проверка данных: допущено %s, на карантине %s',
+                len(valid), len(quarantined))
+    return valid
+
+
+def load_checked_tenants():
+    """Студенты из реестра, прошедшие проверку учётных данных."""
+    tenants = load_tenants(TENANTS_FILE)
+    if not (TELEGRAM_TOKEN and tenants):
+        logger.critical('Не найден токен Telegram или список студентов')
+        sys.exit('Бот закончил работу проверьте tokens')
+    STARTUP.mark('config')
+    tenants = check_credentials(tenants)
+    STARTUP.mark('probe')
+    return tenants
+
+
+def send_to_chat(bot, chat_id, message):
+    """Отправляет сообщение `message` в telegram-чат `chat_id`."""
     logger.debug('Попытка отправить сообщение в Telegram.')
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-    except telegram.TelegramError as error:
-        logger.error(
-            f'Не удалось отправить сообщение в Telegram. {error}')
+        deliver_to_chat(bot, chat_id, message)
+    except (telegram.TelegramError, Fenced) as error:
+        logger.error('Не удалось отправить сообщение в Telegram. %s',
+                     redact_token(error))
+        return
     logger.debug('Сообщение в Telegram успешно отправлено.')
 
 
-def get_api_answer(current_timestamp):
-    """запрос статуса домашней работы."""
-    timestamp = current_timestamp or int(time.time())
+def deliver_to_chat(bot, chat_id, message):
+    """Отправка без обработки ошибок: их разбирает очередь `Outbox`."""
+    FENCE.check()
+    with SEND_LATENCY.time(), TRACER.trace('telegram.send', chat=chat_id):
+        try:
+            bot.send_message(chat_id, message)
+        except Exception:
+            SENDS.inc(result='error')
+            raise
+    SENDS.inc(result='ok')
+    HEALTH.beat('send')
+
+
+def send_message(bot, message):
+    """Отправляет сообщение `message` в указанный telegram-чат."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def request_statuses(headers, current_timestamp, session=None, **kwargs):
+    """Запрос статусов домашних работ с заголовками `headers`.
+
+    `session` - объект с методом `get`, например `PracticumClient`;
+    по умолчанию запрос выполняется через `requests.get`. Возвращает
+    ответ с проверенным кодом или None, если на условный запрос сервер
+    ответил 304: статусы не изменились. Без `timeout` в `kwargs` запрос
+    ограничен таймаутами фаз и сроком `poll_timeout()`.
+    """
+    if 'timeout' not in kwargs:
+        kwargs['timeout'] = poll_timeout()
+    timestamp = (int(CLOCK.time()) if current_timestamp is None
+                 else current_timestamp)
     params_request = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'headers': headers,
         'params': {'from_date': timestamp},
     }
-    message = ('Начало запроса к API. Запрос: {url}, {params}.'
-               ).format(**params_request)
-    logger.debug(message)
+    logger.debug('Начало запроса к API. Запрос: %s, %s.',
+                 ENDPOINT, params_request['params'])
+    POLLS.inc()
     try:
-        homework_statuses = requests.get(**params_request)
+        with API_LATENCY.time(), span('http.request') as current:
+            homework_statuses = (session or requests).get(
+                **params_request, **kwargs)
+            current.set(status=homework_statuses.status_code)
     except requests.RequestException as error:
-        raise ConnectionError(f'запрос не может быть выполнен, {error}'
-                              f'Причина: {homework_statuses.reason}.'
-                              f'Текст: {homework_statuses.text}.'
-                              )
-    if homework_statuses.status_code != HTTPStatus.OK:
-        message = ('не успешное получение API. {url}, {params}.'
-                   ).format(**params_request)
-        logger.error(message)
+        raise ConnectionError(f'запрос не может быть выполнен, {error}')
+    try:
+        modified = check_status_code(
+            homework_statuses.status_code, params_request)
+    except ValueError:
+        if kwargs.get('stream'):
+            homework_statuses.close()
+        raise
+    if not modified:
+        homework_statuses.close()
+        return None
+    return homework_statuses
+
+
+def fetch_statuses(headers, current_timestamp, session=None):
+    """Статусы домашних работ, разобранные из JSON целиком.
+
+    Запрос вместе с чтением тела ограничен сроком `POLL_DEADLINE`.
+    """
+    deadline = Deadline(POLL_DEADLINE)
+    response = request_statuses(
+        headers, current_timestamp, session, stream=True,
+        timeout=poll_timeout(deadline))
+    with span('json.decode'):
+        if getattr(response, 'raw', None) is None:
+            # Ответ без потока тела уже прочитан целиком.
+            return response.json()
+        return json.loads(read_body(response, deadline))
+
+
+def read_body(response, deadline):
+    """Тело потокового ответа целиком, прочитанное до срока `deadline`.
+
+    Прочитанное до конца соединение возвращается в пул, прерванное -
+    закрывается.
+    """
+    try:
+        body = b''.join(deadline.chunks(
+            body_chunks(response, STREAM_CHUNK_SIZE)))
+    except BaseException:
+        response.close()
+        raise
+    response.raw.release_conn()
+    return body
+
+
+def poll_timeout(deadline=None):
+    """Таймауты подключения и чтения в пределах срока опроса `deadline`."""
+    deadline = deadline or Deadline(POLL_DEADLINE)
+    return deadline.timeout(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+
+
+def stream_body(response, deadline=None):
+    """Тело ответа `request_statuses(..., stream=True)` как `HomeworkStream`.
+
+    Тело читается кусками по мере разбора, соединение освобождается
+    после прохода по потоку. С `deadline` чтение прерывается
+    `TimeoutError`, когда истекает срок опроса.
+    """
+    chunks = body_chunks(response, STREAM_CHUNK_SIZE)
+    if deadline is not None:
+        chunks = deadline.chunks(chunks)
+    return HomeworkStream(
+        chunks, close=response.close, record=homework_record)
+
+
+def check_status_code(status_code, params_request):
+    """Проверка кода ответа API Практикума.
+
+    Возвращает False для 304 на условный запрос: статусы не изменились.
+    """
+    API_RESPONSES.inc(code=status_code)
+    if status_code == HTTPStatus.NOT_MODIFIED:
+        logger.debug('Статусы не изменились с прошлого запроса.')
+        return False
+    if status_code != HTTPStatus.OK:
+        logger.error('не успешное получение API. %s, %s.',
+                     ENDPOINT, params_request['params'])
         raise ValueError(
-            f'Недоступен {ENDPOINT} , код {homework_statuses.status_code}')
-    else:
-        message = ('успешное получение API. {url}, {params}.'
-                   ).format(**params_request)
-        logger.debug(message)
-        return homework_statuses.json()
+            f'Недоступен {ENDPOINT} , код {status_code}')
+    logger.debug('успешное получение API. %s, %s.',
+                 ENDPOINT, params_request['params'])
+    return True
+
+
+def get_api_answer(current_timestamp):
+    """запрос статуса домашней работы."""
+    return fetch_statuses(HEADERS, current_timestamp)
 
 
 def check_response(response):
-    """Функция проверки корректности ответа API Яндекс.Практикум."""
+    """Функция проверки корректности ответа API Яндекс.Практикум.
+
+    Возвращает работы из ответа списком `Homeworks` записей `Homework`:
+    каждая проверена валидатором `homework_record`, а элементы, которые
+    он отклонил, не прерывают проверку и попадают в `rejected`.
+    """
     logger.debug('Проверка ответа API на корректность')
     if not isinstance(response, dict):
         raise TypeError('Ответ API не является dict')
     if 'homeworks' not in response or 'current_date' not in response:
         raise KeyError('Нет ключа homeworks в ответе API')
-    homeworks = response.get('homeworks')
+    homeworks = response['homeworks']
     if not isinstance(homeworks, list):
         raise TypeError('homeworks не является list')
-    return homeworks
+    return validate_homeworks(homework_record, homeworks)
 
 
 def parse_status(homework):
-    """Функция, проверяющая статус домашнего задания."""
+    """Функция, проверяющая статус домашнего задания.
+
+    `homework` - запись `Homework` или элемент ответа API, который
+    сначала проверяет `homework_record`.
+    """
     logger.debug('Проводим проверки и извлекаем статус работы')
-    homework_name = homework.get('homework_name')
-    homework_status = homework.get('status')
-    if 'homework_name' not in homework:
-        raise KeyError('Нет ключа homework_name в ответе API ')
-    if homework_status not in HOMEWORK_VERDICTS:
-        raise ValueError(f'Неизвестный статус работы - {homework_status}')
-    return ('Изменился статус проверки работы "{homework_name}". {verdict}'
-            ).format(homework_name=homework_name,
-                     verdict=HOMEWORK_VERDICTS[homework_status])
+    if not isinstance(homework, Homework):
+        homework = homework_record(homework)
+    return (f'Изменился статус проверки работы "{homework.name}". '
+            f'{HOMEWORK_VERDICTS[homework.status]}')
+
+
+def make_hedger():
+    """Страховка медленных запросов к API, если задан `HEDGE_REQUESTS`."""
+    if not HEDGE_REQUESTS:
+        return None
+    return Hedger(HEDGE_QUANTILE, workers=POOL_SIZE)
+
+
+def make_breaker():
+    """Выключатель для API Практикума из настроек окружения."""
+    breaker = track_breaker(CircuitBreaker(
+        'practicum', BREAKER_THRESHOLD, BREAKER_TIMEOUT))
+    HEALTH.breaker(breaker)
+    return breaker
+
+
+def start_service_server(shard=0):
+    """Запускает сервер метрик, если задан `METRICS_PORT`.
+
+    Рабочий процесс `shard` слушает порт `METRICS_PORT + shard`.
+    """
+    if not METRICS_PORT:
+        return None
+    from assistant.httpd import start_http_server
+    routes = {
+        '/metrics': lambda: (200, CONTENT_TYPE, REGISTRY.render()),
+        **HEALTH.routes(),
+    }
+    return start_http_server(int(METRICS_PORT) + shard, routes)
+
+
+def start_command_listener(tenants, session=None, cached=True):
+    """Отвечает на `/status` и `/history`, если задан `BOT_COMMANDS`.
+
+    Обновления принимаются через long polling `getUpdates`, а с
+    `WEBHOOK_URL` - через вебхук на порту `WEBHOOK_PORT`. Ответы строятся
+    из `CHAT_CACHE`, к API бот обращается только при промахе кэша.
+    Без `cached` каждая команда запрашивает API: кэш обновляет цикл
+    опроса, а его нет в процессе-супервизоре.
+    """
+    if not BOT_COMMANDS:
+        return None
+    from telegram.ext import CommandHandler, Updater
+    commands = ChatCommands(
+        CHAT_CACHE if cached else None, tenants,
+        lambda tenant: check_response(
+            fetch_statuses(tenant.headers, 0, session)),
+        HOMEWORK_VERDICTS,
+    )
+    updater = Updater(token=TELEGRAM_TOKEN)
+    updater.dispatcher.add_handler(
+        CommandHandler(list(COMMANDS), commands.answer))
+    if WEBHOOK_URL:
+        updater.start_webhook(
+            listen='0.0.0.0', port=WEBHOOK_PORT, url_path=TELEGRAM_TOKEN,
+            webhook_url=f'{WEBHOOK_URL}/{TELEGRAM_TOKEN}')
+    else:
+        updater.start_polling()
+    return updater
+
+
+def stop_command_listener(updater):
+    """Останавливает приём команд, запущенный `start_command_listener`."""
+    if updater is not None:
+        updater.stop()
+
+
+def elect_leader():
+    """Ждёт, пока процесс станет ведущим, если задан `LEADER_LEASE`.
+
+    Возвращает контекст, который держит аренду до конца работы бота.
+    Потеряв аренду, процесс останавливается без доводки: см. `fence`.
+    """
+    if not LEADER_LEASE:
+        return nullcontext()
+    elector = LeaderElector(
+        make_lease(LEADER_LEASE, LEADER_LEASE_PATH), LEADER_TTL,
+        on_lost=fence)
+    shutdown = Shutdown()
+    with shutdown.installed():
+        leader = elector.wait_for_leadership(shutdown.wait)
+    if not leader:
+        elector.release()
+        sys.exit(0)
+    return elector
+
+
+def fence():
+    """Останавливает процесс, потерявший аренду ведущего.
+
+    Работу уже делает новый ведущий: очередь сообщений не досылается,
+    состояние не сохраняется, новые опросы и отправки не начинаются.
+    """
+    logger.critical('Аренда ведущего потеряна, работа прекращается')
+    FENCE.close()
+    signal.raise_signal(signal.SIGTERM)
+
+
+def make_poll_scheduler():
+    """Планировщик интервалов опроса из настроек окружения."""
+    return make_scheduler(
+        POLL_SCHEDULER, RETRY_PERIOD, reviewing=REVIEWING_PERIOD)
+
+
+def restore_state(tenant, stored, now=None):
+    """Состояние студента из хранилища или новое с начала периода."""
+    if stored is None:
+        now = CLOCK.time() if now is None else now
+        return TenantState(tenant, int(now) - RETRY_PERIOD)
+    return TenantState(
+        tenant, stored.timestamp, stored.last_message, stored.homeworks)
+
+
+def save_state(store, state):
+    """Сохраняет итог цикла студента одной транзакцией.
+
+    После потери аренды ничего не пишет, чтобы не затереть состояние,
+    сохранённое новым ведущим.
+    """
+    if FENCE.closed:
+        return
+    try:
+        with span('save_state'):
+            store.save(state.tenant.name, state.timestamp,
+                       state.last_message, state.index.dirty)
+    except sqlite3.Error as error:
+        logger.error('Не удалось сохранить состояние: %s', error,
+                     extra={'tenant': state.tenant.name})
+        return
+    state.index.dirty = {}
 
 
 def main():
     """Основная логика работы бота."""
     check_tokens()
+    STARTUP.mark('config')
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time()) - RETRY_PERIOD
+    store = SQLiteStateStore(STATE_PATH)
+    tenant = Tenant('default', PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    state = restore_state(tenant, store.load(tenant.name))
+    STARTUP.mark('state')
+    scheduler = make_poll_scheduler()
+    start_service_server()
+    updater = start_command_listener([tenant])
+    shutdown = Shutdown()
+    report_startup()
     logger.info('Бот начал работу')
-    last_message = ''
-    while True:
+    with store, shutdown.installed():
+        while not shutdown.requested:
+            HEALTH.cycle()
+            with TRACER.trace('cycle', tenant=tenant.name):
+                try:
+                    with span('poll'):
+                        response = get_api_answer(state.timestamp)
+                    messages = process_response(state, response)
+                    outcome = state.outcome()
+                    HEALTH.beat('poll')
+                except Exception as error:
+                    messages = report_failure(state, error)
+                    outcome = Outcome.ERROR
+                for message in messages:
+                    send_message(bot, message)
+                save_state(store, state)
+            delay = scheduler.next_delay(state.tenant.name, outcome)
+            HEALTH.plan(CLOCK.time() + delay)
+            try:
+                with shutdown.interruptible():
+                    time.sleep(delay)
+            except ShutdownRequested:
+                pass
+    stop_command_listener(updater)
+    logger.info('Бот остановлен, курсор %s сохранён', state.timestamp)
+
+
+def process_response(state, response):
+    """Проверяет ответ API и возвращает сообщения об изменениях статусов.
+
+    Курсор и индекс статусов обновляются только после того, как для всех
+    изменений построены сообщения, иначе сбой потерял бы изменения.
+    Некорректные работы не задерживают курсор: о каждой сообщается
+    отдельно, а изменения остальных работ применяются.
+    """
+    with STAGE_LATENCY.time(stage='check_response'), \
+            span('check_response'):
+        homeworks = check_response(response)
+    with STAGE_LATENCY.time(stage='diff'), span('diff'):
+        changes = state.index.diff(homeworks or ())
+    messages = apply_changes(
+        state, changes, response.get('current_date', int(CLOCK.time())))
+    return messages + report_rejected(
+        state, getattr(homeworks, 'rejected', ()))
+
+
+def process_stream(state, stream, notify=None, save=None):
+    """Как `process_response`, но для потока `HomeworkStream`.
+
+    Разбор, проверка и поиск изменений идут за один проход по телу ответа
+    пачками по `STREAM_BATCH` работ: изменения пачки сразу превращаются
+    в сообщения для `notify` и записываются в индекс, а `save(state)`
+    сохраняет их. Так память цикла не растёт с размером ответа, а курсор
+    сдвигается только после полного прохода. Без `notify` сообщения
+    возвращаются списком.
+    """
+    logger.debug('Проверка ответа API на корректность')
+    messages = []
+    notify = notify or messages.append
+    homeworks = iter(stream)
+    changed = False
+    with STAGE_LATENCY.time(stage='stream'), span('stream'):
+        while True:
+            batch = list(itertools.islice(homeworks, STREAM_BATCH))
+            if not batch:
+                break
+            changes = state.index.diff(batch)
+            for message in commit_changes(state, changes):
+                notify(message)
+            if changes and save is not None:
+                save(state)
+            changed = changed or bool(changes)
+    state.timestamp = stream.current_date
+    # Полный проход - сверка с API: запись кэша свежа и без изменений.
+    CHAT_CACHE.update(str(state.tenant.chat_id))
+    if not changed:
+        log_no_changes(state)
+    for message in report_rejected(state, stream.rejected):
+        notify(message)
+    return messages
+
+
+def commit_changes(state, changes):
+    """Сообщения об изменениях; затем записывает их в индекс."""
+    messages = []
+    for change in changes:
+        with STAGE_LATENCY.time(stage='parse_status'), \
+                span('parse_status', homework=change.key):
+            messages.append(parse_status(change.homework))
+    state.index.commit(changes)
+    CHANGES.inc(len(changes))
+    CHAT_CACHE.update(
+        str(state.tenant.chat_id), [change.homework for change in changes])
+    if messages:
+        state.last_message = messages[-1]
+    return messages
+
+
+def apply_changes(state, changes, current_date):
+    """Сообщения об изменениях; затем обновляет индекс и курсор."""
+    messages = commit_changes(state, changes)
+    state.timestamp = current_date
+    if not messages:
+        log_no_changes(state)
+    return messages
+
+
+def log_no_changes(state):
+    """Отмечает в логе цикл без новых статусов."""
+    logger.debug('%s: Нет новых статусов.', state.tenant.name,
+                 extra={'tenant': state.tenant.name})
+
+
+def report_failure(state, error):
+    """Логирует сбой цикла и возвращает сообщение, если оно новое."""
+    message = f'Сбой в работе программы: {error}'
+    logger.error('%s: %s', state.tenant.name, message, exc_info=error,
+                 extra={'tenant': state.tenant.name})
+    ERRORS.inc(type=type(error).__name__)
+    if message == state.last_message:
+        return []
+    state.last_message = message
+    return [message]
+
+
+def report_rejected(state, rejected):
+    """Сообщения о работах, отклонённых проверкой, по одному на работу.
+
+    Курсор к этому моменту уже сдвинут, поэтому следующий опрос не
+    вернёт те же работы, пока они не обновятся.
+    """
+    messages = []
+    for error in rejected:
+        messages.extend(report_failure(state, error))
+    return messages
+
+
+def poll_tenant(bot, state, session=None, store=None, outbox=None,
+                stream=False):
+    """Один цикл опроса API и уведомления для студента `state.tenant`.
+
+    С `outbox` сообщения ставятся в очередь, иначе отправляются сразу.
+    Со `stream` ответ разбирается потоково через `HomeworkStream`.
+    Запрос условный: валидаторы прошлого ответа отправляются в
+    `If-None-Match`/`If-Modified-Since`, и ответ 304 обрабатывается как
+    отсутствие изменений без разбора.
+    """
+    FENCE.check()
+    tenant = state.tenant
+    deadline = Deadline(POLL_DEADLINE)
+    with TRACER.trace('cycle', tenant=tenant.name):
         try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            timestamp = response.get(
-                'current_date', int(time.time())
-            )
-            if homeworks:
-                message = parse_status(homeworks[0])
+            response = request_statuses(
+                {**tenant.headers, **state.validators}, state.timestamp,
+                session, stream=stream, timeout=poll_timeout(deadline))
+            if response is None:
+                messages = apply_changes(state, [], state.timestamp)
+            elif stream:
+                messages = process_stream(
+                    state, stream_body(response, deadline),
+                    None if outbox is None else functools.partial(
+                        outbox.put, tenant.chat_id),
+                    None if store is None else functools.partial(
+                        save_state, store))
             else:
-                message = 'Нет новых статусов.'
-            if message != last_message:
-                send_message(bot, message)
-                last_message = message
+                with span('json.decode'):
+                    payload = response.json()
+                messages = process_response(state, payload)
+            if response is not None:
+                state.validators = conditional_headers(response.headers)
+            outcome = state.outcome()
+            HEALTH.beat('poll')
+        except Exception as error:
+            messages = report_failure(state, error)
+            outcome = Outcome.ERROR
+        for message in messages:
+            if outbox is None:
+                send_to_chat(bot, tenant.chat_id, message)
             else:
-                logger.debug(message)
+                outbox.put(tenant.chat_id, message)
+        if store is not None:
+            save_state(store, state)
+    return outcome
+
+
+def make_engine(bot, tenants, client, store, scheduler=None,
+                outbox=None, period=RETRY_PERIOD, clock=None, health=None):
+    """Собирает движок опроса студентов с общими клиентом и очередью.
+
+    `clock` - часы движка и очереди, например `VirtualClock` в симуляции,
+    `health` получает сердцебиение цикла и длину очереди сообщений.
+    """
+    clock = clock or CLOCK
+    stored = store.load_all()
+    outbox = outbox or Outbox(
+        TELEGRAM_RATE, clock=clock.monotonic, redact=redact_token)
+    if health is not None:
+        health.queue('outbox', outbox.__len__)
+    return PollingEngine(
+        tenants,
+        lambda state: poll_tenant(
+            bot, state, client, store, outbox, stream=True),
+        period,
+        scheduler or make_poll_scheduler(),
+        restore=lambda tenant: restore_state(
+            tenant, stored.get(tenant.name), clock.time()),
+        outbox=outbox,
+        deliver=lambda chat_id, text: deliver_to_chat(bot, chat_id, text),
+        resume=lambda state: resume_at(stored.get(state.tenant.name), period),
+        health=health,
+        time_func=clock.time,
+        sleep=clock.sleep,
+    )
+
 
+def resume_at(stored, period=RETRY_PERIOD):
+    """Когда опросить студента после перезапуска по сохранённому курсору.
+
+    Курсор - время последнего успешного ответа API, поэтому следующий
+    опрос положен через `period` после него; для нового студента None.
+    """
+    if stored is None:
+        return None
+    return stored.timestamp + period
+
+
+def run_tenants(tenants=None, shard=None):
+    """Логика работы бота для всех студентов из реестра.
+
+    В рабочем процессе `shard` опрашивает переданных `tenants`, а на
+    команды отвечает супервизор.
+    """
+    if tenants is None:
+        tenants = load_checked_tenants()
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    start_service_server(shard or 0)
+    shutdown = Shutdown()
+    with SQLiteStateStore(STATE_PATH) as store, \
+            PracticumClient(POOL_SIZE, MAX_RETRIES, breaker=make_breaker(),
+                            hedger=make_hedger()) as client, \
+            shutdown.installed():
+        engine = make_engine(bot, tenants, client, store, health=HEALTH)
+        STARTUP.mark('state')
+        updater = None
+        if shard is None:
+            updater = start_command_listener(tenants, client)
+        report_startup()
+        logger.info('Бот начал работу')
+        try:
+            engine.run(shutdown, DRAIN_TIMEOUT)
+        except Fenced as error:
+            logger.warning('Остановка без отправки очереди: %s', error)
+        stop_command_listener(updater)
+    logger.info('Бот остановлен')
+
+
+def run_shard(shard, tenants):
+    """Рабочий процесс `Supervisor`: опрашивает свою часть студентов."""
+    # Своя группа процессов: Ctrl+C в терминале получает только
+    # супервизор, и он сам останавливает рабочих.
+    os.setpgrp()
+    configure_logging()
+    configure_tracing(shard)
+    run_tenants(tenants, shard)
+
+
+def run_supervisor():
+    """Опрос студентов в `SHARD_WORKERS` процессах под супервизором."""
+    tenants = load_checked_tenants()
+    supervisor = Supervisor(
+        run_shard, tenants, SHARD_WORKERS, stop_timeout=DRAIN_TIMEOUT + 5)
+    FENCE.add_callback(supervisor.fence)
+    shutdown = Shutdown()
+    # Опрашивают рабочие процессы, и CHAT_CACHE супервизора они не
+    # обновляют: ответ из него устарел бы на COMMAND_CACHE_TTL.
+    updater = start_command_listener(tenants, cached=False)
+    logger.info('Супервизор запускает %s процессов для %s студентов',
+                SHARD_WORKERS, len(tenants))
+    with shutdown.installed(), supervisor.installed():
+        supervisor.run(shutdown)
+    stop_command_listener(updater)
+    logger.info('Бот остановлен')
+
+
+async def async_fetch_statuses(transport, headers, current_timestamp,
+                               breaker=None, hedger=None):
+    """Асинхронный запрос статусов домашних работ.
+
+    Возвращает разобранный ответ и его заголовки; ответ None, если на
+    условный запрос сервер ответил 304. С `hedger` медленный запрос
+    страхуется вторым.
+    """
+    timestamp = (int(CLOCK.time()) if current_timestamp is None
+                 else current_timestamp)
+    params_request = {
+        'url': ENDPOINT,
+        'headers': headers,
+        'params': {'from_date': timestamp},
+    }
+    logger.debug('Начало запроса к API. Запрос: %s, %s.',
+                 ENDPOINT, params_request['params'])
+    POLLS.inc()
+    if breaker is not None:
+        breaker.allow()
+    try:
+        get = functools.partial(transport.get, **params_request)
+        with API_LATENCY.time(), span('http.request') as current:
+            status_code, payload, headers = await (
+                get() if hedger is None else hedger.async_call(get))
+            current.set(status=status_code)
+    except ConnectionError:
+        if breaker is not None:
+            breaker.record_failure()
+        raise
+    if breaker is not None:
+        breaker.record_status(status_code)
+    if not check_status_code(status_code, params_request):
+        return None, headers
+    return payload, headers
+
+
+async def async_deliver(transport, chat_id, message):
+    """Асинхронная отправка в Telegram, ошибки передаются вызывающему."""
+    FENCE.check()
+    url = f'{TELEGRAM_API}/bot{TELEGRAM_TOKEN}/sendMessage'
+    try:
+        with SEND_LATENCY.time(), \
+                TRACER.trace('telegram.send', chat=chat_id):
+            status_code, payload = await transport.post_json(
+                url, {'chat_id': chat_id, 'text': message})
+    except ConnectionError as error:
+        SENDS.inc(result='error')
+        raise telegram.error.NetworkError(redact_token(error))
+    payload = payload or {}
+    SENDS.inc(result='ok' if payload.get('ok') else 'error')
+    if payload.get('ok'):
+        HEALTH.beat('send')
+        return
+    retry_after = payload.get('parameters', {}).get('retry_after')
+    if retry_after:
+        raise telegram.error.RetryAfter(retry_after)
+    raise telegram.TelegramError(
+        f'Код {status_code}. {payload.get("description", "")}')
+
+
+async def async_send_to_chat(transport, chat_id, message):
+    """Асинхронно отправляет сообщение `message` в telegram-чат."""
+    logger.debug('Попытка отправить сообщение в Telegram.')
+    try:
+        await async_deliver(transport, chat_id, message)
+    except (telegram.TelegramError, Fenced) as error:
+        logger.error('Не удалось отправить сообщение в Telegram. %s',
+                     redact_token(error))
+        return
+    logger.debug('Сообщение в Telegram успешно отправлено.')
+
+
+async def async_pump_outbox(transport, outbox, done=None,
+                            drain_timeout=DRAIN_TIMEOUT):
+    """Отправляет сообщения из очереди, соблюдая лимиты Telegram.
+
+    После события `done` досылает очередь не дольше `drain_timeout`
+    секунд, дожидается начатых отправок и завершается. После потери
+    аренды завершается сразу, отменяя начатые отправки.
+    """
+    sending = set()
+    deadline = None
+
+    async def send(chat_id, text):
+        try:
+            await async_deliver(transport, chat_id, text)
+        except Fenced:
+            return
         except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(message, exc_info=True)
-            if message != last_message:
-                send_message(bot, message)
-                last_message = message
-        finally:
-            time.sleep(RETRY_PERIOD)
+            outbox.handle_error(chat_id, text, error)
+
+    while not FENCE.closed:
+        item = outbox.take()
+        if isinstance(item, tuple):
+            task = asyncio.create_task(send(*item))
+            sending.add(task)
+            task.add_done_callback(sending.discard)
+            continue
+        if done is not None and done.is_set():
+            loop = asyncio.get_running_loop()
+            deadline = deadline or loop.time() + drain_timeout
+            if item is None or loop.time() + item > deadline:
+                break
+        await asyncio.sleep(OUTBOX_IDLE_PERIOD if item is None else item)
+    await async_finish_sends(sending, drain_timeout)
+    if len(outbox):
+        logger.warning(
+            'Остановка: сообщения для %s чатов не отправлены', len(outbox))
+
+
+async def async_finish_sends(sending, timeout):
+    """Дожидается начатых отправок, а после потери аренды отменяет их."""
+    if FENCE.closed:
+        for task in sending:
+            task.cancel()
+    elif sending:
+        await asyncio.wait(sending, timeout=timeout)
+
+
+async def async_poll_tenant(transport, state, store=None, outbox=None,
+                            breaker=None, hedger=None):
+    """Асинхронный цикл опроса API и уведомления для студента."""
+    FENCE.check()
+    tenant = state.tenant
+    with TRACER.trace('cycle', tenant=tenant.name):
+        try:
+            response, headers = await async_fetch_statuses(
+                transport, {**tenant.headers, **state.validators},
+                state.timestamp, breaker, hedger)
+            if response is None:
+                messages = apply_changes(state, [], state.timestamp)
+            else:
+                messages = process_response(state, response)
+                state.validators = conditional_headers(headers)
+            outcome = state.outcome()
+            HEALTH.beat('poll')
+        except Exception as error:
+            messages = report_failure(state, error)
+            outcome = Outcome.ERROR
+        for message in messages:
+            if outbox is None:
+                await async_send_to_chat(transport, tenant.chat_id, message)
+            else:
+                outbox.put(tenant.chat_id, message)
+        if store is not None:
+            save_state(store, state)
+    return outcome
+
+
+async def async_wait(stop, delay):
+    """Ждёт `delay` секунд или события `stop`; True, если оно наступило."""
+    if stop is None:
+        await asyncio.sleep(delay)
+        return False
+    try:
+        await asyncio.wait_for(stop.wait(), delay)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def async_poll_forever(poll, semaphore, scheduler, state, delay,
+                             stop=None):
+    """Опрашивает API для одного студента через `poll` до события `stop`.
+
+    Начатый опрос доводится до конца, ожидание следующего прерывается.
+    """
+    while not await async_wait(stop, delay):
+        async with semaphore:
+            outcome = await poll(state)
+        delay = scheduler.next_delay(state.tenant.name, outcome)
+
+
+async def async_watch_loop(health, interval=1.0):
+    """Измеряет задержку event loop: насколько позже просыпается `sleep`.
+
+    Пока loop не заблокирован, `health` получает сердцебиение каждые
+    `interval` секунд.
+    """
+    while True:
+        health.plan(CLOCK.time() + interval)
+        await asyncio.sleep(interval)
+        health.cycle()
+
+
+def install_async_shutdown(shutdown):
+    """Обработчики SIGTERM и SIGINT в работающем event loop.
+
+    Возвращает событие asyncio, которое наступает при остановке.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    shutdown.add_callback(stop.set)
+    for signum in SIGNALS:
+        loop.add_signal_handler(signum, shutdown.handle, signum, None)
+    return stop
+
+
+def async_pool_size():
+    """Соединений к API в asyncio: по одному на каждый цикл опроса.
+
+    Опросы ограничены `MAX_IN_FLIGHT`, и со страхующими запросами каждый
+    может держать два соединения. Пул не меньше этого числа, иначе
+    ожидание свободного соединения съедает `POLL_DEADLINE`.
+    """
+    return MAX_IN_FLIGHT * (2 if HEDGE_REQUESTS else 1)
+
+
+def resume_delay(stored, spread):
+    """Задержка первого опроса: по сохранённому курсору, не позже `spread`."""
+    due = resume_at(stored)
+    if due is None:
+        return spread
+    return max(0, min(spread, due - CLOCK.time()))
+
+
+async def async_main():
+    """Логика работы бота в asyncio: студенты опрашиваются конкурентно."""
+    tenants = load_checked_tenants()
+    semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+    scheduler = make_poll_scheduler()
+    step = RETRY_PERIOD / len(tenants)
+    start_service_server()
+    updater = start_command_listener(tenants)
+    stop, done = install_async_shutdown(Shutdown()), asyncio.Event()
+    with SQLiteStateStore(STATE_PATH) as store:
+        stored = store.load_all()
+        STARTUP.mark('state')
+        outbox = Outbox(TELEGRAM_RATE, redact=redact_token)
+        HEALTH.queue('outbox', outbox.__len__)
+        report_startup()
+        logger.info('Бот начал работу')
+        async with make_transport(async_pool_size(), POLL_DEADLINE,
+                                  API_CONNECT_TIMEOUT,
+                                  API_READ_TIMEOUT) as transport, \
+                make_transport(TELEGRAM_POOL_SIZE, POLL_DEADLINE,
+                               API_CONNECT_TIMEOUT,
+                               API_READ_TIMEOUT) as sender:
+            poll = functools.partial(
+                async_poll_tenant, transport, store=store, outbox=outbox,
+                breaker=make_breaker(), hedger=make_hedger())
+            pump = asyncio.create_task(
+                async_pump_outbox(sender, outbox, done))
+            watch = asyncio.create_task(async_watch_loop(HEALTH))
+            pollers = [
+                async_poll_forever(
+                    poll, semaphore, scheduler,
+                    restore_state(tenant, stored.get(tenant.name)),
+                    resume_delay(stored.get(tenant.name), index * step),
+                    stop)
+                for index, tenant in enumerate(tenants)
+            ]
+            # Состояние уже в индексах студентов: словари из хранилища
+            # не должны жить до остановки бота.
+            del stored
+            try:
+                await asyncio.gather(*pollers)
+            except Fenced as error:
+                logger.warning('Остановка без отправки очереди: %s', error)
+            done.set()
+            watch.cancel()
+            await pump
+    stop_command_listener(updater)
+    logger.info('Бот остановлен')
+
+
+STARTUP.mark('import')
 
 
 if __name__ == '__main__':
-    main()
+    configure_logging()
+    configure_tracing()
+    with elect_leader():
+        if ASYNC_MODE:
+            asyncio.run(async_main())
+        elif SHARD_WORKERS:
+            run_supervisor()
+        elif TENANTS_FILE or TENANTS:
+            run_tenants()
+        else:
+            main()
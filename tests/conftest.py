@@ -1,6 +1,8 @@
 import sys
 import os
 
+import pytest
+
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -19,10 +21,22 @@ if (
     )
 
 pytest_plugins = [
-    'tests.fixtures.fixture_data'
+    'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_servers',
 ]
 
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+os.environ['BOT_STATE_PATH'] = ':memory:'
+
+
+@pytest.fixture
+def clock():
+    """Virtual clock at 1000 s: time moves only through `clock.sleep`.
+
+    Pass `clock.time` where code expects a clock function.
+    """
+    from assistant.clock import VirtualClock
+    return VirtualClock(1000.0)
 
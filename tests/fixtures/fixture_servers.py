@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        server = self.server
+        server.peers.add(self.client_address)
+        server.requests.append((self.command, self.path,
+                                dict(self.headers), body))
+        path = self.path.split('?')[0]
+        time.sleep(server.delays.get(path, 0))
+        status, payload = server.routes.get(
+            path, (404, {'detail': 'not found'}))
+        etag = server.etags.get(path)
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+@pytest.fixture
+def fake_api():
+    """Local HTTP server answering JSON from `server.routes`.
+
+    Paths listed in `server.etags` carry an ETag and answer 304 to a
+    matching `If-None-Match`; paths in `server.delays` answer after the
+    given number of seconds.
+    """
+    server = FakeAPIServer(('127.0.0.1', 0), FakeAPIHandler)
+    server.routes = {}
+    server.etags = {}
+    server.delays = {}
+    server.requests = []
+    server.peers = set()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,225 @@
+import asyncio
+import json
+
+import pytest
+
+from assistant import aio
+from assistant.engine import TenantState
+from assistant.tenants import Tenant
+
+TRANSPORTS = [aio.ThreadedTransport]
+if aio.aiohttp is not None:
+    TRANSPORTS.append(aio.AiohttpTransport)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def async_env(monkeypatch, fake_api, homework_module):
+    monkeypatch.setattr(
+        homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+    monkeypatch.setattr(homework_module, 'TELEGRAM_API', fake_api.url)
+    monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+    fake_api.routes['/bot1234:abcdefg/sendMessage'] = (
+        200, {'ok': True, 'result': {}})
+    return fake_api
+
+
+class TestAsyncPipeline:
+
+    @pytest.mark.parametrize('transport_class', TRANSPORTS)
+    def test_poll_and_send(self, transport_class, async_env,
+                           homework_module):
+        async_env.routes['/statuses/'] = (200, {
+            'homeworks': [{'homework_name': 'hw', 'status': 'reviewing'}],
+            'current_date': 555,
+        })
+        state = TenantState(Tenant('ivan', 'token', '42'), 100)
+
+        async def scenario():
+            async with transport_class(pool_size=4) as transport:
+                await homework_module.async_poll_tenant(transport, state)
+                await homework_module.async_poll_tenant(transport, state)
+
+        run(scenario())
+        sends = [item for item in async_env.requests if item[0] == 'POST']
+        assert len(sends) == 1, 'Повторное сообщение не должно отправляться.'
+        assert json.loads(sends[0][3]) == {
+            'chat_id': '42', 'text': state.last_message}
+        assert state.timestamp == 555
+        polls = [item for item in async_env.requests if item[0] == 'GET']
+        assert polls[0][2]['Authorization'] == 'OAuth token'
+
+    @pytest.mark.parametrize('transport_class', TRANSPORTS)
+    def test_poll_is_traced(self, transport_class, async_env, monkeypatch,
+                            homework_module):
+        from assistant.tracing import Tracer
+
+        traces = []
+        exporter = type('Exporter', (), {'export': traces.append})()
+        monkeypatch.setattr(homework_module, 'TRACER', Tracer(exporter))
+        async_env.routes['/statuses/'] = (200, {
+            'homeworks': [{'id': 3, 'homework_name': 'hw',
+                           'status': 'reviewing'}],
+            'current_date': 555,
+        })
+        state = TenantState(Tenant('ivan', 'token', '42'), 100)
+
+        async def scenario():
+            async with transport_class(pool_size=4) as transport:
+                await homework_module.async_poll_tenant(transport, state)
+
+        run(scenario())
+        (trace,) = traces
+        spans = {item.name: item for item in trace.spans}
+        assert {'cycle', 'http.connect', 'http.request', 'parse_status',
+                'telegram.send'} <= set(spans)
+        assert spans['cycle'].attrs == {'tenant': 'ivan'}
+        assert spans['parse_status'].attrs == {'homework': '3'}
+
+    @pytest.mark.parametrize('transport_class', TRANSPORTS)
+    def test_not_modified_keeps_state(self, transport_class, async_env,
+                                      homework_module):
+        async_env.routes['/statuses/'] = (200, {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 555,
+        })
+        async_env.etags['/statuses/'] = '"v7"'
+        state = TenantState(Tenant('ivan', 'token', '42'), 100)
+
+        async def scenario():
+            async with transport_class(pool_size=4) as transport:
+                await homework_module.async_poll_tenant(transport, state)
+                state.last_message = ''
+                await homework_module.async_poll_tenant(transport, state)
+
+        run(scenario())
+        polls = [item for item in async_env.requests if item[0] == 'GET']
+        assert polls[1][2]['If-None-Match'] == '"v7"'
+        assert state.last_message == ''
+        assert state.timestamp == 555
+
+    def test_api_error_is_reported(self, async_env, homework_module):
+        async_env.routes['/statuses/'] = (500, {})
+        state = TenantState(Tenant('ivan', 'token', '42'), 100)
+
+        async def scenario():
+            async with aio.make_transport() as transport:
+                await homework_module.async_poll_tenant(transport, state)
+
+        run(scenario())
+        assert state.last_message.startswith('Сбой в работе программы')
+        assert state.timestamp == 100
+
+    def test_failed_send_is_logged(self, async_env, caplog,
+                                   homework_module):
+        async_env.routes['/bot1234:abcdefg/sendMessage'] = (
+            403, {'ok': False, 'description': 'Forbidden'})
+
+        async def scenario():
+            async with aio.make_transport() as transport:
+                await homework_module.async_send_to_chat(
+                    transport, '42', 'text')
+
+        run(scenario())
+        assert 'Forbidden' in caplog.text
+
+    def test_many_tenants_in_flight(self, async_env, homework_module):
+        async_env.routes['/statuses/'] = (
+            200, {'homeworks': [], 'current_date': 1})
+        states = [TenantState(Tenant(str(i), f't{i}', str(i)), 0)
+                  for i in range(50)]
+
+        async def scenario():
+            async with aio.make_transport(pool_size=10) as transport:
+                await asyncio.gather(*(
+                    homework_module.async_poll_tenant(transport, state)
+                    for state in states
+                ))
+
+        run(scenario())
+        assert all(state.timestamp == 1 for state in states)
+
+    def test_pool_fits_polls_in_flight(self, async_env, homework_module,
+                                       monkeypatch):
+        monkeypatch.setattr(homework_module, 'MAX_IN_FLIGHT', 40)
+        monkeypatch.setattr(homework_module, 'HEDGE_REQUESTS', None)
+        assert homework_module.async_pool_size() == 40
+        async_env.routes['/statuses/'] = (
+            200, {'homeworks': [], 'current_date': 1})
+        async_env.delays['/statuses/'] = 0.3
+        states = [TenantState(Tenant(str(i), f't{i}', str(i)), 0)
+                  for i in range(40)]
+
+        async def scenario():
+            semaphore = asyncio.Semaphore(homework_module.MAX_IN_FLIGHT)
+            async with aio.make_transport(
+                    homework_module.async_pool_size(), 1.0) as transport:
+
+                async def poll(state):
+                    async with semaphore:
+                        return await homework_module.async_poll_tenant(
+                            transport, state)
+
+                return await asyncio.gather(*map(poll, states))
+
+        outcomes = run(scenario())
+        assert homework_module.Outcome.ERROR not in outcomes
+        assert all(state.timestamp == 1 for state in states)
+        monkeypatch.setattr(homework_module, 'HEDGE_REQUESTS', '1')
+        assert homework_module.async_pool_size() == 80
+
+    def test_stop_waits_for_poll_and_drains(self, async_env,
+                                            homework_module):
+        from assistant.outbox import Outbox
+        from assistant.scheduler import FixedScheduler
+        outbox = Outbox()
+        polled = []
+
+        async def scenario():
+            stop, done = asyncio.Event(), asyncio.Event()
+
+            async def poll(state):
+                polled.append(state.tenant.name)
+                stop.set()
+                await asyncio.sleep(0.05)
+                outbox.put(state.tenant.chat_id, 'done')
+
+            state = TenantState(Tenant('ivan', 'token', '42'), 0)
+            async with aio.make_transport() as transport:
+                pump = asyncio.create_task(homework_module.async_pump_outbox(
+                    transport, outbox, done, drain_timeout=5))
+                await homework_module.async_poll_forever(
+                    poll, asyncio.Semaphore(1), FixedScheduler(600), state,
+                    0, stop)
+                done.set()
+                await asyncio.wait_for(pump, 5)
+
+        run(scenario())
+        assert polled == ['ivan']
+        assert len(outbox) == 0
+        sends = [item for item in async_env.requests if item[0] == 'POST']
+        assert json.loads(sends[0][3]) == {'chat_id': '42', 'text': 'done'}
+
+    def test_fenced_pump_does_not_drain(self, async_env, monkeypatch,
+                                        homework_module):
+        from assistant.outbox import Outbox
+        from assistant.shutdown import Fence
+        fence = Fence()
+        fence.close()
+        monkeypatch.setattr(homework_module, 'FENCE', fence)
+        outbox = Outbox()
+        outbox.put('42', 'late')
+
+        async def scenario():
+            done = asyncio.Event()
+            done.set()
+            async with aio.make_transport() as transport:
+                await asyncio.wait_for(homework_module.async_pump_outbox(
+                    transport, outbox, done, drain_timeout=5), 5)
+
+        run(scenario())
+        assert len(outbox) == 1
+        assert not [item for item in async_env.requests if item[0] == 'POST']
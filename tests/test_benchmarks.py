@@ -0,0 +1,146 @@
+import argparse
+
+import pytest
+import requests
+
+import homework
+from benchmarks import load, memory, schema, simulate
+from benchmarks.fakes import (HOMEWORKS_PATH, FakePracticumServer,
+                              FakeTelegramServer, serve_in_background)
+
+
+@pytest.fixture
+def fakes():
+    practicum = serve_in_background(
+        FakePracticumServer(change_rate=1.0, seed=1))
+    telegram = serve_in_background(FakeTelegramServer(seed=1))
+    yield practicum, telegram
+    for server in (practicum, telegram):
+        server.shutdown()
+        server.server_close()
+
+
+class TestFakes:
+
+    def test_practicum_returns_changed_homeworks(self, fakes):
+        practicum, _ = fakes
+        response = requests.get(
+            practicum.url, headers={'Authorization': 'OAuth a'},
+            params={'from_date': 0}, timeout=5)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body['homeworks']) == 3
+        assert practicum.url.endswith(HOMEWORKS_PATH)
+
+    def test_telegram_counts_messages(self, fakes):
+        _, telegram = fakes
+        response = requests.post(
+            f'{telegram.url}/bot123:abc/sendMessage',
+            json={'chat_id': 1, 'text': 'hi'}, timeout=5)
+        assert response.json()['ok']
+        assert telegram.calls['sendMessage'] == 1
+
+
+class TestLoad:
+
+    def test_recorder_summary(self):
+        recorder = load.Recorder()
+        recorder.latencies['poll'] = [0.001 * n for n in range(1, 101)]
+        summary = recorder.summary('poll', duration=10)
+        assert summary['rate'] == 10
+        assert summary['p50'] == pytest.approx(51)
+        assert summary['p99'] == pytest.approx(100)
+        assert recorder.summary('send', 1)['p50'] is None
+
+    @pytest.mark.parametrize('mode', sorted(load.MODES))
+    def test_short_run_polls_and_sends(self, fakes, monkeypatch, mode):
+        practicum, telegram = fakes
+        for name in ('ENDPOINT', 'TELEGRAM_API', 'TELEGRAM_TOKEN'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        options = argparse.Namespace(
+            duration=1.5, period=0.1, pool_size=4, telegram_rate=30)
+        recorder, duration = load.MODES[mode](
+            5, options, practicum.url, telegram.url)
+        assert duration >= options.duration
+        assert recorder.latencies['poll']
+        assert recorder.latencies['send']
+        assert load.rss_mb() > 0
+
+
+class TestSimulate:
+
+    START = 1700000000
+
+    def make_timeline(self, tenants, outages=()):
+        events = {tenants[0].name: [
+            (self.START + 100, 'hw', 'hw', 'reviewing'),
+            (self.START + 5000, 'hw', 'hw', 'approved'),
+        ]}
+        return simulate.Timeline(self.START, events, outages)
+
+    def test_virtual_clock(self):
+        from assistant.clock import VirtualClock
+        clock = VirtualClock(10)
+        clock.sleep(5)
+        clock.sleep(-1)
+        assert clock.time() == clock.monotonic() == 15
+
+    def test_timeline_response(self):
+        tenants = load.make_tenants(1)
+        timeline = self.make_timeline(tenants)
+        response = timeline.response('bench0', self.START, self.START + 200)
+        assert [item['status'] for item in response['homeworks']] == [
+            'reviewing']
+        assert timeline.response(
+            'bench0', self.START + 200, self.START + 300)['homeworks'] == []
+
+    @pytest.mark.parametrize('etag', [True, False])
+    def test_fixed_schedule_delays(self, etag):
+        from assistant.scheduler import FixedScheduler
+        tenants = load.make_tenants(2)
+        result = simulate.simulate(
+            tenants, self.make_timeline(tenants), 2 * 3600,
+            FixedScheduler(600), etag=etag)
+        assert result['polls'] == 25
+        assert result['messages'] == 2
+        assert result['missed'] == 0
+        assert result['delay_max_s'] == 500
+
+    def test_outage_delays_notification(self):
+        from assistant.scheduler import FixedScheduler
+        tenants = load.make_tenants(1)
+        timeline = self.make_timeline(
+            tenants, [(self.START + 500, self.START + 1300, 503)])
+        result = simulate.simulate(
+            tenants, timeline, 3600, FixedScheduler(600))
+        assert result['delay_p50_s'] == 1700
+
+
+class TestSchema:
+
+    def test_body_is_valid_response(self):
+        import json
+        homeworks = homework.check_response(json.loads(schema.make_body(3)))
+        assert [item.key for item in homeworks] == ['0', '1', '2']
+
+    def test_measure_reports_per_entry_cost(self):
+        row = schema.measure(homework, 100, repeat=1)
+        assert row['homeworks'] == 100
+        assert row['decode_ns'] > 0 and row['validate_ns'] > 0
+
+
+class TestMemory:
+
+    def test_bodies_split_homeworks_between_tenants(self):
+        import json
+        bodies = memory.make_bodies(10, 2)
+        assert len(bodies) == 2
+        assert len(homework.check_response(json.loads(bodies[0]))) == 5
+
+    def test_compact_index_is_smaller_than_tuples(self):
+        bodies = memory.make_bodies(2000, 4)
+        states = memory.build_states(homework)
+        tuples = memory.measure('tuples', states['tuples'], bodies)
+        index = memory.measure('index', states['index'], bodies)
+        assert tuples['homeworks'] == index['homeworks'] == 2000
+        assert index['bytes_per_homework'] < tuples['bytes_per_homework']
@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+from assistant.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                               CircuitOpenError)
+from assistant.client import PracticumClient
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, clock=clock.time)
+        for _ in range(2):
+            breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_success()
+        for _ in range(3):
+            breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+
+    def test_half_open_probe(self, clock):
+        transitions = []
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30,
+                                 clock=clock.time)
+        breaker.listeners.append(
+            lambda breaker, previous, state: transitions.append(state))
+        breaker.record_failure()
+        clock.sleep(30)
+        breaker.allow()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.sleep(30)
+        breaker.allow()
+        breaker.record_status(404)
+        assert breaker.state == CLOSED
+        assert transitions == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+    def test_server_errors_count_as_failures(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, clock=clock.time)
+        breaker.record_status(503)
+        breaker.record_status(500)
+        assert breaker.state == OPEN
+
+
+class TestClientWithBreaker:
+
+    def test_open_breaker_short_circuits(self, fake_api, monkeypatch,
+                                         homework_module, clock):
+        fake_api.routes['/statuses/'] = (500, {})
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        breaker = CircuitBreaker(failure_threshold=2, clock=clock.time)
+        with PracticumClient(max_retries=0, breaker=breaker) as client:
+            for _ in range(2):
+                with pytest.raises(ValueError):
+                    homework_module.fetch_statuses({}, 1, client)
+            with pytest.raises(ConnectionError):
+                homework_module.fetch_statuses({}, 1, client)
+        assert len(fake_api.requests) == 2, (
+            'При разомкнутом выключателе запрос к API не выполняется.'
+        )
+
+    def test_connection_error_is_failure(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, clock=clock.time)
+        with PracticumClient(max_retries=0, breaker=breaker) as client:
+            with pytest.raises(requests.RequestException):
+                client.get('http://127.0.0.1:9/', timeout=1)
+        assert breaker.state == OPEN
@@ -0,0 +1,160 @@
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from assistant.client import Deadline, PracticumClient, conditional_headers
+
+
+class TestPracticumClient:
+
+    def test_adapter_settings(self):
+        with PracticumClient(pool_size=25, max_retries=4) as client:
+            adapter = client.session.get_adapter('https://practicum.yandex.ru')
+            assert adapter._pool_maxsize == 25
+            assert adapter.max_retries.total == 4
+            assert 502 in adapter.max_retries.status_forcelist
+
+    def test_connection_is_reused(self, monkeypatch, fake_api,
+                                  homework_module):
+        fake_api.routes['/statuses/'] = (
+            200, {'homeworks': [], 'current_date': 1})
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        with PracticumClient() as client:
+            for _ in range(5):
+                response = homework_module.fetch_statuses(
+                    {'Authorization': 'OAuth token'}, 1, client)
+                assert response == {'homeworks': [], 'current_date': 1}
+        assert len(fake_api.peers) == 1, (
+            'Все опросы должны идти через одно keep-alive соединение.'
+        )
+
+
+class TestConditionalHeaders:
+
+    def test_validators_become_request_headers(self):
+        headers = conditional_headers({
+            'etag': '"v1"', 'Last-Modified': 'Wed, 01 Jan 2026 00:00:00 GMT',
+            'Content-Type': 'application/json'})
+        assert headers == {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 01 Jan 2026 00:00:00 GMT'}
+
+    def test_no_validators(self):
+        assert conditional_headers({'Content-Type': 'text/plain'}) == {}
+        assert conditional_headers(None) == {}
+
+
+@pytest.fixture
+def slow_body_url():
+    """Сервер, который отдаёт тело ответа по байту раз в 0.1 с."""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    stop = threading.Event()
+
+    def serve():
+        connection, _ = listener.accept()
+        with connection:
+            connection.recv(65536)
+            connection.sendall(b'HTTP/1.1 200 OK\r\n'
+                               b'Content-Type: application/json\r\n'
+                               b'Content-Length: 100\r\n\r\n')
+            for _ in range(100):
+                if stop.wait(0.1):
+                    return
+                try:
+                    connection.sendall(b' ')
+                except OSError:
+                    return
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    host, port = listener.getsockname()
+    yield f'http://{host}:{port}/statuses/'
+    stop.set()
+    listener.close()
+
+
+class TestDeadline:
+
+    def test_phase_timeouts_within_deadline(self, clock):
+        deadline = Deadline(30, clock.monotonic)
+        clock.now += 25
+        timeout = deadline.timeout(3, 10)
+        assert timeout.connect_timeout == 3
+        assert timeout.total == 5
+
+    def test_expired_deadline(self, clock):
+        deadline = Deadline(1, clock.monotonic)
+        chunks = deadline.chunks(iter([b'a', b'b']))
+        assert next(chunks) == b'a'
+        clock.now += 2
+        with pytest.raises(TimeoutError):
+            next(chunks)
+        with pytest.raises(TimeoutError):
+            deadline.timeout(3, 10)
+
+    def test_retries_stay_within_deadline(self, fake_api):
+        fake_api.routes['/statuses/'] = (503, {})
+        fake_api.delays['/statuses/'] = 1.0
+        with PracticumClient(max_retries=3) as client:
+            started = time.monotonic()
+            deadline = Deadline(1.5)
+            with pytest.raises(requests.RequestException):
+                client.get(fake_api.url + '/statuses/',
+                           timeout=deadline.timeout(1, 5))
+            elapsed = time.monotonic() - started
+        assert elapsed < 1.8
+        assert len(fake_api.requests) == 2
+
+    def test_no_retry_without_time_for_pause(self, fake_api):
+        fake_api.routes['/statuses/'] = (503, {})
+        with PracticumClient(max_retries=3, backoff_factor=10) as client:
+            started = time.monotonic()
+            response = client.get(fake_api.url + '/statuses/',
+                                  timeout=Deadline(2).timeout(1, 1))
+            elapsed = time.monotonic() - started
+        assert response.status_code == 503
+        assert elapsed < 1.5
+        assert len(fake_api.requests) == 2
+
+    def test_slow_body_is_cut_at_deadline(self, monkeypatch, slow_body_url,
+                                          homework_module):
+        monkeypatch.setattr(homework_module, 'ENDPOINT', slow_body_url)
+        monkeypatch.setattr(homework_module, 'POLL_DEADLINE', 1)
+        monkeypatch.setattr(homework_module, 'API_READ_TIMEOUT', 0.5)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            homework_module.get_api_answer(0)
+        assert time.monotonic() - started < 1.5
+
+    def test_slow_streamed_body_is_cut_at_deadline(
+            self, monkeypatch, slow_body_url, homework_module):
+        monkeypatch.setattr(homework_module, 'ENDPOINT', slow_body_url)
+        monkeypatch.setattr(homework_module, 'API_READ_TIMEOUT', 0.5)
+        started = time.monotonic()
+        deadline = Deadline(1)
+        response = homework_module.request_statuses(
+            {}, 0, stream=True,
+            timeout=homework_module.poll_timeout(deadline))
+        with pytest.raises(TimeoutError):
+            list(homework_module.stream_body(response, deadline))
+        assert time.monotonic() - started < 1.5
+
+    def test_stalled_server_times_out(self, monkeypatch, homework_module):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        host, port = listener.getsockname()
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', f'http://{host}:{port}/statuses/')
+        monkeypatch.setattr(homework_module, 'API_READ_TIMEOUT', 0.2)
+        started = time.monotonic()
+        with pytest.raises(ConnectionError):
+            homework_module.get_api_answer(0)
+        assert time.monotonic() - started < 2
+        listener.close()
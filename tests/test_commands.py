@@ -0,0 +1,124 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from assistant.commands import (FETCH_FAILED, NO_HOMEWORKS, UNKNOWN_CHAT,
+                                ChatCommands, ReplyCache)
+from assistant.engine import TenantState
+from assistant.schema import Homework
+from assistant.tenants import Tenant
+
+VERDICTS = {'approved': 'Принято.', 'reviewing': 'На ревью.'}
+HOMEWORKS = [
+    Homework('1', 'hw1', 'approved', '2026-01-01T00:00:00Z'),
+    Homework('2', 'hw2', 'reviewing', '2026-02-01T00:00:00Z'),
+]
+
+
+@pytest.fixture
+def fetches():
+    return []
+
+
+@pytest.fixture
+def commands(clock, fetches):
+    def fetch(tenant):
+        fetches.append(tenant.name)
+        return list(HOMEWORKS)
+
+    return ChatCommands(ReplyCache(60, clock=clock.time),
+                        [Tenant('ivan', 'token', 7)], fetch, VERDICTS)
+
+
+class TestChatCommands:
+
+    def test_status_and_history_share_one_fetch(self, commands, fetches):
+        assert commands.reply(7, 'status') == '"hw2": На ревью.'
+        assert commands.reply('7', 'history') == (
+            '"hw2": На ревью.\n"hw1": Принято.')
+        assert fetches == ['ivan']
+
+    def test_stale_entry_is_refetched(self, commands, clock, fetches):
+        commands.reply(7, 'status')
+        clock.sleep(61)
+        commands.reply(7, 'status')
+        assert fetches == ['ivan', 'ivan']
+
+    def test_polls_keep_entry_fresh(self, commands, clock, fetches):
+        commands.reply(7, 'status')
+        clock.sleep(50)
+        commands.cache.update('7', [
+            Homework('3', 'hw3', 'approved', '2026-03-01T00:00:00Z')])
+        clock.sleep(50)
+        assert commands.reply(7, 'status') == '"hw3": Принято.'
+        assert fetches == ['ivan']
+
+    def test_without_cache_every_command_fetches(self, commands, fetches):
+        commands.cache = None
+        assert commands.reply(7, 'status') == '"hw2": На ревью.'
+        assert commands.reply(7, 'history') == (
+            '"hw2": На ревью.\n"hw1": Принято.')
+        assert fetches == ['ivan', 'ivan']
+
+    def test_unknown_chat_and_empty_list(self, commands):
+        assert commands.reply(8, 'status') == UNKNOWN_CHAT
+        commands.fetch = lambda tenant: []
+        assert commands.reply(7, 'history') == NO_HOMEWORKS
+
+    def test_fetch_error_is_reported(self, commands, caplog):
+        def fail(tenant):
+            raise ConnectionError('нет связи')
+
+        commands.fetch = fail
+        with caplog.at_level(logging.ERROR):
+            assert commands.reply(7, 'status') == FETCH_FAILED
+        assert 'нет связи' in caplog.text
+
+    @pytest.mark.parametrize('edited', [False, True])
+    def test_answer_uses_effective_message(self, commands, edited):
+        replies = []
+        message = SimpleNamespace(text='/status@assistant_bot',
+                                  reply_text=replies.append)
+        update = SimpleNamespace(
+            message=None if edited else message, effective_message=message,
+            effective_chat=SimpleNamespace(id=7))
+        commands.answer(update)
+        assert replies == ['"hw2": На ревью.']
+
+    def test_command_case_is_ignored(self, commands):
+        replies = []
+        message = SimpleNamespace(text='/HISTORY', reply_text=replies.append)
+        commands.answer(SimpleNamespace(
+            message=message, effective_message=message,
+            effective_chat=SimpleNamespace(id=7)))
+        assert replies == ['"hw2": На ревью.\n"hw1": Принято.']
+
+
+class TestPipelineFeedsCache:
+
+    def test_process_response_updates_cache(self, homework_module):
+        cache = homework_module.CHAT_CACHE
+        cache.store('42', [])
+        state = TenantState(Tenant('maria', 'token', 42), 0)
+        homework_module.process_response(state, {
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'approved',
+                           'date_updated': '2026-01-01T00:00:00Z'}],
+            'current_date': 5})
+        assert cache.get('42').latest() == HOMEWORKS[:1]
+
+    def test_empty_stream_keeps_cache_fresh(self, homework_module, clock,
+                                            monkeypatch):
+        from assistant.stream import HomeworkStream
+
+        cache = ReplyCache(60, clock=clock.time)
+        monkeypatch.setattr(homework_module, 'CHAT_CACHE', cache)
+        cache.store('42', HOMEWORKS)
+        clock.sleep(50)
+        state = TenantState(Tenant('maria', 'token', 42), 0)
+        homework_module.process_stream(state, HomeworkStream(
+            [b'{"homeworks": [], "current_date": 5}']))
+        clock.sleep(50)
+        assert cache.get('42') is not None
+        assert state.timestamp == 5
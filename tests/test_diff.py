@@ -0,0 +1,103 @@
+from assistant.diff import StatusIndex
+from assistant.engine import TenantState
+from assistant.schema import Homework
+from assistant.tenants import Tenant
+
+
+def homework(id, status, date_updated=None, name='hw'):
+    return {'id': id, 'homework_name': f'{name}{id}', 'status': status,
+            'date_updated': date_updated}
+
+
+def record(id, status, date_updated=None, name='hw'):
+    return Homework(str(id), f'{name}{id}', status, date_updated)
+
+
+class TestStatusIndex:
+
+    def test_every_homework_in_response_is_diffed(self):
+        index = StatusIndex()
+        changes = index.diff([
+            record(1, 'reviewing'), record(2, 'approved'),
+        ])
+        assert [(change.key, change.previous) for change in changes] == [
+            ('1', None), ('2', None)]
+        index.commit(changes)
+        changes = index.diff([
+            record(1, 'reviewing'), record(2, 'approved'),
+            record(3, 'rejected'),
+        ])
+        assert [change.key for change in changes] == ['3']
+
+    def test_diff_does_not_change_index(self):
+        index = StatusIndex()
+        index.diff([record(1, 'approved')])
+        assert len(index) == 0
+        assert index.dirty == {}
+
+    def test_one_event_per_transition(self):
+        index = StatusIndex({'1': ('reviewing', '2022-01-01T00:00:00Z')})
+        assert index.reviewing == 1
+        changes = index.diff([
+            record(1, 'reviewing', '2022-01-01T00:00:00Z'),
+            record(1, 'rejected', '2022-01-02T00:00:00Z'),
+        ])
+        assert [(c.key, c.previous, c.homework.status)
+                for c in changes] == [('1', 'reviewing', 'rejected')]
+        index.commit(changes)
+        assert index.reviewing == 0
+        assert index.dirty == {'1': ('rejected', '2022-01-02T00:00:00Z')}
+
+    def test_stale_entry_is_ignored(self):
+        index = StatusIndex({'1': ('approved', '2022-01-05T00:00:00Z')})
+        assert index.diff([
+            record(1, 'reviewing', '2022-01-01T00:00:00Z')]) == []
+
+    def test_homework_without_id_uses_name(self, homework_module):
+        index = StatusIndex()
+        changes = index.diff([homework_module.homework_record(
+            {'homework_name': 'hw', 'status': 'approved'})])
+        assert changes[0].key == 'hw'
+
+
+class TestProcessResponse:
+
+    def test_all_changes_are_reported(self, homework_module):
+        state = TenantState(Tenant('a', 't', '1'), 0)
+        messages = homework_module.process_response(state, {
+            'homeworks': [homework(1, 'approved'), homework(2, 'rejected')],
+            'current_date': 10,
+        })
+        assert len(messages) == 2
+        assert messages[0].startswith(
+            'Изменился статус проверки работы "hw1"')
+        assert messages[1].startswith(
+            'Изменился статус проверки работы "hw2"')
+        assert state.timestamp == 10
+        assert homework_module.process_response(state, {
+            'homeworks': [homework(1, 'approved')], 'current_date': 20,
+        }) == []
+
+    def test_invalid_entry_does_not_stall_tenant(self, homework_module):
+        state = TenantState(Tenant('a', 't', '1'), 5)
+        response = {
+            'homeworks': [homework(1, 'approved'), homework(2, 'pending')],
+            'current_date': 10,
+        }
+        messages = homework_module.process_response(state, response)
+        assert len(messages) == 2
+        assert messages[0].startswith(
+            'Изменился статус проверки работы "hw1"')
+        assert messages[1] == (
+            'Сбой в работе программы: Неизвестный статус работы - pending')
+        assert state.timestamp == 10, (
+            'Некорректная работа не должна задерживать курсор.'
+        )
+        assert state.index.get('1')[0] == 'approved'
+        assert len(state.index) == 1
+        for current_date in (20, 30):
+            response['current_date'] = current_date
+            assert homework_module.process_response(state, response) == [], (
+                'О некорректной работе сообщается один раз.'
+            )
+            assert state.timestamp == current_date
@@ -0,0 +1,282 @@
+import pytest
+
+from assistant.engine import PollingEngine
+from assistant.scheduler import AdaptiveScheduler, Outcome
+from assistant.tenants import Tenant
+
+
+def make_tenants(count):
+    return [Tenant(f'student{i}', f'token{i}', str(i)) for i in range(count)]
+
+
+class TestPollingEngine:
+
+    def test_polls_are_spread_over_period(self, clock):
+        polled = []
+        engine = PollingEngine(
+            make_tenants(4),
+            lambda state: polled.append((clock.now, state.tenant.name)),
+            period=600, time_func=clock.time, sleep=clock.sleep,
+        )
+        for _ in range(8):
+            engine.run_once()
+        assert polled == [
+            (1000.0, 'student0'), (1150.0, 'student1'),
+            (1300.0, 'student2'), (1450.0, 'student3'),
+            (1600.0, 'student0'), (1750.0, 'student1'),
+            (1900.0, 'student2'), (2050.0, 'student3'),
+        ]
+
+    def test_state_is_kept_per_tenant(self, clock):
+        def poll(state):
+            state.timestamp += 1
+            state.last_message = state.tenant.name
+
+        engine = PollingEngine(make_tenants(2), poll, period=10,
+                               time_func=clock.time, sleep=clock.sleep)
+        for _ in range(6):
+            engine.run_once()
+        states = sorted(
+            (item[2] for item in engine._queue),
+            key=lambda state: state.tenant.name,
+        )
+        assert [state.timestamp for state in states] == [
+            int(1000.0) - 10 + 3, int(1000.0) - 10 + 3]
+        assert [state.last_message for state in states] == [
+            'student0', 'student1']
+
+    def test_failed_poll_is_rescheduled(self, clock):
+        def poll(state):
+            raise RuntimeError('boom')
+
+        engine = PollingEngine(make_tenants(1), poll, period=60,
+                               time_func=clock.time, sleep=clock.sleep)
+        with pytest.raises(RuntimeError):
+            engine.run_once()
+        assert len(engine) == 1
+        assert engine._queue[0][0] == 1060.0
+
+    def test_scheduler_sets_next_poll(self, clock):
+        scheduler = AdaptiveScheduler(600, reviewing=100)
+        polled = []
+
+        def poll(state):
+            polled.append(clock.now)
+            return Outcome.REVIEWING if len(polled) < 3 else Outcome.IDLE
+
+        engine = PollingEngine(make_tenants(1), poll, period=600,
+                               scheduler=scheduler,
+                               time_func=clock.time, sleep=clock.sleep)
+        for _ in range(4):
+            engine.run_once()
+        assert polled == [1000.0, 1100.0, 1200.0, 1800.0]
+
+    def test_outbox_is_pumped_between_polls(self, clock):
+        from assistant.outbox import Outbox
+        outbox = Outbox(chat_interval=100, clock=clock.time)
+        delivered = []
+
+        def poll(state):
+            outbox.put(state.tenant.chat_id, f'at {clock.now}')
+
+        engine = PollingEngine(
+            make_tenants(1), poll, period=600, outbox=outbox,
+            deliver=lambda chat_id, text: delivered.append((clock.now, text)),
+            time_func=clock.time, sleep=clock.sleep)
+        engine.run_once()
+        engine.run_once()
+        assert delivered == [(1000.0, 'at 1000.0')]
+
+    def test_resume_from_stored_cursor(self, clock):
+        polled = []
+        engine = PollingEngine(
+            make_tenants(2), lambda state: polled.append(clock.now),
+            period=600, resume=lambda state: 1010.0,
+            time_func=clock.time, sleep=clock.sleep)
+        engine.run_once()
+        engine.run_once()
+        assert polled == [1000.0, 1010.0]
+
+    def test_run_stops_and_drains(self, clock):
+        from assistant.outbox import Outbox
+        from assistant.shutdown import Shutdown
+        shutdown = Shutdown()
+        outbox = Outbox(global_rate=1, clock=clock.time)
+        delivered = []
+
+        def poll(state):
+            outbox.put('1', 'first')
+            outbox.put('2', 'second')
+            shutdown.request()
+
+        engine = PollingEngine(
+            make_tenants(1), poll, period=600, outbox=outbox,
+            deliver=lambda chat_id, text: delivered.append((clock.now, text)),
+            time_func=clock.time, sleep=clock.sleep)
+        engine.run(shutdown, drain_timeout=5)
+        assert delivered == [(1000.0, 'first'), (1001.0, 'second')]
+
+    def test_drain_gives_up_after_timeout(self, clock):
+        from assistant.outbox import Outbox
+        outbox = Outbox(global_rate=1, clock=clock.time)
+        outbox.put('1', 'first')
+        outbox.put('2', 'second')
+        engine = PollingEngine(
+            make_tenants(1), lambda state: None, period=600, outbox=outbox,
+            deliver=lambda chat_id, text: None,
+            time_func=clock.time, sleep=clock.sleep)
+        assert engine.drain(0.5) == 1
+
+    def test_health_measures_lag(self, clock):
+        from assistant.health import Health
+
+        def poll(state):
+            clock.now += 7
+
+        health = Health(tolerance=60, clock=clock.time)
+        engine = PollingEngine(
+            make_tenants(2), poll, period=10, health=health,
+            time_func=clock.time, sleep=clock.sleep)
+        engine.run_once()
+        engine.run_once()
+        assert health.lag == 2.0
+        engine.run_once()
+        assert health.lag == 4.0 and health.planned == 1015.0
+        clock.now = 1076.0
+        assert not health.live()
+
+    def test_run_without_tenants(self):
+        engine = PollingEngine([], lambda state: None, period=60)
+        with pytest.raises(ValueError):
+            engine.run()
+
+
+class TestPollTenant:
+
+    def test_sends_to_tenant_chat(self, monkeypatch, homework_module):
+        import requests
+        import utils
+        from assistant.engine import TenantState
+
+        def mock_get(*args, headers=None, **kwargs):
+            assert headers == {'Authorization': 'OAuth token7'}
+            response = utils.MockResponseGET(random_timestamp=1234)
+            response.headers = {}
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1234,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        state = TenantState(Tenant('student7', 'token7', '7'), 1000)
+        homework_module.poll_tenant(bot, state)
+        assert bot.chat_id == '7'
+        assert bot.text.endswith(homework_module.HOMEWORK_VERDICTS['approved'])
+        assert state.timestamp == 1234
+        assert state.last_message == bot.text
+
+    def test_streams_response(self, monkeypatch, fake_api, homework_module):
+        import utils
+        from assistant.engine import TenantState
+
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        fake_api.routes['/statuses/'] = (200, {
+            'homeworks': [{'id': 5, 'homework_name': 'hw',
+                           'status': 'rejected'}],
+            'current_date': 4321,
+        })
+        bot = utils.MockTelegramBot()
+        state = TenantState(Tenant('student7', 'token7', '7'), 1000)
+        homework_module.poll_tenant(bot, state, stream=True)
+        assert bot.text.endswith(homework_module.HOMEWORK_VERDICTS['rejected'])
+        assert state.timestamp == 4321
+        assert state.index.get('5')[0] == 'rejected'
+
+    @pytest.mark.parametrize('stream', [False, True])
+    def test_not_modified_skips_parsing(self, monkeypatch, fake_api,
+                                        homework_module, stream):
+        import utils
+        from assistant.engine import TenantState
+
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        fake_api.routes['/statuses/'] = (200, {
+            'homeworks': [{'id': 5, 'homework_name': 'hw',
+                           'status': 'approved'}],
+            'current_date': 4321,
+        })
+        fake_api.etags['/statuses/'] = '"v1"'
+        bot = utils.MockTelegramBot()
+        state = TenantState(Tenant('student7', 'token7', '7'), 1000)
+        homework_module.poll_tenant(bot, state, stream=stream)
+        assert state.validators == {'If-None-Match': '"v1"'}
+
+        def fail(*args):
+            raise AssertionError('Ответ 304 не должен разбираться.')
+
+        monkeypatch.setattr(homework_module, 'check_response', fail)
+        monkeypatch.setattr(homework_module, 'parse_status', fail)
+        bot.text = None
+        outcome = homework_module.poll_tenant(bot, state, stream=stream)
+        assert outcome == Outcome.IDLE
+        assert bot.text is None
+        assert state.timestamp == 4321
+        assert fake_api.requests[-1][2]['If-None-Match'] == '"v1"'
+
+
+class TestFence:
+
+    @pytest.fixture
+    def fence(self, monkeypatch, homework_module):
+        from assistant.shutdown import Fence
+        fence = Fence()
+        fence.close()
+        monkeypatch.setattr(homework_module, 'FENCE', fence)
+        return fence
+
+    def test_fenced_process_does_not_poll(self, fence, monkeypatch,
+                                          homework_module):
+        import requests
+        from assistant.engine import TenantState
+        from assistant.shutdown import Fenced
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Отстранённый процесс не опрашивает API.')
+
+        monkeypatch.setattr(requests, 'get', fail)
+        state = TenantState(Tenant('a', 't', '1'), 0)
+        with pytest.raises(Fenced):
+            homework_module.poll_tenant(None, state)
+
+    def test_fenced_process_does_not_save(self, fence, homework_module):
+        from assistant.engine import TenantState
+
+        class Store:
+            def save(self, *args):
+                raise AssertionError('Состояние пишет новый ведущий.')
+
+        state = TenantState(Tenant('a', 't', '1'), 0)
+        homework_module.save_state(Store(), state)
+
+    def test_stop_does_not_drain(self, fence, homework_module):
+        import utils
+        from assistant.outbox import Outbox
+        from assistant.shutdown import Fenced, Shutdown
+
+        bot = utils.MockTelegramBot()
+        bot.text = None
+        outbox = Outbox()
+        outbox.put('1', 'hello')
+        engine = PollingEngine(
+            [Tenant('a', 't', '1')], lambda state: Outcome.IDLE, 600,
+            outbox=outbox,
+            deliver=lambda chat_id, text: homework_module.deliver_to_chat(
+                bot, chat_id, text))
+        shutdown = Shutdown()
+        shutdown.request()
+        with pytest.raises(Fenced):
+            engine.run(shutdown, drain_timeout=5)
+        assert bot.text is None
@@ -0,0 +1,79 @@
+import json
+import urllib.error
+import urllib.request
+
+from assistant.breaker import CircuitBreaker
+from assistant.health import Health
+from assistant.httpd import start_http_server
+
+
+def get(server, path):
+    url = f'http://127.0.0.1:{server.server_port}{path}'
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class TestHealth:
+
+    def test_live_until_cycle_is_late(self, clock):
+        health = Health(tolerance=60, clock=clock.time)
+        assert health.live() and not health.ready()
+        health.plan(1600.0)
+        clock.now = 1660.0
+        assert health.live() and health.ready()
+        clock.now = 1661.0
+        assert not health.live() and not health.ready()
+
+    def test_cycle_measures_lag(self, clock):
+        health = Health(clock=clock.time)
+        health.plan(1010.0)
+        clock.now = 1012.5
+        health.cycle()
+        health.plan(1020.0)
+        clock.now = 1020.5
+        health.cycle()
+        snapshot = health.snapshot()
+        assert snapshot['scheduler_lag_s'] == 0.5
+        assert snapshot['scheduler_max_lag_s'] == 2.5
+        assert health.snapshot()['scheduler_max_lag_s'] == 0.5
+
+    def test_open_breaker_is_not_ready(self, clock):
+        health = Health(clock=clock.time)
+        breaker = CircuitBreaker('practicum', failure_threshold=1)
+        health.breaker(breaker)
+        health.plan(1000.0)
+        assert health.ready()
+        breaker.record_failure()
+        assert health.live() and not health.ready()
+        assert health.snapshot()['breakers'] == {'practicum': 'open'}
+
+    def test_snapshot_reports_beats_and_queues(self, clock):
+        health = Health(clock=clock.time)
+        health.queue('outbox', lambda: 3)
+        health.beat('poll')
+        clock.now = 1030.0
+        snapshot = health.snapshot()
+        assert snapshot['uptime_s'] == 30.0
+        assert snapshot['last_poll_age_s'] == 30.0
+        assert snapshot['last_send_age_s'] is None
+        assert snapshot['queues'] == {'outbox': 3}
+
+    def test_routes(self, clock):
+        health = Health(tolerance=5, clock=clock.time)
+        server = start_http_server(0, health.routes())
+        try:
+            assert get(server, '/healthz')[0] == 200
+            assert get(server, '/readyz')[0] == 503
+            health.plan(1000.0)
+            assert get(server, '/readyz')[0] == 200
+            clock.now = 1010.0
+            status, body = get(server, '/healthz')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert status == 503
+        assert body['live'] is False
+        assert body['overdue_s'] == 10.0
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from assistant.hedge import Hedger, LatencyWindow
+
+
+def warm(hedger, seconds=0.01, count=20):
+    for _ in range(count):
+        hedger.window.add(seconds)
+
+
+class TestLatencyWindow:
+
+    def test_quantile(self):
+        window = LatencyWindow(size=100)
+        for value in range(200):
+            window.add(value)
+        assert len(window) == 100
+        assert window.quantile(0.95) == 195
+
+
+class TestHedger:
+
+    def test_no_hedge_without_samples(self):
+        hedger = Hedger()
+        calls = []
+        assert hedger.call(lambda: calls.append(1) or 'ok') == 'ok'
+        assert calls == [1]
+        assert len(hedger.window) == 1
+        hedger.close()
+
+    def test_slow_request_is_hedged(self):
+        hedger = Hedger(min_samples=20)
+        warm(hedger)
+        release = threading.Event()
+        calls = []
+        discarded = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return 'slow'
+            return 'fast'
+
+        started = time.monotonic()
+        assert hedger.call(request, discard=discarded.append) == 'fast'
+        assert time.monotonic() - started < 1
+        release.set()
+        for _ in range(100):
+            if discarded:
+                break
+            time.sleep(0.01)
+        assert discarded == ['slow']
+        hedger.close()
+
+    def test_failed_first_request_uses_hedge(self):
+        hedger = Hedger()
+        warm(hedger)
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                raise ConnectionError('сбой')
+            time.sleep(0.1)
+            return 'ok'
+
+        assert hedger.call(request) == 'ok'
+        hedger.close()
+
+    def test_both_failed(self):
+        hedger = Hedger()
+        warm(hedger)
+
+        def request():
+            time.sleep(0.05)
+            raise ConnectionError('сбой')
+
+        with pytest.raises(ConnectionError):
+            hedger.call(request)
+        hedger.close()
+
+    def test_async_slow_request_is_hedged(self):
+        hedger = Hedger()
+        warm(hedger)
+        calls = []
+
+        async def request():
+            calls.append(1)
+            await asyncio.sleep(2 if len(calls) == 1 else 0)
+            return len(calls)
+
+        async def scenario():
+            return await asyncio.wait_for(hedger.async_call(request), 1)
+
+        assert asyncio.run(scenario()) == 2
+        hedger.close()
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from assistant.leader import (FileLease, LeaderElector, SQLiteLease,
+                              make_lease)
+
+
+class TestSQLiteLease:
+
+    def test_only_one_holder(self, tmp_path, clock):
+        path = str(tmp_path / 'lease.sqlite3')
+        first = SQLiteLease(path, clock=clock.time)
+        second = SQLiteLease(path, clock=clock.time)
+        assert first.acquire('a', 15)
+        assert not second.acquire('b', 15)
+        clock.now += 10
+        assert first.acquire('a', 15), 'Владелец продлевает аренду.'
+        clock.now += 10
+        assert not second.acquire('b', 15)
+        first.close()
+        second.close()
+
+    def test_expired_lease_is_taken_over(self, tmp_path, clock):
+        path = str(tmp_path / 'lease.sqlite3')
+        first = SQLiteLease(path, clock=clock.time)
+        second = SQLiteLease(path, clock=clock.time)
+        assert first.acquire('a', 15)
+        clock.now += 16
+        assert second.acquire('b', 15)
+        assert not first.acquire('a', 15)
+        second.release('b')
+        assert first.acquire('a', 15)
+
+
+class TestFileLease:
+
+    def test_lock_is_exclusive(self, tmp_path):
+        path = str(tmp_path / 'leader.lock')
+        first, second = FileLease(path), FileLease(path)
+        assert first.acquire('a', 15)
+        assert not second.acquire('b', 15)
+        first.release('a')
+        assert second.acquire('b', 15)
+        second.close()
+
+
+def test_unknown_lease():
+    with pytest.raises(ValueError):
+        make_lease('redis', 'path')
+
+
+class FakeLease:
+    def __init__(self, free_after=0):
+        self.attempts = 0
+        self.free_after = free_after
+        self.lost = False
+        self.released = []
+
+    def acquire(self, holder, ttl):
+        self.attempts += 1
+        return self.attempts > self.free_after and not self.lost
+
+    def release(self, holder):
+        self.released.append(holder)
+
+    def close(self):
+        pass
+
+
+class TestLeaderElector:
+
+    def test_standby_waits_for_lease(self):
+        lease = FakeLease(free_after=2)
+        waits = []
+        with LeaderElector(lease, ttl=30, holder='me') as elector:
+            assert elector.wait_for_leadership(
+                lambda timeout: waits.append(timeout))
+            assert elector.is_leader
+        assert waits == [10, 10]
+        assert lease.released == ['me']
+
+    def test_wait_can_be_interrupted(self):
+        lease = FakeLease(free_after=100)
+        elector = LeaderElector(lease, ttl=30)
+        assert not elector.wait_for_leadership(lambda timeout: True)
+        elector.release()
+        assert lease.released == []
+
+    def test_lost_lease_calls_back(self):
+        lease = FakeLease()
+        lost = threading.Event()
+        elector = LeaderElector(lease, ttl=0.03, on_lost=lost.set)
+        assert elector.wait_for_leadership(lambda timeout: False)
+        lease.lost = True
+        assert lost.wait(2)
+        assert not elector.is_leader
+        elector.release()
@@ -0,0 +1,83 @@
+import json
+import logging
+import threading
+import time
+
+from assistant.logs import (LOG_DROPPED, DroppingQueueHandler, JSONFormatter,
+                            SamplingFilter, start_queue_logging)
+
+
+def make_record(msg='Опрос %s', args=('ivan',), level=logging.DEBUG,
+                **extra):
+    record = logging.LogRecord(
+        'homework', level, __file__, 10, msg, args, None, 'poll')
+    record.__dict__.update(extra)
+    return record
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.messages.append(record.getMessage())
+
+
+class TestJSONFormatter:
+
+    def test_fields_and_extra(self):
+        entry = json.loads(JSONFormatter().format(
+            make_record(tenant='ivan')))
+        assert entry['message'] == 'Опрос ivan'
+        assert entry['level'] == 'DEBUG'
+        assert entry['func'] == 'poll'
+        assert entry['tenant'] == 'ivan'
+        assert 'args' not in entry
+
+
+class TestSamplingFilter:
+
+    def test_every_nth_record_of_each_type(self):
+        sampling = SamplingFilter(every=3)
+        passed = [sampling.filter(make_record()) for _ in range(6)]
+        assert passed == [True, False, False, True, False, False]
+        assert sampling.filter(make_record(msg='Другое сообщение'))
+
+    def test_warnings_and_overrides(self):
+        sampling = SamplingFilter(every=100, overrides={'Опрос %s': 1})
+        assert all(sampling.filter(make_record()) for _ in range(3))
+        error = make_record(msg='Сбой', level=logging.ERROR)
+        assert all(sampling.filter(error) for _ in range(3))
+
+
+class TestQueueLogging:
+
+    def test_slow_output_does_not_block_caller(self):
+        logger = logging.getLogger('tests.queue_logging')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handler = SlowHandler(0.01)
+        listener = start_queue_logging([logger], handler)
+        try:
+            started = time.perf_counter()
+            for index in range(50):
+                logger.debug('Запись %s', index)
+            assert time.perf_counter() - started < 0.25
+        finally:
+            listener.stop()
+            logger.handlers.clear()
+        assert handler.messages == [f'Запись {index}' for index in range(50)]
+        assert threading.current_thread().name not in handler.threads
+
+    def test_full_queue_drops_records(self):
+        import queue
+        handler = DroppingQueueHandler(queue.Queue(1))
+        dropped = LOG_DROPPED.value()
+        handler.handle(make_record())
+        handler.handle(make_record())
+        assert LOG_DROPPED.value() == dropped + 1
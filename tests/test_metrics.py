@@ -0,0 +1,89 @@
+import urllib.request
+
+import pytest
+
+from assistant import metrics
+from assistant.breaker import CircuitBreaker
+from assistant.httpd import start_http_server
+
+
+class TestRegistry:
+
+    def test_render_prometheus_text(self):
+        registry = metrics.Registry()
+        counter = registry.counter('polls_total', 'Polls.', ('code',))
+        histogram = registry.histogram(
+            'latency_seconds', 'Latency.', buckets=(0.1, 1))
+        counter.inc(code=200)
+        counter.inc(2, code=200)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        assert registry.render().splitlines() == [
+            '# HELP polls_total Polls.',
+            '# TYPE polls_total counter',
+            'polls_total{code="200"} 3',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3',
+            'latency_seconds_sum 5.55',
+            'latency_seconds_count 3',
+        ]
+
+    def test_labels_are_checked(self):
+        counter = metrics.Counter('x', 'X.', ('code',))
+        with pytest.raises(ValueError):
+            counter.inc(type='a')
+
+    def test_breaker_state_gauge(self):
+        breaker = metrics.track_breaker(
+            CircuitBreaker('test', failure_threshold=1))
+        assert metrics.BREAKER_STATE.value(name='test') == 0
+        breaker.record_failure()
+        assert metrics.BREAKER_STATE.value(name='test') == 2
+
+
+class TestInstrumentation:
+
+    def test_pipeline_is_measured(self, monkeypatch, homework_module):
+        import requests
+        import utils
+        from assistant.engine import TenantState
+        from assistant.tenants import Tenant
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(random_timestamp=1)
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        polls = metrics.POLLS.value()
+        responses = metrics.API_RESPONSES.value(code=200)
+        parses = metrics.STAGE_LATENCY.count(stage='parse_status')
+        sends = metrics.SENDS.value(result='ok')
+        homework_module.poll_tenant(
+            utils.MockTelegramBot(), TenantState(Tenant('a', 't', '1'), 0))
+        assert metrics.POLLS.value() == polls + 1
+        assert metrics.API_RESPONSES.value(code=200) == responses + 1
+        assert metrics.STAGE_LATENCY.count(stage='parse_status') == parses + 1
+        assert metrics.SENDS.value(result='ok') == sends + 1
+
+    def test_metrics_endpoint(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'METRICS_PORT', '0')
+        server = homework_module.start_service_server()
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+                assert response.headers['Content-Type'].startswith(
+                    'text/plain; version=0.0.4')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE bot_api_request_seconds histogram' in body
+        assert 'bot_polls_total' in body
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+import telegram
+
+from assistant.outbox import Outbox, TokenBucket
+from assistant.shutdown import Fenced
+
+
+class TestTokenBucket:
+
+    def test_rate_and_burst(self, clock):
+        bucket = TokenBucket(2, burst=2, clock=clock.time)
+        assert bucket.take() and bucket.take()
+        assert not bucket.take()
+        assert bucket.delay() == 0.5
+        clock.sleep(0.5)
+        assert bucket.take()
+
+    def test_drain_until(self, clock):
+        bucket = TokenBucket(10, clock=clock.time)
+        bucket.drain_until(clock.time() + 5)
+        assert bucket.delay() > 5
+        clock.sleep(5.2)
+        assert bucket.take()
+
+
+class TestOutbox:
+
+    def test_messages_for_one_chat_are_coalesced(self, clock):
+        outbox = Outbox(clock=clock.time)
+        for text in ('first', 'second', 'third'):
+            outbox.put('1', text)
+        assert outbox.take() == ('1', 'first\n\nsecond\n\nthird')
+        assert outbox.take() is None
+
+    def test_coalescing_respects_length_limit(self, clock):
+        outbox = Outbox(max_length=12, clock=clock.time)
+        for text in ('aaaaa', 'bbbbb', 'ccccc'):
+            outbox.put('1', text)
+        assert outbox.take() == ('1', 'aaaaa\n\nbbbbb')
+        assert outbox.take() == 1.0, 'Следующее сообщение в чат через 1 с.'
+
+    def test_global_and_chat_limits(self, clock):
+        outbox = Outbox(global_rate=2, chat_interval=1.0, clock=clock.time)
+        for chat_id in ('1', '2', '3'):
+            outbox.put(chat_id, 'hi')
+        sent = []
+        wait = outbox.pump(lambda chat_id, text: sent.append(chat_id))
+        assert sent == ['1', '2']
+        assert wait == 0.5
+        clock.sleep(0.5)
+        outbox.pump(lambda chat_id, text: sent.append(chat_id))
+        assert sent == ['1', '2', '3']
+        outbox.put('1', 'again')
+        assert outbox.take() == 0.5, 'Лимит на чат - раз в секунду.'
+
+    def test_retry_after_requeues_message(self, clock):
+        outbox = Outbox(clock=clock.time)
+        outbox.put('1', 'hello')
+        calls = []
+
+        def deliver(chat_id, text):
+            calls.append(text)
+            if len(calls) == 1:
+                raise telegram.error.RetryAfter(10)
+
+        wait = outbox.pump(deliver)
+        assert len(outbox) == 1
+        assert wait >= 10
+        clock.sleep(10.5)
+        assert outbox.pump(deliver) is None
+        assert calls == ['hello', 'hello']
+
+    def test_other_errors_are_dropped(self, caplog, clock):
+        outbox = Outbox(clock=clock.time)
+        outbox.put('1', 'hello')
+
+        def deliver(chat_id, text):
+            raise telegram.error.TelegramError('Forbidden')
+
+        assert outbox.pump(deliver) is None
+        assert len(outbox) == 0
+        assert 'Forbidden' in caplog.text
+
+    def test_error_text_is_redacted(self, caplog, clock):
+        outbox = Outbox(clock=clock.time,
+                        redact=lambda error: str(error).replace('abc', '***'))
+        outbox.put('1', 'hello')
+
+        def deliver(chat_id, text):
+            raise telegram.error.NetworkError('/botabc/sendMessage')
+
+        outbox.pump(deliver)
+        assert '/bot***/sendMessage' in caplog.text
+        assert 'abc' not in caplog.text
+
+    def test_fenced_delivery_stops_pump(self, clock):
+        outbox = Outbox(clock=clock.time)
+        outbox.put('1', 'hello')
+        outbox.put('2', 'hello')
+        calls = []
+
+        def deliver(chat_id, text):
+            calls.append(chat_id)
+            raise Fenced()
+
+        with pytest.raises(Fenced):
+            outbox.pump(deliver)
+        assert calls == ['1']
+
+
+class TestAsyncOutbox:
+
+    def test_flood_control_is_retried(self, monkeypatch, fake_api,
+                                      homework_module):
+        from assistant import aio
+        monkeypatch.setattr(homework_module, 'TELEGRAM_API', fake_api.url)
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1:a')
+        route = '/bot1:a/sendMessage'
+        fake_api.routes[route] = (429, {
+            'ok': False, 'error_code': 429,
+            'parameters': {'retry_after': 1}})
+
+        async def scenario():
+            async with aio.make_transport() as transport:
+                try:
+                    await homework_module.async_deliver(transport, '1', 'x')
+                except telegram.error.RetryAfter as error:
+                    return error.retry_after
+
+        assert asyncio.run(scenario()) == 1
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from assistant.probe import InvalidCredentials, probe_tenants
+from assistant.tenants import Tenant
+
+
+def make_tenants(count):
+    return [Tenant(f'student{i}', f'token{i}', str(i)) for i in range(count)]
+
+
+class TestProbeTenants:
+
+    def test_rejected_tenant_is_quarantined(self):
+        def check(tenant):
+            if tenant.name == 'student1':
+                raise InvalidCredentials('токен отклонён')
+
+        valid, quarantined = probe_tenants(make_tenants(3), [check])
+        assert [tenant.name for tenant in valid] == ['student0', 'student2']
+        assert quarantined == {'student1': ['токен отклонён']}
+
+    def test_network_error_keeps_tenant(self):
+        def check(tenant):
+            raise ConnectionError('нет сети')
+
+        valid, quarantined = probe_tenants(make_tenants(2), [check])
+        assert len(valid) == 2
+        assert quarantined == {}
+
+    def test_checks_run_concurrently(self):
+        barrier = threading.Barrier(4, timeout=2)
+
+        def check(tenant):
+            barrier.wait()
+
+        valid, quarantined = probe_tenants(
+            make_tenants(2), [check, check], workers=4)
+        assert len(valid) == 2
+        assert not barrier.broken
+
+    def test_slow_check_does_not_block_startup(self):
+        release = threading.Event()
+
+        def check(tenant):
+            release.wait(5)
+
+        valid, quarantined = probe_tenants(
+            make_tenants(1), [check], timeout=0.05)
+        release.set()
+        assert len(valid) == 1
+
+
+class TestCheckCredentials:
+
+    @pytest.fixture
+    def probe_env(self, monkeypatch, fake_api, homework_module):
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_API', fake_api.url)
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        fake_api.routes['/statuses/'] = (
+            200, {'homeworks': [], 'current_date': 1})
+        fake_api.routes['/bot1234:abcdefg/getMe'] = (200, {'ok': True})
+        fake_api.routes['/bot1234:abcdefg/getChat'] = (200, {'ok': True})
+        return fake_api
+
+    def test_valid_tenants_pass(self, probe_env, homework_module):
+        tenants = make_tenants(3)
+        assert homework_module.check_credentials(tenants) == tenants
+        paths = {item[1].split('?')[0] for item in probe_env.requests}
+        assert paths == {'/statuses/', '/bot1234:abcdefg/getMe',
+                         '/bot1234:abcdefg/getChat'}
+
+    def test_rejected_token_exits(self, probe_env, homework_module):
+        probe_env.routes['/statuses/'] = (401, {'code': 'not_authenticated'})
+        with pytest.raises(SystemExit):
+            homework_module.check_credentials(make_tenants(2))
+
+    def test_unknown_chat_is_rejected(self, probe_env, homework_module):
+        probe_env.routes['/bot1234:abcdefg/getChat'] = (
+            400, {'ok': False, 'description': 'Bad Request: chat not found'})
+        with pytest.raises(homework_module.InvalidCredentials,
+                           match='chat not found'):
+            homework_module.check_telegram_chat(make_tenants(1)[0])
+
+    def test_rejected_bot_token_exits(self, probe_env, homework_module):
+        probe_env.routes['/bot1234:abcdefg/getMe'] = (
+            401, {'ok': False, 'description': 'Unauthorized'})
+        with pytest.raises(SystemExit):
+            homework_module.check_credentials(make_tenants(1))
+
+    def test_token_is_not_logged(self, probe_env, caplog, homework_module,
+                                 monkeypatch):
+        # Порт 1 закрыт: ошибка соединения содержит URL с токеном.
+        monkeypatch.setattr(
+            homework_module, 'TELEGRAM_API', 'http://127.0.0.1:1')
+        tenants = make_tenants(1)
+        assert homework_module.check_credentials(tenants) == tenants
+        assert 'getMe' in caplog.text and 'getChat' in caplog.text
+        assert '1234:abcdefg' not in caplog.text
+        assert '/bot***/' in caplog.text
@@ -0,0 +1,74 @@
+import pytest
+
+from assistant.engine import TenantState
+from assistant.scheduler import (AdaptiveScheduler, FixedScheduler, Outcome,
+                                 make_scheduler)
+from assistant.tenants import Tenant
+
+
+class TestAdaptiveScheduler:
+
+    def test_idle_starts_at_period_and_relaxes(self):
+        scheduler = AdaptiveScheduler(600, max_idle=1200, idle_growth=1.5)
+        delays = [scheduler.next_delay('a', Outcome.IDLE) for _ in range(4)]
+        assert delays == [600, 900, 1200, 1200]
+
+    def test_idle_never_slower_than_period_by_default(self):
+        scheduler = AdaptiveScheduler(600)
+        delays = [scheduler.next_delay('a', Outcome.IDLE) for _ in range(5)]
+        assert delays == [600] * 5
+
+    def test_reviewing_polls_more_often(self):
+        scheduler = AdaptiveScheduler(600, reviewing=120)
+        scheduler.next_delay('a', Outcome.IDLE)
+        assert scheduler.next_delay('a', Outcome.REVIEWING) == 120
+        assert scheduler.next_delay('a', Outcome.IDLE) == 600, (
+            'После ревью интервал должен вернуться к базовому.'
+        )
+
+    def test_errors_back_off_with_jitter(self):
+        scheduler = AdaptiveScheduler(
+            600, error_base=30, max_backoff=200, rng=lambda: 1.0)
+        delays = [scheduler.next_delay('a', Outcome.ERROR) for _ in range(5)]
+        assert delays == [60, 120, 200, 200, 200]
+        low = AdaptiveScheduler(600, error_base=30, rng=lambda: 0.0)
+        assert low.next_delay('a', Outcome.ERROR) == 30
+        assert scheduler.next_delay('b', Outcome.ERROR) == 60, (
+            'Счётчик ошибок ведётся отдельно для каждого студента.'
+        )
+        assert scheduler.next_delay('a', Outcome.IDLE) == 600
+        assert scheduler.next_delay('a', Outcome.ERROR) == 60
+
+    def test_errors_never_poll_faster_than_period(self):
+        scheduler = AdaptiveScheduler(600, rng=lambda: 0.0)
+        delays = [scheduler.next_delay('a', Outcome.ERROR) for _ in range(4)]
+        assert delays == [600, 1200, 1800, 1800]
+        assert all(delay >= 600 for delay in delays), (
+            'После ошибки API не должен опрашиваться чаще обычного.'
+        )
+
+    def test_make_scheduler(self):
+        assert isinstance(make_scheduler('fixed', 600, reviewing=1),
+                          FixedScheduler)
+        scheduler = make_scheduler('adaptive', 600, reviewing=60)
+        assert scheduler.reviewing == 60
+        with pytest.raises(ValueError):
+            make_scheduler('unknown', 600)
+
+
+class TestPendingOutcome:
+
+    def test_reviewing_homework_is_pending(self, homework_module):
+        state = TenantState(Tenant('a', 't', '1'), 0)
+        homework = {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}
+        response = {'homeworks': [homework], 'current_date': 10}
+        homework_module.process_response(state, response)
+        assert state.outcome() == Outcome.REVIEWING
+        homework_module.process_response(state, {
+            'homeworks': [], 'current_date': 20})
+        assert state.outcome() == Outcome.REVIEWING, (
+            'Работа остаётся на ревью, пока не придёт новый статус.'
+        )
+        homework['status'] = 'approved'
+        homework_module.process_response(state, response)
+        assert state.outcome() == Outcome.IDLE
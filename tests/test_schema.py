@@ -0,0 +1,75 @@
+import pytest
+
+from assistant.schema import Homework, compile_homework
+
+VERDICTS = {'approved': 'Принято.', 'reviewing': 'На ревью.'}
+
+
+@pytest.fixture
+def record():
+    return compile_homework(VERDICTS)
+
+
+class TestCompileHomework:
+
+    def test_entry_becomes_record(self, record):
+        homework = record({
+            'id': 7, 'homework_name': 'hw7', 'status': 'reviewing',
+            'date_updated': '2026-01-01T00:00:00Z', 'reviewer_comment': ''})
+        assert homework == Homework(
+            '7', 'hw7', 'reviewing', '2026-01-01T00:00:00Z')
+        assert not hasattr(homework, '__dict__')
+
+    def test_status_is_interned(self, record):
+        status = ''.join(['appr', 'oved'])
+        homework = record({'homework_name': 'hw', 'status': status})
+        assert homework.status is next(iter(VERDICTS))
+
+    def test_key_falls_back_to_name(self, record):
+        assert record({'homework_name': 'hw', 'status': 'approved'}).key == 'hw'
+        assert record({'id': 'a1', 'homework_name': 'hw',
+                       'status': 'approved'}).key == 'a1'
+
+    @pytest.mark.parametrize('entry, error', [
+        ([], TypeError),
+        ({'status': 'approved'}, KeyError),
+        ({'homework_name': 1, 'status': 'approved'}, TypeError),
+        ({'homework_name': 'hw'}, ValueError),
+        ({'homework_name': 'hw', 'status': 'unknown'}, ValueError),
+        ({'homework_name': 'hw', 'status': ['approved']}, ValueError),
+        ({'homework_name': 'hw', 'status': 'approved', 'date_updated': 1},
+         TypeError),
+        ({'id': 1.5, 'homework_name': 'hw', 'status': 'approved'},
+         TypeError),
+    ])
+    def test_invalid_entries(self, record, entry, error):
+        with pytest.raises(error):
+            record(entry)
+
+
+class TestCheckResponse:
+
+    def test_returns_records(self, homework_module):
+        homeworks = homework_module.check_response({
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'approved'}],
+            'current_date': 1})
+        assert homeworks == [Homework('1', 'hw1', 'approved')]
+
+    def test_invalid_entry_is_rejected(self, homework_module):
+        homeworks = homework_module.check_response({
+            'homeworks': [{'homework_name': 'hw1', 'status': 'lost'},
+                          {'id': 2, 'homework_name': 'hw2',
+                           'status': 'approved'},
+                          'hw3'],
+            'current_date': 1})
+        assert homeworks == [Homework('2', 'hw2', 'approved')]
+        assert [type(error) for error in homeworks.rejected] == [
+            ValueError, TypeError]
+
+    def test_parse_status_accepts_records(self, homework_module):
+        message = homework_module.parse_status(
+            Homework('1', 'hw1', 'rejected'))
+        assert message == (
+            'Изменился статус проверки работы "hw1". '
+            + homework_module.HOMEWORK_VERDICTS['rejected'])
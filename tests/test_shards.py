@@ -0,0 +1,117 @@
+from assistant.clock import VirtualClock
+from assistant.shards import HashRing, Supervisor, assign
+from assistant.shutdown import Shutdown
+from assistant.tenants import Tenant
+
+
+def make_tenants(count):
+    return [Tenant(f'student{i}', f'token{i}', str(i)) for i in range(count)]
+
+
+class FakeProcess:
+    started = []
+
+    def __init__(self, target, args, name, daemon):
+        self.args = args
+        self.name = name
+        self.pid = len(self.started)
+        self.exitcode = None
+        self.terminated = False
+
+    def start(self):
+        self.started.append(self)
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def terminate(self):
+        self.terminated = True
+        self.exitcode = -15
+
+    def join(self, timeout=None):
+        pass
+
+    def kill(self):
+        self.exitcode = -9
+
+
+def make_supervisor(tenants, count, clock=None):
+    clock = clock or VirtualClock()
+    FakeProcess.started = []
+    return Supervisor(lambda shard, tenants: None, tenants, count,
+                      process_factory=FakeProcess, clock=clock.time)
+
+
+class TestHashRing:
+
+    def test_tenants_are_spread(self):
+        shards = assign(make_tenants(1000), 4)
+        assert sum(len(shard) for shard in shards) == 1000
+        assert all(150 < len(shard) < 350 for shard in shards)
+
+    def test_new_node_moves_few_keys(self):
+        keys = [f'student{i}' for i in range(1000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = [key for key in keys
+                 if before.node_for(key) != after.node_for(key)]
+        assert len(moved) < 350
+        assert all(after.node_for(key) == 4 for key in moved)
+
+
+class TestSupervisor:
+
+    def test_starts_worker_per_shard(self):
+        supervisor = make_supervisor(make_tenants(100), 3)
+        supervisor.start()
+        assert [process.name for process in FakeProcess.started] == [
+            'shard-0', 'shard-1', 'shard-2']
+        assert sorted(
+            tenant.name for process in FakeProcess.started
+            for tenant in process.args[1]
+        ) == sorted(tenant.name for tenant in make_tenants(100))
+
+    def test_empty_shard_is_not_started(self):
+        supervisor = make_supervisor(make_tenants(1), 3)
+        supervisor.start()
+        assert len(FakeProcess.started) == 1
+
+    def test_crashed_worker_is_restarted(self, clock):
+        supervisor = make_supervisor(make_tenants(10), 2, clock)
+        supervisor.start()
+        FakeProcess.started[0].exitcode = 1
+        assert supervisor.check() == [], 'Перезапуск не чаще restart_delay.'
+        clock.now += 5
+        assert supervisor.check() == [0]
+        assert FakeProcess.started[2].name == 'shard-0'
+
+    def test_resize_restarts_only_changed_shards(self):
+        supervisor = make_supervisor(make_tenants(100), 4)
+        supervisor.start()
+        before = {process.args[0]: process for process in FakeProcess.started}
+        supervisor.resize(5)
+        supervisor.apply_resize()
+        after = supervisor.shards
+        for index, process in before.items():
+            assert process.terminated == (
+                [t.name for t in process.args[1]]
+                != [t.name for t in after[index]])
+        assert FakeProcess.started[-1].name == 'shard-4'
+        assert supervisor.count == 5
+
+    def test_run_stops_workers(self):
+        supervisor = make_supervisor(make_tenants(10), 2)
+        shutdown = Shutdown()
+        shutdown.request()
+        supervisor.run(shutdown, interval=0)
+        assert all(process.terminated for process in FakeProcess.started)
+
+    def test_fence_kills_workers_without_restart(self, clock):
+        supervisor = make_supervisor(make_tenants(10), 2, clock)
+        supervisor.start()
+        supervisor.fence()
+        assert all(process.exitcode == -9 and not process.terminated
+                   for process in FakeProcess.started)
+        clock.now += 60
+        assert supervisor.check() == []
+        assert len(FakeProcess.started) == 2
@@ -0,0 +1,64 @@
+import os
+import signal
+
+import pytest
+
+from assistant.shutdown import Fence, Fenced, Shutdown, ShutdownRequested
+
+
+class TestShutdown:
+
+    def test_request_runs_callbacks_once(self):
+        shutdown = Shutdown()
+        called = []
+        shutdown.add_callback(lambda: called.append(True))
+        shutdown.request()
+        shutdown.request()
+        assert shutdown.requested
+        assert called == [True]
+        assert shutdown.wait(0)
+
+    def test_signal_only_sets_flag(self):
+        shutdown = Shutdown()
+        shutdown.handle(signal.SIGTERM, None)
+        assert shutdown.requested
+
+    def test_signal_interrupts_sleep(self):
+        shutdown = Shutdown()
+        with pytest.raises(ShutdownRequested):
+            with shutdown.interruptible():
+                shutdown.handle(signal.SIGTERM, None)
+        with pytest.raises(ShutdownRequested):
+            with shutdown.interruptible():
+                pass
+
+    def test_second_signal_exits(self):
+        shutdown = Shutdown()
+        shutdown.handle(signal.SIGINT, None)
+        with pytest.raises(SystemExit) as error:
+            shutdown.handle(signal.SIGINT, None)
+        assert error.value.code == 128 + signal.SIGINT
+
+    def test_handlers_are_restored(self):
+        shutdown = Shutdown()
+        previous = signal.getsignal(signal.SIGTERM)
+        with shutdown.installed():
+            assert signal.getsignal(signal.SIGTERM) == shutdown.handle
+            os.kill(os.getpid(), signal.SIGTERM)
+        assert shutdown.requested
+        assert signal.getsignal(signal.SIGTERM) == previous
+
+
+class TestFence:
+
+    def test_close_forbids_work(self):
+        fence = Fence()
+        called = []
+        fence.add_callback(lambda: called.append(True))
+        fence.check()
+        fence.close()
+        fence.close()
+        assert fence.closed
+        assert called == [True]
+        with pytest.raises(Fenced):
+            fence.check()
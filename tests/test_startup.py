@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from assistant.lazy import lazy_import
+from assistant.metrics import Gauge
+from assistant.startup import StartupReport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET = 0.15
+HEAVY_MODULES = ('telegram.bot', 'telegram.ext', 'requests.sessions',
+                 'aiohttp.client', 'asyncio.base_events', 'dotenv.main',
+                 'http.server')
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True,
+        check=True)
+
+
+class TestColdStart:
+
+    def test_heavy_modules_are_deferred(self):
+        result = run_python('-c', (
+            'import json, sys, homework; '
+            f'print(json.dumps([name for name in {HEAVY_MODULES!r} '
+            'if name in sys.modules]))'))
+        assert json.loads(result.stdout) == [], (
+            'Тяжёлые зависимости должны загружаться при первом обращении.')
+
+    def test_import_time_budget(self):
+        timings = {}
+        for line in run_python('-X', 'importtime', '-c',
+                               'import homework').stderr.splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                timings[parts[2].strip()] = int(parts[1]) / 1e6
+        assert timings['homework'] < IMPORT_BUDGET, (
+            f'Импорт homework занял {timings["homework"]:.3f} с')
+
+
+class TestLazyImport:
+
+    def test_module_is_loaded_on_first_use(self):
+        if 'colorsys' in sys.modules:
+            pytest.skip('colorsys уже импортирован')
+        colorsys = lazy_import('colorsys')
+        try:
+            assert sys.modules['colorsys'] is colorsys
+            assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+        finally:
+            sys.modules.pop('colorsys', None)
+
+    def test_loaded_and_missing_modules(self):
+        assert lazy_import('json') is json
+        assert lazy_import('no_such_module_for_bot') is None
+
+
+class TestStartupReport:
+
+    def test_marks_stages(self):
+        now = [10.0]
+        gauge = Gauge('startup_seconds', 'test', ('stage',))
+        report = StartupReport(gauge, clock=lambda: now[0], started=10.0)
+        now[0] = 10.004
+        report.mark('import')
+        now[0] = 10.0125
+        assert report.mark('ready') == pytest.approx(0.0125)
+        assert str(report) == 'import 4.0 мс, ready 12.5 мс'
+        assert gauge.value(stage='import') == pytest.approx(0.004)
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from assistant.engine import TenantState
+from assistant.state import SQLiteStateStore
+from assistant.tenants import Tenant
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SQLiteStateStore(str(tmp_path / 'state.sqlite3')) as store:
+        yield store
+
+
+class TestSQLiteStateStore:
+
+    def test_wal_mode(self, store):
+        mode = store._conn.execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+
+    def test_save_and_load(self, store):
+        assert store.load('ivan') is None
+        store.save('ivan', 100, 'msg', {'1': ('reviewing', '2022-01-01')})
+        store.save('ivan', 200, 'msg2', {'2': ('approved', None)})
+        store.save('maria', 300, '')
+        stored = store.load('ivan')
+        assert stored.timestamp == 200
+        assert stored.last_message == 'msg2'
+        assert stored.homeworks == {
+            '1': ('reviewing', '2022-01-01'),
+            '2': ('approved', None),
+        }
+        assert store.load_all() == {
+            'ivan': stored,
+            'maria': (300, '', {}),
+        }
+
+    def test_failed_save_is_rolled_back(self, store):
+        store.save('ivan', 100, 'msg')
+        with pytest.raises(sqlite3.Error):
+            store.save('ivan', 200, 'new', {'1': (None, None)})
+        assert store.load('ivan').timestamp == 100
+
+    def test_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        with SQLiteStateStore(path) as store:
+            store.save('ivan', 100, 'msg', {'1': ('approved', None)})
+        with SQLiteStateStore(path) as store:
+            assert store.load('ivan') == (100, 'msg', {'1': ('approved', None)})
+
+
+class TestRestoreState:
+
+    def test_restart_resumes_cursor(self, store, homework_module):
+        tenant = Tenant('ivan', 'token', '1')
+        state = homework_module.restore_state(tenant, None)
+        homework_module.process_response(state, {
+            'homeworks': [{'id': 7, 'homework_name': 'hw',
+                           'status': 'reviewing'}],
+            'current_date': 500,
+        })
+        state.last_message = 'sent'
+        homework_module.save_state(store, state)
+        assert state.index.dirty == {}
+
+        restored = homework_module.restore_state(tenant, store.load('ivan'))
+        assert isinstance(restored, TenantState)
+        assert restored.timestamp == 500
+        assert restored.last_message == 'sent'
+        assert dict(restored.index.items()) == {'7': ('reviewing', None)}
+        assert restored.index.reviewing == 1
@@ -0,0 +1,137 @@
+import json
+import tracemalloc
+
+import pytest
+
+from assistant.diff import StatusIndex
+from assistant.schema import Homework, compile_homework
+from assistant.stream import HomeworkStream
+
+RESPONSE = {
+    'homeworks': [
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+         'date_updated': '2026-01-01T00:00:00Z', 'comment': 'Всё ок'},
+        {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+    ],
+    'current_date': 1234567,
+}
+
+
+def body(count):
+    yield b'{"current_date": 1, "homeworks": ['
+    for index in range(count):
+        item = {'id': index, 'homework_name': f'hw{index}',
+                'status': 'approved', 'comment': 'x' * 200,
+                'date_updated': '2026-01-01T00:00:00Z'}
+        yield (',' if index else '').encode() + json.dumps(item).encode()
+    yield b']}'
+
+
+def chunked(data, size):
+    data = data.encode()
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 4096])
+    def test_matches_json_loads(self, size):
+        text = json.dumps(RESPONSE, ensure_ascii=False, indent=1)
+        stream = HomeworkStream(chunked(text, size))
+        assert list(stream) == RESPONSE['homeworks']
+        assert stream.current_date == 1234567
+
+    def test_keys_in_any_order(self):
+        text = '{"current_date": 5, "extra": [1, {}], "homeworks": []}'
+        stream = HomeworkStream(chunked(text, 3))
+        assert list(stream) == []
+        assert stream.current_date == 5
+
+    @pytest.mark.parametrize('text, error', [
+        ('[]', TypeError),
+        ('{"homeworks": {}, "current_date": 1}', TypeError),
+        ('{"homeworks": [1], "current_date": 1}', TypeError),
+        ('{"homeworks": []}', KeyError),
+        ('{"current_date": 1}', KeyError),
+        ('{"homeworks": [{"a": 1}', ValueError),
+        ('{"homeworks": [] "current_date": 1}', ValueError),
+    ])
+    def test_invalid_responses(self, text, error):
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(text, 4)))
+
+    def test_close_is_called_on_error(self):
+        closed = []
+        stream = HomeworkStream([b'{"homeworks": [1]'],
+                                close=lambda: closed.append(True))
+        with pytest.raises(TypeError):
+            list(stream)
+        assert closed == [True]
+
+    def test_item_size_is_limited(self):
+        text = '{"homeworks": [{"comment": "%s"}]}' % ('x' * 100)
+        with pytest.raises(ValueError):
+            list(HomeworkStream(chunked(text, 16), max_item_size=64))
+
+    def test_memory_stays_flat(self):
+        def peak(count):
+            tracemalloc.start()
+            try:
+                assert sum(1 for _ in HomeworkStream(body(count))) == count
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small, large = peak(1000), peak(20000)
+        assert large < small * 2
+
+    def test_diff_over_stream(self):
+        index = StatusIndex({'2': ('reviewing', None)})
+        text = json.dumps(RESPONSE)
+        record = compile_homework({'approved': '', 'reviewing': ''})
+        changes = index.diff(HomeworkStream(chunked(text, 5), record=record))
+        assert [change.key for change in changes] == ['1']
+        assert changes[0].homework == Homework(
+            '1', 'hw1', 'approved', '2026-01-01T00:00:00Z')
+
+    def test_rejected_entries_are_skipped(self):
+        text = json.dumps({
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'lost'},
+                          {'id': 2, 'homework_name': 'hw2',
+                           'status': 'approved'}],
+            'current_date': 7,
+        })
+        record = compile_homework({'approved': ''})
+        stream = HomeworkStream(chunked(text, 5), record=record)
+        assert list(stream) == [Homework('2', 'hw2', 'approved')]
+        assert [type(error) for error in stream.rejected] == [ValueError]
+        assert stream.current_date == 7
+
+
+class TestProcessStream:
+
+    def test_memory_stays_flat(self, homework_module):
+        from assistant.engine import TenantState
+        from assistant.tenants import Tenant
+
+        def overhead(count):
+            state = TenantState(Tenant('a', 't', '1'), 0)
+            sent = []
+            stream = HomeworkStream(
+                body(count), record=homework_module.homework_record)
+            tracemalloc.start()
+            try:
+                homework_module.process_stream(
+                    state, stream, lambda message: sent.append(1),
+                    lambda state: state.index.dirty.clear())
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            assert len(sent) == count and state.timestamp == 1
+            # Индекс и список отправок растут с числом работ - это
+            # состояние, а не память на разбор.
+            return peak - current
+
+        small, large = overhead(1000), overhead(20000)
+        assert large < small * 2
@@ -0,0 +1,63 @@
+import pytest
+
+from assistant.schema import Homework
+from assistant.table import NO_DATE, HomeworkTable, to_epoch, to_iso
+
+
+class TestDates:
+
+    @pytest.mark.parametrize('date_updated, epoch', [
+        ('2020-02-13T14:40:57Z', 1581604857),
+        ('2020-02-13T14:40:57.123Z', 1581604857),
+        ('2020-02-13T17:40:57+03:00', 1581604857),
+        (None, NO_DATE),
+        ('', NO_DATE),
+        ('вчера', NO_DATE),
+        ('2020-13-45T99:99:99Z', NO_DATE),
+    ])
+    def test_to_epoch(self, date_updated, epoch):
+        assert to_epoch(date_updated) == epoch
+
+    def test_round_trip(self):
+        assert to_iso(to_epoch('2026-01-01T00:00:00Z')) == \
+            '2026-01-01T00:00:00Z'
+        assert to_iso(NO_DATE) is None
+
+
+class TestHomeworkTable:
+
+    def test_put_and_lookup(self):
+        table = HomeworkTable()
+        assert table.put('1', 'reviewing', '2026-01-01T00:00:00Z') is None
+        assert table.put('1', 'approved', '2026-01-02T00:00:00Z') == \
+            'reviewing'
+        table.put('2', 'rejected')
+        assert len(table) == 2 and '1' in table and '3' not in table
+        assert table.status('1') == 'approved'
+        assert table.status('3') is None
+        assert table.get('1') == ('approved', '2026-01-02T00:00:00Z')
+        assert table.get('2') == ('rejected', None)
+        assert table.epoch('1') == to_epoch('2026-01-02T00:00:00Z')
+        assert dict(table.items()) == {
+            '1': ('approved', '2026-01-02T00:00:00Z'),
+            '2': ('rejected', None),
+        }
+        assert table.names is None
+
+    def test_records_newest_first(self):
+        table = HomeworkTable(names=True)
+        table.put('1', 'approved', '2026-01-01T00:00:00Z', 'hw1')
+        table.put('2', 'reviewing', '2026-01-03T00:00:00Z', 'hw2')
+        table.put('3', 'rejected', None, 'hw3')
+        table.put('1', 'rejected', '2026-01-02T00:00:00Z')
+        assert list(table.records(newest_first=True)) == [
+            Homework('2', 'hw2', 'reviewing', '2026-01-03T00:00:00Z'),
+            Homework('1', 'hw1', 'rejected', '2026-01-02T00:00:00Z'),
+            Homework('3', 'hw3', 'rejected', None),
+        ]
+
+    def test_names_are_interned(self):
+        table = HomeworkTable(names=True)
+        table.put('1', 'approved', name=''.join(['hw', '.zip']))
+        table.put('2', 'approved', name=''.join(['hw', '.zip']))
+        assert table.names[0] is table.names[1]
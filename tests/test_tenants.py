@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from assistant.tenants import Tenant, load_tenants, parse_tenants
+
+
+class TestTenants:
+
+    def test_load_from_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'name': 'ivan', 'practicum_token': 't1', 'chat_id': 1},
+            {'practicum_token': 't2', 'chat_id': '2'},
+        ]), encoding='utf-8')
+        tenants = load_tenants(str(path), environ={})
+        assert tenants == [
+            Tenant('ivan', 't1', '1'),
+            Tenant('2', 't2', '2'),
+        ]
+        assert tenants[0].headers == {'Authorization': 'OAuth t1'}
+
+    def test_load_from_env(self):
+        environ = {
+            'TENANTS': '[{"name": "a", "practicum_token": "t", '
+                       '"chat_id": "1"}]',
+            'SECRET_PRACTICUM_TOKEN': 'ignored',
+            'SECRET_TELEGRAM_CHAT_ID': 'ignored',
+        }
+        assert load_tenants(environ=environ) == [Tenant('a', 't', '1')]
+
+    def test_single_tenant_fallback(self):
+        environ = {
+            'SECRET_PRACTICUM_TOKEN': 'token',
+            'SECRET_TELEGRAM_CHAT_ID': '42',
+        }
+        assert load_tenants(environ=environ) == [
+            Tenant('default', 'token', '42')
+        ]
+        assert load_tenants(environ={}) == []
+
+    @pytest.mark.parametrize('raw, error', [
+        ('{}', TypeError),
+        ('[{"chat_id": "1"}]', KeyError),
+        ('[{"name": "a", "practicum_token": "t", "chat_id": "1"},'
+         ' {"name": "a", "practicum_token": "t", "chat_id": "2"}]',
+         ValueError),
+    ])
+    def test_invalid_tenants(self, raw, error):
+        with pytest.raises(error):
+            parse_tenants(raw)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+import pytest
+
+from assistant import tracing
+from assistant.tenants import Tenant
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+    def close(self):
+        pass
+
+
+def names(trace):
+    return sorted(item.name for item in trace.spans)
+
+
+class TestTracer:
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = tracing.Tracer()
+        with tracer.trace('cycle') as root, tracing.span('poll') as inner:
+            root.set(tenant='a')
+            inner.set(homework=1)
+        assert root is tracing.NOOP_SPAN and inner is tracing.NOOP_SPAN
+
+    def test_spans_are_nested(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter)
+        with tracer.trace('cycle', tenant='ivan') as root:
+            with tracing.span('poll'):
+                with tracing.span('http.request') as request:
+                    request.set(status=200)
+            with pytest.raises(KeyError):
+                with tracing.span('parse_status', homework='5'):
+                    raise KeyError('status')
+        (trace,) = exporter.traces
+        spans = {item.name: item for item in trace.spans}
+        assert spans['cycle'] is root and root.parent_id is None
+        assert root.attrs == {'tenant': 'ivan'}
+        assert spans['poll'].parent_id == root.span_id
+        assert spans['http.request'].parent_id == spans['poll'].span_id
+        assert spans['http.request'].attrs == {'status': 200}
+        assert spans['parse_status'].attrs == {
+            'homework': '5', 'error': 'KeyError'}
+
+    def test_nested_trace_is_a_span(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter)
+        with tracer.trace('cycle'):
+            with tracer.trace('telegram.send', chat='7'):
+                pass
+        with tracer.trace('telegram.send', chat='8'):
+            pass
+        assert [names(trace) for trace in exporter.traces] == [
+            ['cycle', 'telegram.send'], ['telegram.send']]
+
+    def test_sampling_and_slow_cycles(self, clock):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter, sample=0.1, slow=2,
+                                rng=lambda: 0.5,
+                                clock=lambda: int(clock.time() * 10 ** 9))
+        with tracer.trace('fast'):
+            clock.sleep(1)
+        with tracer.trace('slow'):
+            clock.sleep(3)
+        assert [names(trace) for trace in exporter.traces] == [['slow']]
+        tracer.slow = None
+        with tracer.trace('unsampled') as root:
+            clock.sleep(3)
+        assert root is tracing.NOOP_SPAN
+        assert len(exporter.traces) == 1
+
+    def test_concurrent_tasks_keep_their_traces(self):
+        exporter = ListExporter()
+        tracer = tracing.Tracer(exporter)
+
+        async def cycle(name):
+            with tracer.trace('cycle', tenant=name):
+                await asyncio.sleep(0)
+                with tracing.span('http.request'):
+                    await asyncio.sleep(0)
+
+        async def scenario():
+            await asyncio.gather(cycle('a'), cycle('b'))
+
+        asyncio.run(scenario())
+        for trace in exporter.traces:
+            root, request = sorted(trace.spans, key=lambda item: item.start)
+            assert request.parent_id == root.span_id
+        assert len({trace.trace_id for trace in exporter.traces}) == 2
+
+
+class TestExporters:
+
+    def record(self, exporter):
+        tracer = tracing.Tracer(exporter)
+        with tracer.trace('cycle', tenant='ivan'):
+            with tracing.span('parse_status', homework=5):
+                pass
+        exporter.close()
+
+    def test_chrome_trace(self, tmp_path):
+        path = tmp_path / 'trace.json'
+        self.record(tracing.make_exporter('chrome', str(path)))
+        self.record(tracing.make_exporter('chrome', str(path)))
+        text = path.read_text(encoding='utf-8')
+        assert text.startswith('[\n') and text.count('[') == 1
+        events = json.loads(text.rstrip().rstrip(',') + ']')
+        assert [event['name'] for event in events] == [
+            'parse_status', 'cycle'] * 2
+        parse, cycle = events[:2]
+        assert cycle['ph'] == 'X' and cycle['args']['tenant'] == 'ivan'
+        assert parse['args']['homework'] == 5
+        assert parse['tid'] == cycle['tid']
+        assert cycle['ts'] <= parse['ts'] and parse['dur'] <= cycle['dur']
+
+    def test_otlp_json(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        self.record(tracing.make_exporter('otlp', str(path)))
+        (line,) = path.read_text(encoding='utf-8').splitlines()
+        (resource,) = json.loads(line)['resourceSpans']
+        parse, cycle = resource['scopeSpans'][0]['spans']
+        assert parse['traceId'] == cycle['traceId']
+        assert len(cycle['traceId']) == 32 and len(cycle['spanId']) == 16
+        assert parse['parentSpanId'] == cycle['spanId']
+        assert 'parentSpanId' not in cycle
+        assert cycle['attributes'] == [
+            {'key': 'tenant', 'value': {'stringValue': 'ivan'}}]
+        assert parse['attributes'] == [
+            {'key': 'homework', 'value': {'intValue': '5'}}]
+        assert int(cycle['startTimeUnixNano']) <= int(
+            parse['startTimeUnixNano'])
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            tracing.make_exporter('zipkin', str(tmp_path / 'trace'))
+
+
+class TestPollTracing:
+
+    def test_poll_cycle_is_traced(self, monkeypatch, fake_api,
+                                  homework_module):
+        import utils
+        from assistant.client import PracticumClient
+        from assistant.engine import TenantState
+
+        exporter = ListExporter()
+        monkeypatch.setattr(homework_module, 'TRACER',
+                            tracing.Tracer(exporter))
+        monkeypatch.setattr(
+            homework_module, 'ENDPOINT', fake_api.url + '/statuses/')
+        fake_api.routes['/statuses/'] = (200, {
+            'homeworks': [{'id': 5, 'homework_name': 'hw',
+                           'status': 'rejected'}],
+            'current_date': 4321,
+        })
+        bot = utils.MockTelegramBot()
+        state = TenantState(Tenant('student7', 'token7', '7'), 1000)
+        with PracticumClient() as client:
+            homework_module.poll_tenant(bot, state, client, stream=True)
+        (trace,) = exporter.traces
+        spans = {item.name: item for item in trace.spans}
+        assert set(spans) == {
+            'cycle', 'http.connect', 'http.tcp', 'http.request', 'stream',
+            'parse_status', 'telegram.send'}
+        assert spans['cycle'].attrs == {'tenant': 'student7'}
+        assert spans['parse_status'].attrs == {'homework': '5'}
+        assert spans['http.request'].attrs == {'status': 200}
+        assert spans['http.tcp'].parent_id == spans['http.connect'].span_id
+        assert spans['telegram.send'].parent_id == spans['cycle'].span_id